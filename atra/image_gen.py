@@ -4,11 +4,9 @@
 
 import base64
 import os
-from openai import OpenAI
 from atra.config import OPENAI_API_KEY
 from atra.utils import log, divider
-
-client = OpenAI(api_key=OPENAI_API_KEY)
+from services import transport
 
 OUTPUT_DIR = "output"
 OUTPUT_PATH = os.path.join(OUTPUT_DIR, "generated_image.png")
@@ -23,7 +21,7 @@ def generate_image(prompt_text: str):
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
     try:
-        response = client.images.generate(
+        response = transport.openai_client(OPENAI_API_KEY).images.generate(
             model="gpt-image-1",
             prompt=prompt_text,
             size="1024x1024"
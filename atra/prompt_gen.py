@@ -3,11 +3,9 @@
 # Ignore all previous versions, drafts, or cached variants. 
 # Any edits or replacements must be made explicitly within this canonical structure.
 
-from openai import OpenAI
 from atra.config import OPENAI_API_KEY
 from atra.utils import log, divider
-
-client = OpenAI(api_key=OPENAI_API_KEY)
+from services import transport
 
 def generate_prompt():
     """
@@ -15,7 +13,7 @@ def generate_prompt():
     """
     divider("ATRA – Generating Prompt")
     try:
-        response = client.chat.completions.create(
+        response = transport.openai_client(OPENAI_API_KEY).chat.completions.create(
             model="gpt-4o-mini",
             messages=[
                 {
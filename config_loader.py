@@ -33,5 +33,7 @@ def validate_env():
     else:
         print("✅ All environment variables loaded successfully.")
 
-validate_env()
+
+if __name__ == "__main__":
+    validate_env()
 
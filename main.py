@@ -6,29 +6,21 @@ ATRA Automation Orchestrator
 main.py v1.3 – Joanie Personality Modes (Phase 2: Mood Persistence)
 
 Coordinates all services:
-prompt → image → upload → sheet → IG + FB (via Make.com)
+prompt → (image ∥ captions) → upload → (sheet ∥ IG + FB via Make.com)
 """
 
-from dotenv import load_dotenv
 import os
-import json
-import random
-from datetime import datetime
-
-# Load environment
-load_dotenv(dotenv_path=".env", override=True)
-print("🔍 ENV check – CLOUDINARY_URL loaded:", bool(os.getenv("CLOUDINARY_URL")))
-
-# Service imports
-from services.post_service import send_to_make_webhook
-from services.prompt_service import generate_prompt
-from services.image_service import generate_image
-from services.upload_service import upload_asset
-from services.sheet_service import update_sheet
-from services.caption_service import (
-    generate_instagram_caption,
-    generate_facebook_caption
-)
+import sys
+import time
+import uuid
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+# Services are resolved lazily (services/registry.py) so --help and the
+# mood engine don't pay for openai/PIL/gspread/cloudinary imports.
+from services.pipeline import PipelineRun, Stage, run_stages
+from services import checkpoint, inventory, ledger, mood_state, registry, response_cache, telemetry
 
 # Joanie personality modes
 PERSONALITY_MODES = {
@@ -39,138 +31,487 @@ PERSONALITY_MODES = {
     "sunday_scaries": "😨",
 }
 
-STATE_FILE = "state/joanie_history.json"
-
 
 # ---------------------------------------------------------
 # Phase 2: Mood Persistence Engine (Tier B)
 # ---------------------------------------------------------
-def _load_history():
-    """Load last 5 modes from state file."""
-    if not os.path.exists("state"):
-        os.makedirs("state")
-
-    if not os.path.isfile(STATE_FILE):
-        return []
-
-    try:
-        with open(STATE_FILE, "r") as f:
-            data = json.load(f)
-            return data.get("recent_modes", [])
-    except:
-        return []
-
-
-def _save_history(history):
-    """Save the last 5 modes."""
-    with open(STATE_FILE, "w") as f:
-        json.dump({"recent_modes": history[-5:]}, f)
-
-
 def choose_joanie_mode():
     """Choose next Joanie mode using:
     - No repetition
     - Recency down-weighting
     - Rarity boosting
     - Sunday override
+    History lives in a file-locked store (services/mood_state.py).
     """
-    history = _load_history()
-    today = datetime.now().strftime("%A")
+    return mood_state.choose_mode(PERSONALITY_MODES)
 
-    # --- 1. Sunday Scaries override ---
-    if today == "Sunday":
-        # But avoid repeating
-        if len(history) == 0 or history[-1] != "sunday_scaries":
-            _save_history(history + ["sunday_scaries"])
-            return "sunday_scaries"
 
-    last = history[-1] if history else None
+def plan_joanie_modes(count: int, dates=None):
+    """Schedule the next `count` modes (posting on `dates`, default today) with one locked history update."""
+    return mood_state.plan_modes(count, PERSONALITY_MODES, dates=dates)
 
-    # --- 2. Base weights ---
-    weights = {
-        mode: 1.0 for mode in PERSONALITY_MODES.keys()
-    }
 
-    # --- 3. No immediate repetition ---
-    if last in weights:
-        weights[last] = 0.0
+# ---------------------------------------------------------
+# Main pipeline
+# ---------------------------------------------------------
+WEBHOOK_URL = os.getenv("ATRA_WEBHOOK_URL", "https://hook.us2.make.com/cx9uy79z1rar2h907adqw8mhbunppnt7")
+
+# Prompt + both captions from one structured chat call (services/text_service.py)
+COMBINED_TEXT = os.getenv("ATRA_COMBINED_TEXT", "0").strip() in {"1", "true", "True"}
+# Platform renditions (IG 4:5, FB square, TikTok 9:16) uploaded alongside the original
+RENDITIONS = os.getenv("ATRA_RENDITIONS", "0").strip() in {"1", "true", "True"}
+
+# Per-stage timeouts (seconds). The webhook budget covers the CDN delay + retries.
+STAGE_TIMEOUTS = {
+    "text": 90,
+    "prompt": 60,
+    "image": 600,
+    "ig_caption": 60,
+    "fb_caption": 60,
+    "image_url": 120,
+    "sheet": 90,
+    "posted": 180,
+    "renditions": 120,
+    "rendition_urls": 120,
+}
 
-    # --- 4. Recency down-weighting ---
-    # recent modes get suppressed slightly
-    for i, recent_mode in enumerate(reversed(history)):
-        if recent_mode in weights and weights[recent_mode] > 0:
-            weights[recent_mode] *= (0.7 - 0.1 * i)  # gradually less
 
-    # --- 5. Rarity boosting ---
-    # modes not seen in 5 runs get boosted
-    for mode in PERSONALITY_MODES:
-        if mode not in history:
-            weights[mode] *= 1.6
+def _text_stages(combined: bool):
+    """(prompt stages, caption stages): three chat calls, or one structured call."""
+    if not combined:
+        return (
+            [Stage("prompt", registry.lazy("generate_prompt"), ("mode",))],
+            [
+                Stage("ig_caption", registry.lazy("generate_instagram_caption"), ("prompt", "mode")),
+                Stage("fb_caption", registry.lazy("generate_facebook_caption"), ("prompt", "mode")),
+            ],
+        )
+    # The caption stages only call the model when the combined reply was rejected.
+    return (
+        [
+            Stage("text", registry.lazy("generate_text"), ("mode",)),
+            Stage("prompt", registry.lazy("prompt_from_text"), ("text",)),
+        ],
+        [
+            Stage("ig_caption", registry.lazy("instagram_caption_from_text"), ("text", "mode")),
+            Stage("fb_caption", registry.lazy("facebook_caption_from_text"), ("text", "mode")),
+        ],
+    )
 
-    # Normalize and pick
-    pool = [(m, w) for m, w in weights.items() if w > 0]
-    modes, wts = zip(*pool)
-    chosen = random.choices(modes, weights=wts, k=1)[0]
 
-    # Save
-    _save_history(history + [chosen])
+def build_stages(combined_text: bool = None, renditions: bool = None) -> list:
+    """Declare the ATRA pipeline; each stage lists the inputs it needs.
 
-    return chosen
+    prompt ──┬─> image ─> image_url ──┬─> sheet
+             ├─> ig_caption ──────────┤
+             └─> fb_caption ──────────┴─> posted
 
+    With ATRA_COMBINED_TEXT=1, prompt and both captions come from one
+    structured `text` call. With ATRA_RENDITIONS=1, image also feeds
+    renditions ─> rendition_urls ─> posted, in parallel with the upload.
+    """
+    if combined_text is None:
+        combined_text = COMBINED_TEXT
+    if renditions is None:
+        renditions = RENDITIONS
+    post_inputs = ("ig_caption", "fb_caption", "image_url", "webhook_url", "run_id")
+    prompt_stages, caption_stages = _text_stages(combined_text)
+    stages = prompt_stages + [
+        Stage("image", registry.lazy("generate_image"), ("prompt", "mode", "output_path")),
+        *caption_stages,
+        Stage("image_url", registry.lazy("upload_asset"), ("image",)),
+        # The run ID doubles as the idempotency key for the sheet row and the post.
+        Stage("sheet", registry.lazy("update_sheet"), ("prompt", "image_url", "run_id")),
+        Stage(
+            "posted",
+            registry.lazy("send_to_make_webhook"),
+            post_inputs + (("rendition_urls",) if renditions else ()),
+        ),
+    ]
+    if renditions:
+        # After image_url, so the upload (the critical path) is submitted first.
+        stages[-2:-2] = [
+            Stage("renditions", registry.lazy("render_renditions"), ("image",)),
+            Stage("rendition_urls", registry.lazy("upload_renditions"), ("renditions",)),
+        ]
+    for stage in stages:
+        stage.timeout = STAGE_TIMEOUTS.get(stage.name)
+    return stages
+
+
+def _record_run(mode: str, run: PipelineRun, error: str = None, run_id: str = None) -> None:
+    """Mirror the run into the local SQLite ledger (never fails the run)."""
+    outputs = run.outputs
+    try:
+        ledger.record_run(
+            mode=mode,
+            prompt=outputs.get("prompt"),
+            ig_caption=outputs.get("ig_caption"),
+            fb_caption=outputs.get("fb_caption"),
+            image_url=outputs.get("image_url"),
+            timings=run.timings,
+            posted=bool(outputs.get("posted")),
+            error=error,
+            run_id=run_id,
+        )
+    except Exception as exc:
+        print(f"⚠️ Could not record run in ledger: {exc}")
+
+
+def _remember_prompt(prompt: str, run_id: str) -> None:
+    """Promote a posted prompt from its run's reservation into the near-duplicate index (never fails the run)."""
+    try:
+        from services import prompt_index
 
-# ---------------------------------------------------------
-# Main pipeline
-# ---------------------------------------------------------
-def run_once() -> None:
-    """Run the full ATRA pipeline once."""
+        prompt_index.remember_posted(prompt, run_id)
+    except Exception as exc:
+        print(f"⚠️ Could not index posted prompt: {exc}")
+
+
+def _release_prompt(run_id: str) -> None:
+    """Free a discarded run's prompt reservation for other runs."""
+    try:
+        from services import prompt_index
+
+        prompt_index.get_index().release(run_id)
+    except Exception as exc:
+        print(f"⚠️ Could not release prompt reservation: {exc}")
+
+
+def _checkpoint_stage(run_checkpoint: checkpoint.RunCheckpoint):
+    """Stage callback that checkpoints outputs (a failed write never fails the run)."""
+
+    def _save(name, value):
+        try:
+            run_checkpoint.save_stage(name, value)
+        except Exception as exc:
+            print(f"⚠️ Could not checkpoint stage '{name}': {exc}")
+
+    return _save
+
+
+def run_once(mode: str = None, output_path: str = None, resume_run_id: str = None) -> dict:
+    """
+    Run the full ATRA pipeline once and return every stage output.
+    `resume_run_id` re-runs only the stages a checkpointed run didn't finish.
+    """
     print("🚀 ATRA main.py v1.3 – starting run (Phase 2 enabled)")
 
-    # 0. Choose Joanie personality mode (Phase 2 engine)
-    mode = choose_joanie_mode()
+    if resume_run_id:
+        run_checkpoint = checkpoint.RunCheckpoint.load(resume_run_id)
+        run_id, mode = resume_run_id, run_checkpoint.mode
+        completed = run_checkpoint.completed_outputs()
+        print(f"⏯️ Resuming run {run_id}; already done: {', '.join(completed) or 'nothing'}")
+    else:
+        # 0. Choose Joanie personality mode (Phase 2 engine)
+        if mode is None:
+            mode = choose_joanie_mode()
+        # The run ID ties the checkpoint, ledger row and telemetry spans together.
+        run_id = uuid.uuid4().hex
+        run_checkpoint = checkpoint.RunCheckpoint.create(run_id, mode)
+        completed = {}
     emoji = PERSONALITY_MODES[mode]
     print(f"🎭 Joanie Mode → {mode} {emoji}")
 
-    # 1. Generate base journaling prompt
-    prompt = generate_prompt(mode)
-    print(f"🧠 Prompt generated: {prompt}")
-
-    # 2. Generate image using brand rules
-    image_path = generate_image(prompt, mode)
-    print(f"🎨 Image generated at: {image_path}")
+    # 1–6. Prompt, then image + captions in parallel, then upload,
+    # then sheet log + Make.com post (IG + FB) in parallel.
+    stages = [stage for stage in build_stages() if stage.name not in completed]
+    initial = {
+        "mode": mode,
+        "webhook_url": WEBHOOK_URL,
+        "output_path": output_path,
+        "run_id": run_id,
+        **completed,
+    }
+    run = PipelineRun()
+    with telemetry.run_context(run_id):
+        try:
+            with telemetry.span("run", mode=mode, resumed=bool(resume_run_id)):
+                run_stages(stages, initial=initial, run=run, on_stage_done=_checkpoint_stage(run_checkpoint))
+        except Exception as exc:
+            _record_run(mode, run, error=str(exc), run_id=run_id)
+            run_checkpoint.finish(error=str(exc))
+            print(f"💾 Progress saved; resume with: python main.py --resume {run_id}")
+            raise
+    outputs = run.outputs
+    _record_run(mode, run, run_id=run_id)
+    run_checkpoint.finish(error=None if outputs["posted"] else "webhook post failed")
+
+    print(f"🧠 Prompt generated: {outputs['prompt']}")
+    print(f"🎨 Image generated: {outputs['image']}")
+    print(f"☁️ Uploaded image to: {outputs['image_url']}")
+    print(f"📝 IG Caption: {outputs['ig_caption']}")
+    print(f"📝 FB Caption: {outputs['fb_caption']}")
+
+    if outputs["posted"]:
+        _remember_prompt(outputs["prompt"], run_id)
+        print("✅ Social post sent successfully.")
+    else:
+        print(f"⚠️ Social post failed. Check logs; retry with: python main.py --resume {run_id}")
 
-    # 3. Upload to Cloudinary
-    image_url = upload_asset(image_path)
-    print(f"☁️ Uploaded image to: {image_path}")
+    timings = ", ".join(f"{name}={secs:.1f}s" for name, secs in run.timings.items())
+    print(f"⏱️ Stage timings: {timings}")
+    print("✅ ATRA run complete.")
+    return outputs
 
-    # 4. Update Google Sheet log
-    update_sheet(prompt, image_url)
-    print("📒 Sheet updated successfully")
 
-    # 5. Generate platform-specific captions
-    ig_caption = generate_instagram_caption(prompt, mode)
-    fb_caption = generate_facebook_caption(prompt, mode)
+# ---------------------------------------------------------
+# Batch mode
+# ---------------------------------------------------------
+def run_batch(count: int, workers: int = 4) -> bool:
+    """Run `count` pipelines through a bounded worker pool; return True if all posted."""
+    workers = max(1, min(workers, count))
+    print(f"📦 ATRA batch – {count} posts with {workers} workers")
+
+    # The whole mode schedule is drawn in one locked transaction, so
+    # workers never touch the history file.
+    jobs = list(enumerate(plan_joanie_modes(count), start=1))
+
+    def _timed_run(mode):
+        started = time.monotonic()
+        outputs = run_once(mode=mode)
+        return outputs, time.monotonic() - started
+
+    results = []
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_timed_run, mode): (index, mode)
+            for index, mode in jobs
+        }
+        for future in as_completed(futures):
+            index, mode = futures[future]
+            try:
+                outputs, latency = future.result()
+                error = None if outputs.get("posted") else "webhook post failed"
+            except Exception as exc:
+                latency, error = None, str(exc)
+            results.append((index, mode, latency, error))
+    elapsed = time.monotonic() - started
+
+    failures = [r for r in results if r[3]]
+    latencies = [r[2] for r in results if r[2] is not None]
+
+    print("\n📊 Batch summary")
+    print(f"   Posts: {count - len(failures)}/{count} succeeded in {elapsed:.1f}s")
+    print(f"   Throughput: {count / elapsed * 60:.2f} posts/min")
+    if latencies:
+        print(
+            f"   Per-post latency: min {min(latencies):.1f}s · "
+            f"avg {sum(latencies) / len(latencies):.1f}s · max {max(latencies):.1f}s"
+        )
+    for index, mode, _, error in sorted(failures):
+        print(f"   ❌ #{index} ({mode}): {error}")
+
+    return not failures
 
-    print(f"📝 IG Caption: {ig_caption}")
-    print(f"📝 FB Caption: {fb_caption}")
 
-    # 6. Send to Make.com (IG + FB posting handled inside Make)
-    WEBHOOK_URL = "https://hook.us2.make.com/cx9uy79z1rar2h907adqw8mhbunppnt7"
+# ---------------------------------------------------------
+# Inventory: produce ahead of time, post from the queue
+# ---------------------------------------------------------
+# Stages the consumer runs at posting time; everything else is pre-generated.
+POSTING_STAGES = ("sheet", "posted")
+PRODUCE_ATTEMPTS = int(os.getenv("ATRA_INVENTORY_ATTEMPTS", "3"))
 
-    print("📨 Sending post to Instagram + Facebook via Make.com...")
-    posted = send_to_make_webhook(
-        ig_caption,
-        fb_caption,
-        image_url,
-        WEBHOOK_URL
-    )
 
-    if posted:
+def _produce_bundle(mode: str, attempts: int = PRODUCE_ATTEMPTS) -> bool:
+    """Generate + upload one bundle into the inventory, retrying only unfinished stages."""
+    run_id = uuid.uuid4().hex
+    run_checkpoint = checkpoint.RunCheckpoint.create(run_id, mode)
+    try:
+        for attempt in range(1, attempts + 1):
+            completed = run_checkpoint.completed_outputs()
+            stages = [
+                stage for stage in build_stages()
+                if stage.name not in POSTING_STAGES and stage.name not in completed
+            ]
+            run = PipelineRun()
+            try:
+                with telemetry.run_context(run_id), telemetry.span("produce", mode=mode, attempt=attempt):
+                    run_stages(
+                        stages,
+                        initial={"mode": mode, "output_path": None, "run_id": run_id, **completed},
+                        run=run,
+                        on_stage_done=_checkpoint_stage(run_checkpoint),
+                    )
+                if not run.outputs.get("image_url"):
+                    raise RuntimeError("upload returned no URL")
+                inventory.add(run.outputs)
+                print(f"📦 Queued {mode} bundle {run_id} ({inventory.depth()} ready)")
+                return True
+            except Exception as exc:
+                print(f"⚠️ Bundle attempt {attempt}/{attempts} ({mode}) failed: {exc}")
+                if attempt < attempts:
+                    time.sleep(2 ** attempt)
+        _release_prompt(run_id)
+        return False
+    finally:
+        # The inventory (or nothing, on failure) is the record; never --resume these.
+        run_checkpoint.discard()
+
+
+def produce_inventory(depth: int = inventory.TARGET_DEPTH, workers: int = 4) -> bool:
+    """Top the inventory up to `depth` ready bundles; return True if it got there."""
+    needed = depth - inventory.depth()
+    if needed <= 0:
+        print(f"📦 Inventory already at {inventory.depth()}/{depth} – nothing to produce.")
+        return True
+    workers = max(1, min(workers, needed))
+    print(f"🏭 Producing {needed} bundle(s) to reach depth {depth} ({workers} workers)")
+
+    # Modes are planned in queue order, so the mood history matches what gets posted;
+    # one bundle is consumed per day, after the ones already queued.
+    queued = inventory.depth()
+    today = datetime.now().date()
+    modes = plan_joanie_modes(needed, dates=[today + timedelta(days=queued + i) for i in range(needed)])
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        produced = sum(pool.map(_produce_bundle, modes))
+    print(f"📦 Inventory: {inventory.depth()} ready ({produced}/{needed} produced this run)")
+    return produced == needed
+
+
+def consume_inventory() -> dict:
+    """Post the next pre-generated bundle (sheet log + Make.com only); run live if empty."""
+    claimed = inventory.claim()
+    if claimed is None:
+        print("📭 Inventory empty – generating and posting live.")
+        return run_once()
+
+    bundle = claimed.bundle
+    mode, run_id = bundle["mode"], bundle["run_id"]
+    print(f"📬 Posting pre-generated bundle {run_id} – {mode} {PERSONALITY_MODES[mode]} ({inventory.depth()} left)")
+    stages = [stage for stage in build_stages() if stage.name in POSTING_STAGES]
+    run = PipelineRun()
+    with telemetry.run_context(run_id):
+        try:
+            with telemetry.span("consume", mode=mode):
+                run_stages(
+                    stages,
+                    initial={"rendition_urls": None, **bundle, "webhook_url": WEBHOOK_URL},
+                    run=run,
+                )
+        except Exception as exc:
+            claimed.release()
+            _record_run(mode, run, error=str(exc), run_id=run_id)
+            raise
+    outputs = run.outputs
+    _record_run(mode, run, run_id=run_id)
+
+    if outputs["posted"]:
+        claimed.complete()
+        _remember_prompt(outputs.get("prompt"), run_id)
         print("✅ Social post sent successfully.")
     else:
-        print("⚠️ Social post failed. Check logs.")
+        # Back in the queue; the run ID keeps the next attempt idempotent.
+        claimed.release()
+        print("⚠️ Social post failed; bundle returned to the inventory.")
+    timings = ", ".join(f"{name}={secs:.1f}s" for name, secs in run.timings.items())
+    print(f"⏱️ Stage timings: {timings}")
+    return outputs
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the ATRA content pipeline.")
+    parser.add_argument(
+        "--batch",
+        type=int,
+        metavar="N",
+        help="Generate and post N posts in one invocation.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Concurrent pipelines in batch/produce mode (default: 4).",
+    )
+    parser.add_argument(
+        "--produce",
+        action="store_true",
+        help="Fill the ready-to-post inventory (state/inventory) up to --depth bundles.",
+    )
+    parser.add_argument(
+        "--depth",
+        type=int,
+        default=inventory.TARGET_DEPTH,
+        help=f"Target inventory depth for --produce (default: {inventory.TARGET_DEPTH}, ATRA_INVENTORY_DEPTH).",
+    )
+    parser.add_argument(
+        "--consume",
+        action="store_true",
+        help="Post the next inventory bundle (falls back to a live run when empty).",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Reuse cached OpenAI responses for identical requests (resumed runs/dev iterations).",
+    )
+    parser.add_argument(
+        "--resume",
+        nargs="?",
+        const="latest",
+        metavar="RUN_ID",
+        help="Finish a failed run from its checkpoint (default: the latest incomplete run).",
+    )
+    parser.add_argument(
+        "--telemetry",
+        action="store_true",
+        help="Record stage/API timing spans to state/telemetry (also ATRA_TELEMETRY=1).",
+    )
+    return parser.parse_args(argv)
 
-    print("✅ ATRA run complete.")
+
+def load_environment() -> None:
+    """Load .env (overriding the shell) and report the Cloudinary config."""
+    from dotenv import load_dotenv
+
+    load_dotenv(dotenv_path=".env", override=True)
+    print("🔍 ENV check – CLOUDINARY_URL loaded:", bool(os.getenv("CLOUDINARY_URL")))
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    load_environment()
+    if args.cache:
+        response_cache.enable()
+    if args.telemetry:
+        telemetry.enable()
+    try:
+        if args.batch:
+            if not run_batch(args.batch, workers=args.workers):
+                sys.exit(1)
+        elif args.produce:
+            if not produce_inventory(args.depth, workers=args.workers):
+                sys.exit(1)
+        elif args.consume:
+            consume_inventory()
+        elif args.resume:
+            run_id = checkpoint.latest_incomplete() if args.resume == "latest" else args.resume
+            if run_id is None:
+                print("✅ Nothing to resume – every checkpointed run completed.")
+            else:
+                run_once(resume_run_id=run_id)
+        else:
+            run_once()
+    finally:
+        try:
+            checkpoint.prune()
+        except OSError as exc:
+            print(f"⚠️ Checkpoint prune failed: {exc}")
+        try:
+            synced = ledger.sync_to_sheet()
+            if synced:
+                print(f"🗂️ Synced {synced} ledger row(s) to the Sheet")
+        except Exception as exc:
+            print(f"⚠️ Ledger sync failed (will retry next run): {exc}")
+        telemetry.flush()
+        # Only modules this run loaded; shutting down never imports a service.
+        rendition_service = sys.modules.get("services.rendition_service")
+        if rendition_service is not None:
+            rendition_service.shutdown()
+        transport = sys.modules.get("services.transport")
+        if transport is not None:
+            transport.close()
 
 
 if __name__ == "__main__":
-    run_once()
+    main()
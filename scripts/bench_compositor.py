@@ -0,0 +1,109 @@
+"""
+Micro-benchmark: NumPy vs PIL local cover compositor.
+
+Times image_service's PIL overlay against services.compositor at several
+frame sizes and reports the pixel difference between the two outputs.
+
+Usage: python scripts/bench_compositor.py [--sizes 1024 1536 2048] [--repeat 5]
+                                          [--base frame.png] [--cover cover.png]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "bench-offline")
+
+from services import compositor  # noqa: E402
+from services.image_service import _place_cover_on_image_pil  # noqa: E402
+
+
+def synthetic_frame(
+    size: int,
+    width_ratio: float = 0.35,
+    offset: tuple = (0.0, 0.0),
+    desk_color: tuple = (90, 55, 30),
+    book_color: tuple = (22, 20, 24),
+    seed: int = 7,
+) -> Image.Image:
+    """
+    Warm gradient desk (`desk_color` at the top-left corner) with a dark
+    notebook and some clutter. The notebook is centred at 35% width unless
+    `width_ratio` / `offset` (fractions of the frame) move it.
+    """
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:size, 0:size].astype(np.float32) / size
+    red, green, blue = desk_color
+    desk = np.stack([red * (1 + xx * 2 / 3), green * (1 + yy * 8 / 11), blue * (1 + xx * yy * 2 / 3)], axis=-1)
+    desk += rng.normal(0, 6, desk.shape)
+    frame = Image.fromarray(np.clip(desk, 0, 255).astype(np.uint8), "RGB")
+
+    draw = ImageDraw.Draw(frame)
+    book_w = int(size * width_ratio)
+    book_h = int(book_w * 1.5)
+    x0 = (size - book_w) // 2 + int(size * offset[0])
+    y0 = (size - book_h) // 2 + int(size * offset[1])
+    draw.rectangle((x0, y0, x0 + book_w, y0 + book_h), fill=book_color)
+    for i in range(12):
+        cx, cy = rng.integers(0, size, 2)
+        r = int(rng.integers(size // 40, size // 12))
+        draw.ellipse((cx - r, cy - r, cx + r, cy + r), fill=tuple(int(v) for v in rng.integers(40, 230, 3)))
+    return frame
+
+
+def synthetic_cover() -> Image.Image:
+    cover = Image.new("RGB", (1200, 1800), (18, 18, 18))
+    draw = ImageDraw.Draw(cover)
+    for row in range(6):
+        y = 300 + row * 180
+        draw.rectangle((150, y, 1050, y + 90), fill=(235, 225 - row * 20, 40 + row * 30))
+    draw.ellipse((450, 1400, 750, 1700), fill=(250, 200, 0))
+    return cover
+
+
+def _time(func, repeat: int) -> tuple:
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - started)
+    return min(samples), sum(samples) / len(samples), result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the local cover compositor.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1024, 1536, 2048])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--base", help="Optional base frame (resized to each size).")
+    parser.add_argument("--cover", help="Optional cover image.")
+    args = parser.parse_args()
+
+    cover = Image.open(args.cover).convert("RGBA") if args.cover else synthetic_cover().convert("RGBA")
+
+    print(f"{'size':>6} | {'PIL ms':>9} | {'NumPy ms':>9} | {'speedup':>7} | {'mean Δ':>6} | {'p99 Δ':>5} | {'max Δ':>5}")
+    print("-" * 66)
+    for size in args.sizes:
+        if args.base:
+            base = Image.open(args.base).convert("RGB").resize((size, size), Image.LANCZOS)
+        else:
+            base = synthetic_frame(size)
+
+        pil_best, _, pil_out = _time(lambda: _place_cover_on_image_pil(base, cover), args.repeat)
+        np_best, _, np_out = _time(lambda: compositor.place_cover(base, cover), args.repeat)
+
+        diff = np.abs(np.asarray(pil_out, dtype=np.int16) - np.asarray(np_out, dtype=np.int16))
+        print(
+            f"{size:>6} | {pil_best * 1000:>9.1f} | {np_best * 1000:>9.1f} | "
+            f"{pil_best / np_best:>6.2f}x | {diff.mean():>6.3f} | "
+            f"{np.percentile(diff, 99):>5.0f} | {diff.max():>5d}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Benchmark: full-frame vs region-cropped cover edit (ATRA_EDIT_REGION).
+
+For each edit region it reports the bytes uploaded to images.edit (image +
+mask + cover), the local prep/blend time and two seam metrics:
+  drift   mean |Δ| against the original frame outside the notebook window
+          (the region the edit must not touch)
+  border  largest jump in mean brightness across the crop tile's border,
+          compared with the original frame (0 = no visible tile edge)
+
+Offline (default) the edit call is simulated: the sent image is re-rendered
+at the requested size with a slight global colour drift, as the model does,
+and the cover is pasted into the masked area. `--live` calls the real API
+(OPENAI_API_KEY) and adds the round-trip latency per region.
+
+Usage: python scripts/bench_edit_region.py [--live] [--repeat 3]
+                                           [--base frame.png] [--cover cover.png]
+                                           [--save-images DIR]
+"""
+
+import argparse
+import base64
+import os
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+import numpy as np
+from PIL import Image, ImageEnhance, ImageFilter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("OPENAI_API_KEY", "bench-offline")
+
+from bench_compositor import synthetic_cover, synthetic_frame  # noqa: E402
+
+from services import image_service  # noqa: E402
+from services.artifact import ImageArtifact  # noqa: E402
+
+REGIONS = ("full", "crop")
+
+
+def _simulated_edit(base: ImageArtifact, cover: ImageArtifact, mask: ImageArtifact, edit_prompt: str,
+                    size: str = "1024x1024") -> str:
+    """Stand-in for images.edit: global drift + cover pasted into the transparent mask."""
+    width, height = (int(v) for v in size.split("x"))
+    out = base.image.convert("RGB").resize((width, height), Image.LANCZOS)
+    out = ImageEnhance.Brightness(out).enhance(1.04).filter(ImageFilter.GaussianBlur(0.6))
+
+    editable = np.asarray(mask.image.convert("RGBA").resize((width, height)))[..., 3] < 128
+    ys, xs = np.nonzero(editable)
+    x0, y0, x1, y1 = xs.min(), ys.min(), xs.max() + 1, ys.max() + 1
+    pasted = cover.image.convert("RGB").resize((x1 - x0, y1 - y0), Image.LANCZOS)
+    out_arr = np.asarray(out).copy()
+    region = editable[y0:y1, x0:x1, None]
+    out_arr[y0:y1, x0:x1] = np.where(region, np.asarray(pasted), out_arr[y0:y1, x0:x1])
+
+    buffer = BytesIO()
+    Image.fromarray(out_arr).save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def _seams(original: Image.Image, edited: Image.Image, tile_box: tuple, box: tuple) -> tuple:
+    before = np.asarray(original, dtype=np.float32).mean(-1)
+    after = np.asarray(edited.convert("RGB").resize(original.size), dtype=np.float32).mean(-1)
+    delta = after - before
+
+    outside = np.ones_like(delta, dtype=bool)
+    left, top, right, bottom = tile_box
+    outside[top:bottom, left:right] = False
+    drift = float(np.abs(delta[outside]).mean())
+
+    # Brightness change just inside vs just outside each tile edge.
+    ring = 4
+    steps = [
+        abs(delta[top:top + ring, left:right].mean() - delta[top - ring:top, left:right].mean()),
+        abs(delta[bottom - ring:bottom, left:right].mean() - delta[bottom:bottom + ring, left:right].mean()),
+        abs(delta[top:bottom, left:left + ring].mean() - delta[top:bottom, left - ring:left].mean()),
+        abs(delta[top:bottom, right - ring:right].mean() - delta[top:bottom, right:right + ring].mean()),
+    ]
+    return drift, float(max(steps))
+
+
+def run_region(region: str, base: ImageArtifact, cover: Image.Image, repeat: int, live: bool) -> dict:
+    image_service.EDIT_REGION = region
+    sent = {}
+    request = image_service._request_cover_edit
+
+    def _recording_request(image, cover_png, mask, edit_prompt, size="1024x1024"):
+        sent.update(bytes=len(image) + len(cover_png) + len(mask), image=image.image.size, size=size)
+        started = time.perf_counter()
+        result = request(image, cover_png, mask, edit_prompt, size) if live else _simulated_edit(
+            image, cover_png, mask, edit_prompt, size
+        )
+        sent["api"] = sent.get("api", 0.0) + time.perf_counter() - started
+        return result
+
+    image_service._request_cover_edit = _recording_request
+    try:
+        totals, apis, edited = [], [], None
+        for _ in range(repeat):
+            sent["api"] = 0.0
+            started = time.perf_counter()
+            edited = image_service._edit_in_cover(base, cover, mode="adhd_spiral", day_items="coffee, keys, receipts")
+            edited.load()  # the full-frame path decodes lazily
+            totals.append(time.perf_counter() - started)
+            apis.append(sent["api"])
+    finally:
+        image_service._request_cover_edit = request
+
+    frame = base.image.convert("RGB")
+    box = image_service._center_cover_box(frame.size, cover.height / cover.width)
+    drift, border = _seams(frame, edited, image_service._edit_tile_box(frame.size, box), box)
+    local = [total - api for total, api in zip(totals, apis)]
+    return {
+        "region": region,
+        "sent_px": f"{sent['image'][0]}x{sent['image'][1]}",
+        "size": sent["size"],
+        "kib": sent["bytes"] / 1024,
+        "local_ms": min(local) * 1000,
+        "api_s": sorted(apis)[len(apis) // 2] if live else None,
+        "drift": drift,
+        "border": border,
+        "image": edited,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare full-frame and region-cropped cover edits.")
+    parser.add_argument("--live", action="store_true", help="Call the real images.edit API (costs money).")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--base", help="Base frame (default: synthetic 1024px flat-lay).")
+    parser.add_argument("--cover", help="Cover image (default: synthetic cover).")
+    parser.add_argument("--save-images", metavar="DIR", help="Write each region's result for visual inspection.")
+    args = parser.parse_args()
+
+    frame = Image.open(args.base).convert("RGB") if args.base else synthetic_frame(1024)
+    cover = Image.open(args.cover).convert("RGBA") if args.cover else synthetic_cover().convert("RGBA")
+    # Like the cached cover in production: an unmodified PNG on disk is sent byte-for-byte.
+    cover_file = tempfile.NamedTemporaryFile(suffix=".png", delete=False)
+    cover.save(cover_file, format="PNG")
+    cover_file.close()
+    cover = Image.open(cover_file.name)
+    base = ImageArtifact.from_image(frame, "PNG", filename="generated.png")
+
+    print(f"{'region':<6} | {'sent px':>9} | {'size':>9} | {'upload KiB':>10} | {'local ms':>8} | "
+          f"{'API s':>6} | {'drift':>6} | {'border':>6}")
+    print("-" * 84)
+    for region in REGIONS:
+        result = run_region(region, base, cover, args.repeat, args.live)
+        api = f"{result['api_s']:>6.1f}" if result["api_s"] is not None else f"{'-':>6}"
+        print(
+            f"{region:<6} | {result['sent_px']:>9} | {result['size']:>9} | {result['kib']:>10.1f} | "
+            f"{result['local_ms']:>8.1f} | {api} | {result['drift']:>6.2f} | {result['border']:>6.2f}"
+        )
+        if args.save_images:
+            os.makedirs(args.save_images, exist_ok=True)
+            result["image"].save(os.path.join(args.save_images, f"edit_{region}.png"))
+    os.remove(cover_file.name)
+    if not args.live:
+        print("\nOffline: the edit call is simulated; run with --live for API latency on real outputs.")
+
+
+if __name__ == "__main__":
+    main()
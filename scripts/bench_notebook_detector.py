@@ -0,0 +1,149 @@
+"""
+Benchmark: notebook detection vs the assumed centred 35% box.
+
+Synthetic frames with the notebook moved/resized the way the image model
+sometimes gets it wrong, on the default warm desk and on a dark wood desk
+(where a matte-black notebook barely stands out), plus one with no notebook
+at all. Each case is drawn with --seeds different clutter layouts. It
+reports detection time, median confidence, the worst overlap (IoU) with
+the true notebook of both the box generate_image would use and the fixed
+centred box, and what generate_image would do per seed: place the cover on
+the detected box, fall back to the centred box (implausible detection), or
+regenerate (confidence below ATRA_NOTEBOOK_MIN_CONFIDENCE).
+
+Detection only runs with ATRA_NOTEBOOK_DETECT=1; this bench measures it
+either way.
+
+Usage: python scripts/bench_notebook_detector.py [--repeat 3] [--size 1024] [--seeds 12]
+                                                 [--frame output/generated_image.jpg]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("OPENAI_API_KEY", "bench-offline")
+
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from bench_compositor import synthetic_frame  # noqa: E402
+
+from services import image_service, notebook_detector  # noqa: E402
+
+ASPECT = 1.5  # synthetic notebook/cover aspect (height / width)
+LIGHT_DESK = (90, 55, 30)
+DARK_DESK = (55, 37, 26)
+BLACK = (8, 8, 10)
+
+# (label, width ratio, (x offset, y offset) as fractions of the frame, desk colour, notebook colour)
+CASES = [
+    ("centred 35%", 0.35, (0.0, 0.0), LIGHT_DESK, (22, 20, 24)),
+    ("shifted right", 0.35, (0.15, 0.0), LIGHT_DESK, (22, 20, 24)),
+    ("shifted up-left", 0.35, (-0.12, -0.08), LIGHT_DESK, (22, 20, 24)),
+    ("nudged 5%", 0.35, (0.05, -0.04), LIGHT_DESK, (22, 20, 24)),
+    ("smaller 25%", 0.25, (0.05, 0.1), LIGHT_DESK, (22, 20, 24)),
+    ("larger 48%", 0.48, (0.0, 0.0), LIGHT_DESK, (22, 20, 24)),
+    ("near the edge", 0.30, (0.33, 0.0), LIGHT_DESK, (22, 20, 24)),
+    ("black, light desk", 0.35, (0.0, 0.0), LIGHT_DESK, BLACK),
+    ("dark desk", 0.35, (0.0, 0.0), DARK_DESK, (22, 20, 24)),
+    ("black, dark desk", 0.35, (0.0, 0.0), DARK_DESK, BLACK),
+    ("black, dark, nudged", 0.35, (0.05, -0.04), DARK_DESK, BLACK),
+    ("no notebook", 0.0001, (0.0, 0.0), LIGHT_DESK, (22, 20, 24)),
+    ("no notebook, dark", 0.0001, (0.0, 0.0), DARK_DESK, (22, 20, 24)),
+]
+
+
+def _truth(size: int, width_ratio: float, offset: tuple) -> tuple:
+    """Box synthetic_frame draws (PIL rectangles include their far edge)."""
+    book_w = int(size * width_ratio)
+    book_h = int(book_w * ASPECT)
+    x0 = (size - book_w) // 2 + int(size * offset[0])
+    y0 = (size - book_h) // 2 + int(size * offset[1])
+    return x0, y0, x0 + book_w + 1, y0 + book_h + 1
+
+
+def _iou(a: tuple, b: tuple) -> float:
+    ix = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union else 0.0
+
+
+def _decide(detection: notebook_detector.Detection, size: tuple) -> tuple:
+    """(box generate_image would use, action)."""
+    box, fallback = image_service._notebook_box(detection, size, ASPECT)
+    if fallback is None:
+        return box, "place"
+    if detection.confidence < image_service.NOTEBOOK_MIN_CONFIDENCE:
+        return box, "regen"
+    return box, "centre"
+
+
+def _time_detect(frame: Image.Image, repeat: int) -> tuple:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        detection = notebook_detector.detect(frame, ASPECT)
+        samples.append(time.perf_counter() - started)
+    return detection, min(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the notebook detector.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--size", type=int, default=1024)
+    parser.add_argument("--seeds", type=int, default=12, help="Clutter layouts per case.")
+    parser.add_argument("--frame", help="Also run on a real generated frame (e.g. output/generated_image.jpg).")
+    args = parser.parse_args()
+
+    print(
+        f"{'case':<20} | {'detect ms':>9} | {'conf p50':>8} | {'IoU used min':>12} | "
+        f"{'IoU centred':>11} | place / centre / regen"
+    )
+    print("-" * 100)
+    for label, width_ratio, offset, desk_color, book_color in CASES:
+        has_notebook = width_ratio >= notebook_detector.MIN_WIDTH
+        truth = _truth(args.size, width_ratio, offset)
+        timings, confidences, used_ious, centred_iou = [], [], [], 0.0
+        actions = {"place": 0, "centre": 0, "regen": 0}
+        for seed in range(args.seeds):
+            frame = synthetic_frame(args.size, width_ratio, offset, desk_color, book_color, seed=seed)
+            detection, seconds = _time_detect(frame, args.repeat)
+            box, action = _decide(detection, frame.size)
+            timings.append(seconds)
+            confidences.append(detection.confidence)
+            used_ious.append(_iou(box, truth))
+            centred_iou = _iou(image_service._center_cover_box(frame.size, ASPECT), truth)
+            actions[action] += 1
+
+        used = f"{min(used_ious):>12.3f}" if has_notebook else f"{'-':>12}"
+        centred = f"{centred_iou:>11.3f}" if has_notebook else f"{'-':>11}"
+        print(
+            f"{label:<20} | {min(timings) * 1000:>9.1f} | {float(np.median(confidences)):>8.2f} | "
+            f"{used} | {centred} | {actions['place']:>5} / {actions['centre']:>6} / {actions['regen']:>5}"
+        )
+
+    if args.frame:
+        frame = Image.open(args.frame).convert("RGB")
+        detection, seconds = _time_detect(frame, args.repeat)
+        box, action = _decide(detection, frame.size)
+        print(
+            f"\n{args.frame}: {seconds * 1000:.1f} ms, confidence {detection.confidence:.2f}, "
+            f"detected {detection.box} → {action} at {box}"
+        )
+
+    print(
+        f"\nATRA_NOTEBOOK_DETECT={int(image_service.NOTEBOOK_DETECT)} "
+        f"ATRA_NOTEBOOK_MIN_CONFIDENCE={image_service.NOTEBOOK_MIN_CONFIDENCE} "
+        f"ATRA_NOTEBOOK_MAX_SHIFT={image_service.NOTEBOOK_MAX_SHIFT} "
+        f"ATRA_NOTEBOOK_MAX_SCALE={image_service.NOTEBOOK_MAX_SCALE}"
+    )
+
+
+if __name__ == "__main__":
+    main()
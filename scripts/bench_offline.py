@@ -0,0 +1,293 @@
+"""
+Offline end-to-end benchmark: ATRA against local stand-ins for every service.
+
+Starts the stand-ins from scripts/offline_standins.py (OpenAI, Cloudinary +
+CDN, journal cover, Make.com, Google Sheets, TikTok) with configurable
+latency distributions and error rates, then runs each scenario in a fresh
+interpreter inside a scratch directory:
+
+  run_once  – `main.run_once()` repeated --repeat times
+  batch     – `main.run_batch(--batch, --workers)`
+  tiktok    – `scripts/post_to_tiktok.py --dir ... --poll` over --tiktok-videos files
+
+and reports wall time, per-run latency (p50/p95), throughput, CPU time and
+peak RSS, plus request counts per stand-in endpoint. Results are saved as
+JSON; pass --compare to diff against an earlier result.
+
+Usage:
+  python scripts/bench_offline.py [--scenarios run_once batch tiktok] [--scale 0.1]
+                                  [--error-rate 0.02] [--profile latencies.json]
+                                  [--save out.json] [--compare baseline.json]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+RESULT_MARKER = "BENCH_RESULT "
+SCENARIOS = ("run_once", "batch", "tiktok")
+RESULTS_DIR = os.path.join(ROOT, "output", "benchmarks")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark ATRA offline against local service stand-ins.")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--repeat", type=int, default=3, help="run_once: sequential runs. Defaults to 3.")
+    parser.add_argument("--batch", type=int, default=6, help="batch: posts per batch. Defaults to 6.")
+    parser.add_argument("--workers", type=int, default=3, help="batch/tiktok: concurrent workers. Defaults to 3.")
+    parser.add_argument("--tiktok-videos", type=int, default=3, help="tiktok: videos to post. Defaults to 3.")
+    parser.add_argument("--video-mb", type=float, default=12, help="tiktok: size of each video. Defaults to 12.")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every stand-in latency (0.1 = quick run).")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Default injected error rate per request.")
+    parser.add_argument("--profile", help="JSON {endpoint: {median, sigma, error_rate}} merged over the defaults.")
+    parser.add_argument("--seed", type=int, default=7, help="Seed for stand-in latency/error sampling.")
+    parser.add_argument("--save", help=f"Result file. Defaults to {os.path.relpath(RESULTS_DIR, ROOT)}/bench_<timestamp>.json.")
+    parser.add_argument("--compare", help="Earlier result file to diff against.")
+    parser.add_argument("--keep-workdir", action="store_true", help="Keep scratch dirs (logs, state/) for inspection.")
+    # Internal: executed in the child interpreter.
+    parser.add_argument("--worker", choices=("run_once", "batch"), help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+# -------------------------------------------------
+# Child side
+# -------------------------------------------------
+def run_worker(args: argparse.Namespace) -> None:
+    """Run a pipeline scenario in this (fresh) interpreter and print its result."""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from offline_standins import StandinSheetsClient
+
+    from services import ledger, sheet_service, telemetry
+
+    writer = sheet_service.SheetWriter(client=StandinSheetsClient(os.environ["ATRA_BENCH_SHEETS_URL"]))
+    sheet_service.use_writer(writer)
+    telemetry.enable()
+
+    import main
+
+    started = time.perf_counter()
+    if args.worker == "run_once":
+        for _ in range(args.repeat):
+            try:
+                main.run_once()
+            except Exception as exc:
+                print(f"❌ run failed: {exc}")
+    else:
+        main.run_batch(args.batch, workers=args.workers)
+    writer.flush()
+    wall = time.perf_counter() - started
+
+    runs = ledger.recent_runs(limit=10_000)
+    print(RESULT_MARKER + json.dumps({
+        "wall": wall,
+        "runs": len(runs),
+        "failures": sum(1 for run in runs if not run["posted"]),
+        "spans": telemetry.summarize(),
+    }))
+
+
+# -------------------------------------------------
+# Parent side
+# -------------------------------------------------
+def _load_profile(path: Optional[str]) -> Dict[str, Dict[str, float]]:
+    from offline_standins import DEFAULT_PROFILE
+
+    profile = {name: dict(spec) for name, spec in DEFAULT_PROFILE.items()}
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            for name, spec in json.load(f).items():
+                profile.setdefault(name, {}).update(spec)
+    return profile
+
+
+def _run_child(command: List[str], env: Dict[str, str], workdir: str) -> Dict[str, Any]:
+    """Run `command`, returning wall time, CPU time, peak RSS and its result line."""
+    log_path = os.path.join(workdir, "output.log")
+    with open(log_path, "w") as log:
+        started = time.perf_counter()
+        process = subprocess.Popen(command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(process.pid, 0)
+        wall = time.perf_counter() - started
+        process.returncode = os.waitstatus_to_exitcode(status)
+
+    # ru_maxrss is KiB on Linux, bytes on macOS.
+    peak_mb = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    measured = {
+        "exit_code": process.returncode,
+        "wall": wall,
+        "cpu_user": usage.ru_utime,
+        "cpu_sys": usage.ru_stime,
+        "peak_rss_mb": peak_mb,
+        "log": log_path,
+    }
+    with open(log_path, "r", errors="replace") as f:
+        for line in f:
+            if line.startswith(RESULT_MARKER):
+                measured["result"] = json.loads(line[len(RESULT_MARKER):])
+    return measured
+
+
+def _make_videos(directory: str, count: int, size_mb: float) -> None:
+    os.makedirs(directory, exist_ok=True)
+    block = os.urandom(1024 * 1024)
+    for index in range(count):
+        with open(os.path.join(directory, f"clip_{index + 1}.mp4"), "wb") as f:
+            remaining = int(size_mb * 1024 * 1024)
+            while remaining > 0:
+                f.write(block[:remaining])
+                remaining -= len(block)
+        with open(os.path.join(directory, f"clip_{index + 1}.txt"), "w") as f:
+            f.write(f"Offline benchmark clip {index + 1}")
+
+
+def run_scenario(name: str, args: argparse.Namespace, standins, base_env: Dict[str, str]) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix=f"atra-bench-{name}-")
+    env = dict(base_env)
+    script = os.path.abspath(__file__)
+
+    if name == "run_once":
+        command = [sys.executable, script, "--worker", "run_once", "--repeat", str(args.repeat)]
+    elif name == "batch":
+        command = [sys.executable, script, "--worker", "batch", "--batch", str(args.batch), "--workers", str(args.workers)]
+    else:
+        videos = os.path.join(workdir, "videos")
+        _make_videos(videos, args.tiktok_videos, args.video_mb)
+        command = [
+            sys.executable, os.path.join(ROOT, "scripts", "post_to_tiktok.py"),
+            "--dir", videos, "--poll", "--workers", str(args.workers),
+            "--results", os.path.join(workdir, "tiktok_results.json"),
+        ]
+
+    standins.reset_counts()
+    measured = _run_child(command, env, workdir)
+    measured["requests"] = standins.request_counts()
+
+    result = measured.pop("result", None)
+    if name == "tiktok":
+        results_path = os.path.join(workdir, "tiktok_results.json")
+        entries = {}
+        if os.path.isfile(results_path):
+            with open(results_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        published = sum(1 for entry in entries.values() if entry.get("status") == "PUBLISH_COMPLETE")
+        measured["runs"] = args.tiktok_videos
+        measured["failures"] = args.tiktok_videos - published
+        measured["spans"] = {}
+        measured["run_latency"] = None
+    else:
+        result = result or {"runs": 0, "failures": args.repeat if name == "run_once" else args.batch, "spans": {}}
+        measured["runs"] = result["runs"]
+        measured["failures"] = result["failures"]
+        measured["spans"] = result["spans"]
+        run_span = result["spans"].get("run")
+        measured["run_latency"] = {"p50": run_span["p50"], "p95": run_span["p95"], "max": run_span["max"]} if run_span else None
+
+    measured["throughput_per_min"] = measured["runs"] / measured["wall"] * 60 if measured["wall"] else 0.0
+    if measured["exit_code"] != 0 or measured["failures"]:
+        print(f"⚠️ {name}: exit {measured['exit_code']}, {measured['failures']} failure(s) – see {measured['log']}")
+    if args.keep_workdir:
+        measured["workdir"] = workdir
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+        measured.pop("log")
+    return measured
+
+
+def print_report(results: Dict[str, Dict[str, Any]]) -> None:
+    print(f"\n{'scenario':<10} {'runs':>5} {'fail':>5} {'wall s':>8} {'p50 s':>7} {'p95 s':>7} "
+          f"{'per min':>8} {'cpu s':>7} {'peak MB':>8}")
+    for name, r in results.items():
+        latency = r.get("run_latency") or {}
+        p50 = f"{latency['p50']:.2f}" if latency else "-"
+        p95 = f"{latency['p95']:.2f}" if latency else "-"
+        print(
+            f"{name:<10} {r['runs']:>5} {r['failures']:>5} {r['wall']:>8.2f} {p50:>7} {p95:>7} "
+            f"{r['throughput_per_min']:>8.2f} {r['cpu_user'] + r['cpu_sys']:>7.2f} {r['peak_rss_mb']:>8.1f}"
+        )
+    for name, r in results.items():
+        if r.get("spans"):
+            print(f"\n{name}: slowest spans (p50 / p95)")
+            top = sorted(r["spans"].items(), key=lambda item: -item[1]["p50"])[:8]
+            for span, stats in top:
+                print(f"   {span:<28} {stats['p50']:>7.2f}s {stats['p95']:>7.2f}s  ×{stats['count']}")
+
+
+def print_comparison(results: Dict[str, Dict[str, Any]], baseline_path: str) -> None:
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["scenarios"]
+
+    def delta(new: float, old: float) -> str:
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    print(f"\nvs {baseline_path}")
+    print(f"{'scenario':<10} {'wall':>9} {'p50':>9} {'cpu':>9} {'peak MB':>9}")
+    for name, r in results.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+        new_p50 = (r.get("run_latency") or {}).get("p50", 0)
+        old_p50 = (old.get("run_latency") or {}).get("p50", 0)
+        print(
+            f"{name:<10} {delta(r['wall'], old['wall']):>9} {delta(new_p50, old_p50):>9} "
+            f"{delta(r['cpu_user'] + r['cpu_sys'], old['cpu_user'] + old['cpu_sys']):>9} "
+            f"{delta(r['peak_rss_mb'], old['peak_rss_mb']):>9}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    if args.worker:
+        run_worker(args)
+        return
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from offline_standins import Standins
+
+    profile = _load_profile(args.profile)
+    standins = Standins(profile, scale=args.scale, error_rate=args.error_rate, seed=args.seed)
+    env = dict(os.environ)
+    env.update(standins.env())
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")]))
+    for key in ("ATRA_RESPONSE_CACHE", "ATRA_TELEMETRY_DIR"):
+        env.pop(key, None)
+
+    print(f"🧪 Offline benchmark – stand-ins up (latency scale {args.scale:g}, error rate {args.error_rate:g})")
+    results = {}
+    try:
+        for name in args.scenarios:
+            print(f"▶️ {name} ...")
+            results[name] = run_scenario(name, args, standins, env)
+    finally:
+        standins.close()
+
+    print_report(results)
+    if args.compare:
+        print_comparison(results, args.compare)
+
+    save_path = args.save or os.path.join(RESULTS_DIR, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(save_path) or ".", exist_ok=True)
+    with open(save_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "created_at": datetime.now().isoformat(),
+            "settings": {
+                key: getattr(args, key)
+                for key in ("scenarios", "repeat", "batch", "workers", "tiktok_videos", "video_mb", "scale", "error_rate", "seed")
+            },
+            "profile": profile,
+            "scenarios": results,
+        }, f, indent=2)
+    print(f"\n💾 Saved results to {save_path}")
+
+
+if __name__ == "__main__":
+    main()
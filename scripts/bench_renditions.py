@@ -0,0 +1,101 @@
+"""
+Benchmark: platform renditions vs the single square JPEG encode.
+
+Compares, on one decoded source frame:
+  baseline     generate_image's encode (1024² JPEG, q90, 4:4:4, optimize)
+  serial       every rendition encoded one after another in this process
+  pool         every rendition through the shared process pool (warm)
+and reports wall time plus per-rendition size and chosen quality, with and
+without progressive JPEG. The pool's cold start (worker spawn) is reported
+separately; in the pipeline it's paid once per process.
+
+Usage: python scripts/bench_renditions.py [--repeat 3] [--base frame.png]
+                                          [--workers N] [--noise 12]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_compositor import synthetic_frame  # noqa: E402
+
+from services import rendition_service  # noqa: E402
+from services.artifact import ImageArtifact  # noqa: E402
+
+
+def _best(func, repeat: int):
+    samples, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - started)
+    return min(samples), result
+
+
+def _serial(artifact: ImageArtifact, progressive: bool) -> dict:
+    source = artifact.image.convert("RGB")
+    raw = source.tobytes()
+    return {
+        name: rendition_service._render(raw, source.mode, source.size, name, spec, progressive)[1:]
+        for name, spec in rendition_service.RENDITIONS.items()
+    }
+
+
+def _pool(artifact: ImageArtifact, progressive: bool) -> dict:
+    results = rendition_service.render_all(artifact, progressive=progressive)
+    return {name: (a.data, None) for name, a in results.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the multi-rendition encoder.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--base", help="Source frame (default: synthetic 1024px flat-lay).")
+    parser.add_argument("--workers", type=int, default=rendition_service.WORKERS, help="Process pool size.")
+    parser.add_argument("--noise", type=float, default=12.0,
+                        help="Gaussian noise added to the synthetic frame so budgets actually bind.")
+    args = parser.parse_args()
+
+    if args.base:
+        frame = Image.open(args.base).convert("RGB")
+    else:
+        rng = np.random.default_rng(3)
+        pixels = np.asarray(synthetic_frame(1024), dtype=np.float32)
+        pixels += rng.normal(0, args.noise, pixels.shape)
+        frame = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    artifact = ImageArtifact.from_image(frame, "PNG", filename="source.png")
+    artifact.image.load()
+    rendition_service.WORKERS = max(1, args.workers)
+
+    print(f"CPUs: {os.cpu_count()} · pool workers: {rendition_service.WORKERS} · renditions: "
+          + ", ".join(f"{n} {s.width}x{s.height} ≤{s.max_bytes // 1024} KiB"
+                      for n, s in rendition_service.RENDITIONS.items()))
+
+    base_s, base_art = _best(
+        lambda: ImageArtifact.from_image(frame, "JPEG", quality=90, subsampling=0, optimize=True), args.repeat
+    )
+    print(f"\nbaseline   {base_s * 1000:8.1f} ms   1024x1024 {len(base_art) / 1024:7.0f} KiB")
+
+    started = time.perf_counter()
+    rendition_service.render_all(artifact)
+    print(f"pool cold  {(time.perf_counter() - started) * 1000:8.1f} ms   (worker spawn + first encode)")
+
+    print(f"\n{'variant':<22} {'wall ms':>8}   " + "   ".join(f"{name:>16}" for name in rendition_service.RENDITIONS))
+    for progressive in (False, True):
+        label = "progressive" if progressive else "baseline JPEG"
+        serial_s, serial = _best(lambda: _serial(artifact, progressive), args.repeat)
+        pool_s, _ = _best(lambda: _pool(artifact, progressive), args.repeat)
+        cells = "   ".join(f"{len(data) / 1024:>9.0f} KiB q{quality:<3}" for data, quality in serial.values())
+        print(f"{'serial · ' + label:<22} {serial_s * 1000:>8.1f}   {cells}")
+        print(f"{'pool · ' + label:<22} {pool_s * 1000:>8.1f}   (same bytes; {serial_s / pool_s:.2f}x vs serial)")
+    rendition_service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Import-time budget check for ATRA entry points.
+
+Runs each entry point's import in a fresh interpreter with `-X importtime`,
+parses the cumulative timings and fails (exit 1) if an entry point imports
+a heavy module it shouldn't, or exceeds its time budget.
+
+Usage:
+  python scripts/check_import_time.py [--scale 1.0] [--runs 3] [--top 8]
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Heavy dependencies that only the pipeline stages themselves should load.
+HEAVY_MODULES = (
+    "openai", "httpx", "PIL", "numpy", "gspread", "google.oauth2",
+    "cloudinary", "requests",
+)
+
+# entry point -> (python code to run, heavy modules it may import, budget in ms)
+ENTRY_POINTS: Dict[str, Tuple[str, Tuple[str, ...], float]] = {
+    # main.py import covers the mood engine, batch planner and ledger paths.
+    "main": ("import main", (), 100),
+    "main --help": ("import main\ntry:\n    main.parse_args(['--help'])\nexcept SystemExit:\n    pass", (), 100),
+    "tiktok script": (
+        "import runpy; runpy.run_path('scripts/post_to_tiktok.py', run_name='check')",
+        ("requests",),
+        300,
+    ),
+}
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def import_profile(code: str) -> Tuple[int, List[Tuple[str, int]]]:
+    """(total µs, [(top-level module, cumulative µs)]) for running `code` cold."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"'{code}' failed:\n{result.stderr[-2000:]}")
+
+    modules = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match and len(match.group(3)) == 1:  # directly imported by the entry code
+            modules.append((match.group(4), int(match.group(2))))
+    # Interpreter startup (site, encodings) is the same for every run; leave it out.
+    total = sum(us for name, us in modules if name not in {"site", "encodings"})
+    return total, modules
+
+
+def loaded_modules(code: str) -> set:
+    check = f"{code}\nimport sys\nprint('\\n'.join(sys.modules))"
+    result = subprocess.run([sys.executable, "-c", check], cwd=ROOT, capture_output=True, text=True)
+    return set(result.stdout.splitlines())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check ATRA's cold-start import budget.")
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=float(os.getenv("ATRA_IMPORT_BUDGET_SCALE", "1.0")),
+        help="Multiply every entry point's budget (slow CI runners). Defaults to 1.0.",
+    )
+    parser.add_argument("--runs", type=int, default=3, help="Cold runs per entry point; the fastest counts.")
+    parser.add_argument("--top", type=int, default=8, help="Slowest imports to list per entry point.")
+    args = parser.parse_args()
+
+    failures = []
+    for name, (code, allowed, budget_ms) in ENTRY_POINTS.items():
+        budget_ms *= args.scale
+        profiles = [import_profile(code) for _ in range(max(1, args.runs))]
+        total, modules = min(profiles, key=lambda p: p[0])
+        heavy = sorted(
+            module for module in loaded_modules(code)
+            if module in HEAVY_MODULES and module not in allowed
+        )
+
+        status = "✅"
+        if total / 1000 > budget_ms:
+            status = "❌"
+            failures.append(f"{name}: {total / 1000:.1f}ms > {budget_ms:g}ms budget")
+        if heavy:
+            status = "❌"
+            failures.append(f"{name}: eagerly imports {', '.join(heavy)}")
+
+        print(f"{status} {name}: {total / 1000:.1f}ms (budget {budget_ms:g}ms)")
+        for module, us in sorted(modules, key=lambda m: -m[1])[:args.top]:
+            print(f"     {us / 1000:7.1f}ms  {module}")
+
+    if failures:
+        print("\nImport budget exceeded:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\nAll entry points within the import budget.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Query the local ATRA ledger (state/atra_ledger.sqlite3).
+
+Usage:
+  python scripts/ledger_query.py modes [--days 30]
+  python scripts/ledger_query.py daily [--days 30]
+  python scripts/ledger_query.py recent [--limit 10]
+  python scripts/ledger_query.py sync
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv  # noqa: E402
+
+from services import ledger  # noqa: E402
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Query the local ATRA content ledger.")
+    parser.add_argument("--db", default=ledger.LEDGER_PATH, help="Ledger database path.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    modes = sub.add_parser("modes", help="Joanie mode counts.")
+    modes.add_argument("--days", type=int, default=30)
+
+    daily = sub.add_parser("daily", help="Runs and successful posts per day.")
+    daily.add_argument("--days", type=int, default=30)
+
+    recent = sub.add_parser("recent", help="Most recent runs.")
+    recent.add_argument("--limit", type=int, default=10)
+
+    sub.add_parser("sync", help="Push unsynced runs to the Sheet's ledger worksheet.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    load_dotenv()
+    args = parse_args()
+    started = time.perf_counter()
+
+    if args.command == "modes":
+        rows = ledger.mode_counts(args.days, path=args.db)
+        print(f"Mode counts, last {args.days} days:")
+        for mode, count in rows:
+            print(f"  {mode:<26} {count}")
+    elif args.command == "daily":
+        rows = ledger.posts_by_day(args.days, path=args.db)
+        print(f"Posts by day, last {args.days} days (runs / posted):")
+        for day, runs, posted in rows:
+            print(f"  {day}  {runs:>3} / {posted or 0:>3}")
+    elif args.command == "recent":
+        for run in ledger.recent_runs(args.limit, path=args.db):
+            status = "posted" if run["posted"] else f"failed: {run['error'] or 'webhook'}"
+            print(f"  {run['created_at'][:19]}  {run['mode']:<24} {status}  {run['image_url'] or '-'}")
+    elif args.command == "sync":
+        count = ledger.sync_to_sheet(path=args.db)
+        print(f"Sent {count} row(s) to the Sheet.")
+
+    print(f"({(time.perf_counter() - started) * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,57 +1,118 @@
 import argparse
 import os
 import sys
-import time
 
 from dotenv import load_dotenv
 
-from services.tiktok import DEFAULT_PRIVACY_LEVEL, PRIVACY_LEVELS, TikTokPoster
+from services.tiktok import DEFAULT_CHUNK_SIZE, DEFAULT_PRIVACY_LEVEL, PRIVACY_LEVELS, TikTokPoster
+from services.tiktok.bulk import RESULTS_FILENAME, load_jobs_from_dir, load_jobs_from_manifest, run_bulk
+from services.tiktok.tracker import DEFAULT_TIMEOUT, TERMINAL_STATUSES, track_publish_ids
 
 
 def parse_args() -> argparse.Namespace:
-    parser = argparse.ArgumentParser(description="Post a single MP4 to TikTok via Direct Post.")
-    parser.add_argument("--video", required=True, help="Path to the MP4 file to upload.")
-    parser.add_argument("--caption", required=True, help="Caption/title for the TikTok post.")
+    parser = argparse.ArgumentParser(description="Post MP4s to TikTok via Direct Post.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--video", help="Path to the MP4 file to upload.")
+    source.add_argument("--dir", help="Post every MP4 in this directory (captions from <name>.txt sidecars).")
+    source.add_argument("--manifest", help='JSON list of {"video", "caption", "privacy"} entries to post.')
+    parser.add_argument(
+        "--caption",
+        help="Caption/title for the TikTok post. Required with --video; the fallback caption with --dir.",
+    )
     parser.add_argument(
         "--privacy",
         default=DEFAULT_PRIVACY_LEVEL,
         choices=sorted(PRIVACY_LEVELS),
         help="TikTok privacy level. Defaults to SELF_ONLY.",
     )
+    parser.add_argument(
+        "--chunk-size-mb",
+        type=float,
+        default=DEFAULT_CHUNK_SIZE / (1024 * 1024),
+        help="Upload chunk size in MB (clamped to TikTok's 5–64 MB rules). Defaults to 10.",
+    )
     parser.add_argument(
         "--poll",
         action="store_true",
-        help="Poll status up to 10 times with 3s intervals until completion or failure.",
+        help="Track publish status (adaptive backoff per phase) until completion or failure.",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--poll-timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        help="Give up polling after this many seconds. Defaults to 600.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=3,
+        help="Concurrent uploads for --dir/--manifest. Defaults to 3.",
+    )
+    parser.add_argument(
+        "--results",
+        default=RESULTS_FILENAME,
+        help=f"Results manifest for --dir/--manifest; reruns skip videos already published. Defaults to {RESULTS_FILENAME}.",
+    )
+    args = parser.parse_args()
+    if args.video and not args.caption:
+        parser.error("--caption is required with --video")
+    return args
+
+
+def main_bulk(args: argparse.Namespace) -> None:
+    if args.dir:
+        jobs = load_jobs_from_dir(args.dir, default_caption=args.caption)
+    else:
+        jobs = load_jobs_from_manifest(args.manifest)
+    missing = [job["video"] for job in jobs if not os.path.isfile(job["video"])]
+    if missing:
+        print(f"Video(s) not found: {', '.join(missing)}")
+        sys.exit(1)
+    if not jobs:
+        print("No videos to post.")
+        return
+
+    print(f"Posting {len(jobs)} video(s) with {args.workers} worker(s)...")
+    results = run_bulk(
+        jobs,
+        results_path=args.results,
+        workers=args.workers,
+        privacy_level=args.privacy,
+        chunk_size=int(args.chunk_size_mb * 1024 * 1024),
+        poll=args.poll,
+        poll_timeout=args.poll_timeout,
+    )
+    failed = [video for video, entry in results.items() if entry.get("status") in ("FAILED", "ERROR")]
+    print(f"Done. Results written to {args.results} ({len(failed)} failed).")
+    if failed:
+        sys.exit(1)
 
 
 def main() -> None:
     load_dotenv()
     args = parse_args()
+    if not args.video:
+        main_bulk(args)
+        return
 
     video_path = os.path.abspath(args.video)
     if not os.path.isfile(video_path):
         print(f"Video not found: {video_path}")
         sys.exit(1)
 
-    with open(video_path, "rb") as file_handle:
-        video_bytes = file_handle.read()
-    video_size = len(video_bytes)
+    video_size = os.path.getsize(video_path)
 
     print(f"Preparing TikTok upload for {video_path} ({video_size} bytes)")
     poster = TikTokPoster()
 
-    print("Initializing Direct Post upload session...")
-    publish_id, upload_url = poster.init_post(
-        video_size=video_size,
+    print("Initializing Direct Post upload session and streaming chunks...")
+    publish_id = poster.post_file(
+        video_path,
         caption=args.caption,
         privacy_level=args.privacy,
+        chunk_size=int(args.chunk_size_mb * 1024 * 1024),
     )
     print(f"Publish ID: {publish_id}")
-
-    print("Uploading video...")
-    poster.upload_video(upload_url=upload_url, video_bytes=video_bytes, video_size=video_size)
     print("Upload request completed.")
 
     def print_status(step: str, info: dict) -> None:
@@ -70,13 +131,17 @@ def main() -> None:
     status_info = poster.fetch_status(publish_id)
     print_status("Status", status_info)
 
-    if args.poll:
-        for attempt in range(1, 11):
-            if status_info.get("status") in ("PUBLISH_COMPLETE", "FAILED"):
-                break
-            time.sleep(3)
-            status_info = poster.fetch_status(publish_id)
-            print_status(f"Poll {attempt}", status_info)
+    if args.poll and status_info.get("status") not in TERMINAL_STATUSES:
+        polls = {"count": 0}
+
+        def on_update(_publish_id: str, info: dict) -> None:
+            polls["count"] += 1
+            print_status(f"Poll {polls['count']}", info)
+
+        results = track_publish_ids(poster, [publish_id], timeout=args.poll_timeout, on_update=on_update)
+        final = results[publish_id]
+        if final.get("status") == "ERROR":
+            print(f"Polling stopped: {final.get('fail_reason')}")
 
     print("Done.")
 
@@ -0,0 +1,63 @@
+"""
+Summarize ATRA telemetry spans (state/telemetry/spans.jsonl).
+
+Usage:
+  python scripts/telemetry_report.py [--window 500] [--prom]
+  python scripts/telemetry_report.py --run <run_id>
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import telemetry  # noqa: E402
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="p50/p95 timings per stage and external call.")
+    parser.add_argument("--spans", default=telemetry.SPANS_PATH, help="Spans JSON-lines file.")
+    parser.add_argument("--window", type=int, default=telemetry.SUMMARY_WINDOW, help="Recent spans per name.")
+    parser.add_argument("--prom", action="store_true", help=f"Also rewrite {telemetry.PROM_PATH}.")
+    parser.add_argument("--run", metavar="RUN_ID", help="List the spans of one run instead.")
+    return parser.parse_args()
+
+
+def print_run(path: str, run_id: str) -> None:
+    with open(path, "r", encoding="utf-8") as f:
+        spans = [json.loads(line) for line in f if f'"{run_id}"' in line]
+    if not spans:
+        print(f"No spans for run {run_id}.")
+        return
+    for span in sorted(spans, key=lambda s: s["started_at"]):
+        retries = f" retries={span['retries']}" if span.get("retries") else ""
+        print(
+            f"{span['started_at'][11:23]}  {span['duration']:8.3f}s  {span['outcome']:<8} "
+            f"{span['name']}{retries}  (parent: {span.get('parent') or '-'})"
+        )
+
+
+def main() -> None:
+    args = parse_args()
+    if not os.path.isfile(args.spans):
+        print(f"No spans recorded yet ({args.spans}). Run with ATRA_TELEMETRY=1 or main.py --telemetry.")
+        return
+    if args.run:
+        print_run(args.spans, args.run)
+        return
+
+    summary = telemetry.summarize(args.spans, window=args.window)
+    print(f"{'span':<28} {'count':>6} {'p50':>9} {'p95':>9} {'max':>9} {'errors':>7} {'retries':>8}")
+    for name, stats in summary.items():
+        print(
+            f"{name:<28} {stats['count']:>6} {stats['p50']:>8.2f}s {stats['p95']:>8.2f}s "
+            f"{stats['max']:>8.2f}s {stats['errors']:>7} {stats['retries']:>8}"
+        )
+    if args.prom:
+        print(f"\nWrote {telemetry.export_prometheus(summary=summary)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Image Artifact
+In-memory image handed between the image, edit and upload stages.
+
+Carries the encoded bytes (what the OpenAI edit call and Cloudinary upload
+consume) together with the decoded PIL image (what compositing consumes),
+so neither side has to round-trip through `output/`.
+"""
+
+import os
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Optional
+
+from PIL import Image
+
+_MIMETYPES = {"PNG": "image/png", "JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+
+@dataclass
+class ImageArtifact:
+    data: bytes
+    format: str = "PNG"
+    filename: str = "image.png"
+    _image: Optional[Image.Image] = field(default=None, repr=False, compare=False)
+
+    @classmethod
+    def from_image(
+        cls,
+        image: Image.Image,
+        format: str = "PNG",
+        filename: Optional[str] = None,
+        **save_kwargs,
+    ) -> "ImageArtifact":
+        """
+        Encode `image` once. An unmodified PNG opened from disk reuses its
+        file bytes instead of being re-encoded.
+        """
+        format = format.upper()
+        filename = filename or f"image.{'jpg' if format == 'JPEG' else format.lower()}"
+
+        source = getattr(image, "filename", "")
+        if format == "PNG" and image.format == "PNG" and source and os.path.isfile(source) and not save_kwargs:
+            with open(source, "rb") as f:
+                return cls(f.read(), format, filename, image)
+
+        buffer = BytesIO()
+        image.save(buffer, format=format, **save_kwargs)
+        return cls(buffer.getvalue(), format, filename, image)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, filename: str = "image.png") -> "ImageArtifact":
+        """Wrap already-encoded bytes (e.g. a decoded b64_json API response)."""
+        image = Image.open(BytesIO(data))
+        return cls(data, image.format or "PNG", filename, image)
+
+    @property
+    def image(self) -> Image.Image:
+        """Decoded image (decoded lazily, then kept)."""
+        if self._image is None:
+            self._image = Image.open(BytesIO(self.data))
+        return self._image
+
+    @property
+    def mimetype(self) -> str:
+        return _MIMETYPES.get(self.format, "application/octet-stream")
+
+    def as_upload(self) -> tuple:
+        """(filename, bytes, mimetype) tuple accepted by the OpenAI SDK for file params."""
+        return self.filename, self.data, self.mimetype
+
+    def save(self, path: str) -> str:
+        """Write the encoded bytes to `path` (debugging/archiving only)."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(self.data)
+        return path
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __str__(self) -> str:
+        return f"<{self.filename} {self.format} {len(self.data) / 1024:.0f} KiB in memory>"
@@ -0,0 +1,251 @@
+"""
+Capability Cache
+Persisted per-model, per-endpoint health for the OpenAI fallback paths.
+
+generate_image falls back from IMAGE_MODEL to gpt-image-1, the cover edit
+from two input images to one, and the edit itself to the local overlay.
+Without memory, a deprecated model or an unsupported parameter costs a
+failed round-trip on every run. Each tracked call records its outcome in
+state/capabilities.json (file-locked, atomically replaced), keyed
+"endpoint:model[:variant]":
+
+  unsupported  400 "not supported"/unknown parameter, 404 unknown model
+               → skipped for UNSUPPORTED_TTL
+  auth         401/403 (key revoked, org not verified for the model)
+               → skipped for AUTH_TTL, then one real call is the trial
+  transient    429, 5xx, timeouts, connection errors → circuit breaker:
+               BREAKER_THRESHOLD consecutive failures open it for
+               BREAKER_COOLDOWN; the next call after that is the trial
+               (one more failure re-opens it, a success closes it)
+
+Other errors (content policy, bad prompt) say nothing about the backend
+and are not recorded. Callers check `available()` before an optional path
+and wrap calls in `track()`; the last resort of a fallback chain is always
+attempted.
+
+Skipped unknown-model failures (404) are re-probed in a background thread
+with the free `models.retrieve` call at most every PROBE_INTERVAL: if the
+model exists again its record is cleared, otherwise the skip is extended.
+A successful retrieve doesn't prove this key may use the model, so 401/403
+records are never cleared by it; like parameter-level records they expire.
+
+ATRA_CAPABILITY_CACHE=0 turns skipping and recording off.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Set
+
+from services import filestore
+
+STATE_FILE = os.getenv("ATRA_CAPABILITY_STATE", "state/capabilities.json")
+ENABLED = os.getenv("ATRA_CAPABILITY_CACHE", "1").strip() not in {"0", "false", "False"}
+UNSUPPORTED_TTL = float(os.getenv("ATRA_CAPABILITY_UNSUPPORTED_TTL", str(7 * 24 * 3600)))
+AUTH_TTL = float(os.getenv("ATRA_CAPABILITY_AUTH_TTL", str(6 * 3600)))
+BREAKER_THRESHOLD = int(os.getenv("ATRA_CAPABILITY_BREAKER_THRESHOLD", "3"))
+BREAKER_COOLDOWN = float(os.getenv("ATRA_CAPABILITY_BREAKER_COOLDOWN", "600"))
+PROBE_INTERVAL = float(os.getenv("ATRA_CAPABILITY_PROBE_INTERVAL", "3600"))
+
+# Lower-cased fragments of 400-class messages that mean "this model/endpoint can't do that".
+_UNSUPPORTED_HINTS = (
+    "not supported",
+    "unsupported",
+    "does not support",
+    "unknown parameter",
+    "unrecognized request argument",
+    "does not exist",
+    "model_not_found",
+    "deprecated",
+)
+# Failures a models.retrieve probe can clear (the model itself is missing).
+_PROBE_CODES = {404}
+
+_probing_lock = threading.Lock()
+_probing: Set[str] = set()
+
+
+def _read(path: str) -> Dict[str, Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            records = json.load(f).get("capabilities", {})
+        return records if isinstance(records, dict) else {}
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def _write(path: str, records: Dict[str, Dict[str, Any]]) -> None:
+    filestore.atomic_write_json(path, {"capabilities": records}, indent=2, sort_keys=True)
+
+
+def _update(key: str, change: Callable[[Optional[Dict[str, Any]]], Optional[Dict[str, Any]]],
+            path: str = STATE_FILE) -> Optional[Dict[str, Any]]:
+    """Locked read-modify-write of one record (`change` returns None to delete it)."""
+    with filestore.locked(path):
+        records = _read(path)
+        record = change(records.get(key))
+        if record is None:
+            records.pop(key, None)
+        else:
+            records[key] = record
+        _write(path, records)
+        return record
+
+
+def capability_key(endpoint: str, model: str, variant: Optional[str] = None) -> str:
+    return ":".join(part for part in (endpoint, model, variant) if part)
+
+
+def records(path: str = STATE_FILE) -> Dict[str, Dict[str, Any]]:
+    """Every recorded capability (a torn/missing file reads as empty)."""
+    return _read(path)
+
+
+# -------------------------------------------------
+# Classification
+# -------------------------------------------------
+def _status(exc: BaseException) -> Optional[int]:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status
+
+
+def classify(exc: BaseException) -> Optional[str]:
+    """Failure kind: "unsupported", "auth", "transient", or None (says nothing about the backend)."""
+    status = _status(exc)
+    if status is None:
+        name = type(exc).__name__
+        return "transient" if ("Timeout" in name or "Connection" in name) else None
+
+    message = str(exc).lower()
+    if status in (401, 403):
+        return "auth"
+    if status == 404:
+        return "unsupported"
+    if status in (400, 422) and any(hint in message for hint in _UNSUPPORTED_HINTS):
+        return "unsupported"
+    if status in (408, 409, 429) or status >= 500:
+        return "transient"
+    return None
+
+
+# -------------------------------------------------
+# Recording
+# -------------------------------------------------
+def record_success(key: str, path: str = STATE_FILE) -> None:
+    if not ENABLED:
+        return
+    existing = _read(path).get(key)
+    if existing and existing.get("status") == "ok" and not existing.get("failures"):
+        return  # nothing to change; skip the locked write
+    _update(key, lambda _: {"status": "ok", "failures": 0, "until": 0, "updated": time.time()}, path)
+
+
+def record_failure(key: str, exc: BaseException, path: str = STATE_FILE) -> Optional[str]:
+    """Record a failed call; returns its classification (None = not recorded)."""
+    kind = classify(exc)
+    if not ENABLED or kind is None:
+        return kind
+    now = time.time()
+    error = f"{type(exc).__name__}: {exc}"[:300]
+    code = _status(exc)
+
+    def change(record: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        record = dict(record or {})
+        failures = int(record.get("failures", 0)) + 1
+        if kind == "unsupported":
+            until = now + UNSUPPORTED_TTL
+        elif kind == "auth":
+            until = now + AUTH_TTL
+        else:
+            until = now + BREAKER_COOLDOWN if failures >= BREAKER_THRESHOLD else 0
+        record.update(status=kind, failures=failures, until=until, code=code, error=error, updated=now)
+        return record
+
+    record = _update(key, change, path)
+    if record["until"] > now:
+        print(f"🩺 {key} marked {kind} for {(record['until'] - now) / 3600:.1f}h ({error[:120]})")
+    return kind
+
+
+def track(endpoint: str, model: str, call: Callable[[], Any], variant: Optional[str] = None,
+          path: str = STATE_FILE) -> Any:
+    """Run `call`, record its outcome under the capability key and return (or re-raise)."""
+    key = capability_key(endpoint, model, variant)
+    try:
+        result = call()
+    except Exception as exc:
+        try:
+            record_failure(key, exc, path)
+        except OSError as state_exc:
+            print(f"⚠️ Could not record capability {key}: {state_exc}")
+        raise
+    try:
+        record_success(key, path)
+    except OSError as state_exc:
+        print(f"⚠️ Could not record capability {key}: {state_exc}")
+    return result
+
+
+# -------------------------------------------------
+# Skipping + background re-probe
+# -------------------------------------------------
+def available(endpoint: str, model: str, variant: Optional[str] = None, path: str = STATE_FILE) -> bool:
+    """False while the path is known-bad (TTL or open breaker); the caller skips it."""
+    if not ENABLED:
+        return True
+    key = capability_key(endpoint, model, variant)
+    record = _read(path).get(key)
+    now = time.time()
+    if not record or float(record.get("until", 0)) <= now:
+        return True
+
+    print(f"⏭️ Skipping {key}: {record.get('status')} for another "
+          f"{(float(record['until']) - now) / 60:.0f} min ({str(record.get('error', ''))[:120]})")
+    if record.get("code") in _PROBE_CODES and now - float(record.get("probed", 0)) >= PROBE_INTERVAL:
+        _start_probe(key, model, path)
+    return False
+
+
+def _start_probe(key: str, model: str, path: str) -> None:
+    with _probing_lock:
+        if key in _probing:
+            return
+        _probing.add(key)
+    threading.Thread(target=_probe, args=(key, model, path), name=f"probe-{key}", daemon=True).start()
+
+
+def _probe(key: str, model: str, path: str) -> None:
+    """Check `model` with models.retrieve; clear a 404 record if it answers, extend it if not."""
+    from services import transport
+
+    try:
+        transport.openai_client().models.retrieve(model)
+        reachable, kind = True, None
+    except Exception as exc:
+        reachable, kind = False, classify(exc)
+
+    now = time.time()
+
+    def change(record: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if record is None:
+            return None
+        if reachable and record.get("code") in _PROBE_CODES:
+            return None  # the model exists again; the next call tries it
+        record = dict(record, probed=now)
+        if kind == "unsupported":
+            record["until"] = max(float(record.get("until", 0)), now + UNSUPPORTED_TTL)
+        elif kind == "auth":
+            record["until"] = max(float(record.get("until", 0)), now + AUTH_TTL)
+        return record
+
+    try:
+        _update(key, change, path)
+        print(f"🩺 Re-probed {model}: {'reachable, will retry ' + key if reachable else 'still unavailable'}")
+    except OSError as exc:
+        print(f"⚠️ Capability re-probe for {key} failed: {exc}")
+    finally:
+        with _probing_lock:
+            _probing.discard(key)
@@ -5,10 +5,7 @@
 # IG captions now automatically append the Amazon link.
 # FB captions remain unchanged.
 
-import os
-from openai import OpenAI
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from services import response_cache, transport
 
 # Explicit mood signals
 EXPLICIT_CAPTION_PHRASES = {
@@ -31,18 +28,45 @@ IMPLICIT_SCENTS = {
     "existentially_exhausted": "while questioning every life choice ever",
 }
 
+# Amazon CTA (always appended to IG captions, locally)
+AMAZON_CTA = (
+    "\n\n📖 Available now on Amazon 👇\n"
+    "https://a.co/d/5IG67WF"
+)
+
+
+def instagram_mood_hint(mode: str) -> str:
+    if mode in EXPLICIT_CAPTION_PHRASES:
+        return f"{EXPLICIT_CAPTION_PHRASES[mode][0]}. "
+    return f"{IMPLICIT_SCENTS[mode]}, "
+
+
+def facebook_mood_hint(mode: str) -> str:
+    if mode in EXPLICIT_CAPTION_PHRASES:
+        return EXPLICIT_CAPTION_PHRASES[mode][1]
+    return IMPLICIT_SCENTS[mode]
+
+
+def with_amazon_cta(caption: str) -> str:
+    return caption + AMAZON_CTA
+
+
 def _generate_caption(system_prompt: str, base_prompt: str, mode: str) -> str:
     """Internal helper for generating caption text."""
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
+    params = {
+        "model": "gpt-4o-mini",
+        "messages": [
             {"role": "system", "content": system_prompt.strip()},
             {"role": "user", "content": f"Prompt:\n{base_prompt}\nMode:\n{mode}"},
         ],
-        temperature=0.85,
-        max_tokens=120,
-    )
-    caption = response.choices[0].message.content.strip()
+        "temperature": 0.85,
+        "max_tokens": 120,
+    }
+    caption = response_cache.cached(
+        "chat",
+        params,
+        lambda: transport.openai_client().chat.completions.create(**params).choices[0].message.content,
+    ).strip()
     return caption.replace("\n", " ").strip()
 
 # -------------------------------------------------
@@ -59,10 +83,7 @@ def generate_instagram_caption(base_prompt: str, mode: str) -> str:
     """
 
     # Mood hint
-    if mode in EXPLICIT_CAPTION_PHRASES:
-        mood_hint = f"{EXPLICIT_CAPTION_PHRASES[mode][0]}. "
-    else:
-        mood_hint = f"{IMPLICIT_SCENTS[mode]}, "
+    mood_hint = instagram_mood_hint(mode)
 
     system_prompt = f"""
     You are Joanie writing Instagram captions for 'You Won't Believe This $H!T'.
@@ -80,13 +101,7 @@ def generate_instagram_caption(base_prompt: str, mode: str) -> str:
     # Base caption from GPT
     caption = _generate_caption(system_prompt, base_prompt, mode)
 
-    # Amazon CTA (always added)
-    amazon_block = (
-        "\n\n📖 Available now on Amazon 👇\n"
-        "https://a.co/d/5IG67WF"
-    )
-
-    return caption + amazon_block
+    return with_amazon_cta(caption)
 
 # -------------------------------------------------
 # FACEBOOK CAPTIONS (unchanged)
@@ -101,10 +116,7 @@ def generate_facebook_caption(base_prompt: str, mode: str) -> str:
     - No hashtags, no links
     """
 
-    if mode in EXPLICIT_CAPTION_PHRASES:
-        mood_hint = EXPLICIT_CAPTION_PHRASES[mode][1]
-    else:
-        mood_hint = IMPLICIT_SCENTS[mode]
+    mood_hint = facebook_mood_hint(mode)
 
     system_prompt = f"""
     You are Joanie writing Facebook captions for 'You Won't Believe This $H!T'.
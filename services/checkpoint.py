@@ -0,0 +1,175 @@
+"""
+Run Checkpoints
+Persists each pipeline stage's output under state/runs/<run_id>/ as it completes.
+
+manifest.json holds the run's mode, status and every completed stage output
+(prompt, captions, uploaded URL, post result); the generated image is kept
+next to it as a file. `main.py --resume` reloads a failed or incomplete run
+and re-runs only the stages that never completed, so a webhook or Sheets
+failure doesn't pay for a new image generation + edit + upload.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from services import filestore
+
+CHECKPOINT_DIR = os.getenv("ATRA_CHECKPOINT_DIR", "state/runs")
+# Completed runs are pruned after this many days; incomplete ones are kept.
+KEEP_DAYS = float(os.getenv("ATRA_CHECKPOINT_KEEP_DAYS", "7"))
+
+MANIFEST = "manifest.json"
+STATUS_RUNNING = "running"
+STATUS_FAILED = "failed"
+STATUS_COMPLETE = "complete"
+
+
+def stage_succeeded(name: str, value: Any) -> bool:
+    """
+    Whether a stage output counts as done. upload_asset returns None, and
+    update_sheet (no URL to log) and send_to_make_webhook return False, on
+    failure instead of raising.
+    """
+    if name in ("image_url", "sheet", "posted"):
+        return bool(value)
+    return True
+
+
+class RunCheckpoint:
+    """Checkpoint directory for one run."""
+
+    def __init__(self, run_id: str, root: str = CHECKPOINT_DIR) -> None:
+        self.run_id = run_id
+        self.path = os.path.join(root, run_id)
+        self._lock = threading.Lock()
+        self.manifest: Dict[str, Any] = {
+            "run_id": run_id,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "status": STATUS_RUNNING,
+            "mode": None,
+            "outputs": {},
+            "error": None,
+        }
+
+    @classmethod
+    def create(cls, run_id: str, mode: str, root: str = CHECKPOINT_DIR) -> "RunCheckpoint":
+        checkpoint = cls(run_id, root)
+        os.makedirs(checkpoint.path, exist_ok=True)
+        checkpoint.manifest["mode"] = mode
+        checkpoint._write()
+        return checkpoint
+
+    @classmethod
+    def load(cls, run_id: str, root: str = CHECKPOINT_DIR) -> "RunCheckpoint":
+        checkpoint = cls(run_id, root)
+        with open(os.path.join(checkpoint.path, MANIFEST), "r", encoding="utf-8") as f:
+            checkpoint.manifest = json.load(f)
+        return checkpoint
+
+    @property
+    def mode(self) -> str:
+        return self.manifest["mode"]
+
+    @property
+    def status(self) -> str:
+        return self.manifest["status"]
+
+    def _write(self) -> None:
+        self.manifest["updated_at"] = datetime.now(timezone.utc).isoformat()
+        filestore.atomic_write_json(os.path.join(self.path, MANIFEST), self.manifest, indent=2, ensure_ascii=False)
+
+    # -------------------------------------------------
+    # Stage outputs
+    # -------------------------------------------------
+    def save_stage(self, name: str, value: Any) -> None:
+        """Persist a completed stage output (failed uploads/posts are not recorded)."""
+        if not stage_succeeded(name, value):
+            return
+        from services.artifact import ImageArtifact
+
+        if isinstance(value, ImageArtifact):
+            stored = self._save_artifact(name, value)
+        elif isinstance(value, dict) and value and all(isinstance(v, ImageArtifact) for v in value.values()):
+            # e.g. renditions: {platform: artifact}
+            stored = {"artifacts": {key: self._save_artifact(f"{name}_{key}", v) for key, v in value.items()}}
+        else:
+            stored = {"value": value}
+        with self._lock:
+            self.manifest["outputs"][name] = stored
+            self._write()
+
+    def _save_artifact(self, name: str, artifact) -> Dict[str, str]:
+        extension = "jpg" if artifact.format == "JPEG" else artifact.format.lower()
+        artifact.save(os.path.join(self.path, f"{name}.{extension}"))
+        return {"artifact": f"{name}.{extension}", "filename": artifact.filename}
+
+    def _load_artifact(self, stored: Dict[str, str]):
+        from services.artifact import ImageArtifact
+
+        with open(os.path.join(self.path, stored["artifact"]), "rb") as f:
+            return ImageArtifact.from_bytes(f.read(), filename=stored["filename"])
+
+    def completed_outputs(self) -> Dict[str, Any]:
+        """Every checkpointed stage output, with images loaded back as artifacts."""
+        outputs = {}
+        for name, stored in self.manifest["outputs"].items():
+            if "artifact" in stored:
+                outputs[name] = self._load_artifact(stored)
+            elif "artifacts" in stored:
+                outputs[name] = {key: self._load_artifact(item) for key, item in stored["artifacts"].items()}
+            else:
+                outputs[name] = stored["value"]
+        return outputs
+
+    def finish(self, error: Optional[str] = None) -> None:
+        """Mark the run complete, or failed with `error` (resumable)."""
+        with self._lock:
+            self.manifest["status"] = STATUS_FAILED if error else STATUS_COMPLETE
+            self.manifest["error"] = error
+            self._write()
+
+
+    def discard(self) -> None:
+        """Delete this run's checkpoint directory."""
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def list_runs(root: str = CHECKPOINT_DIR) -> List[Dict[str, Any]]:
+    """Manifests of every checkpointed run, newest first."""
+    if not os.path.isdir(root):
+        return []
+    manifests = []
+    for run_id in os.listdir(root):
+        try:
+            with open(os.path.join(root, run_id, MANIFEST), "r", encoding="utf-8") as f:
+                manifests.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return sorted(manifests, key=lambda m: m.get("created_at", ""), reverse=True)
+
+
+def latest_incomplete(root: str = CHECKPOINT_DIR) -> Optional[str]:
+    """run_id of the newest run that didn't complete, if any."""
+    for manifest in list_runs(root):
+        if manifest.get("status") != STATUS_COMPLETE:
+            return manifest["run_id"]
+    return None
+
+
+def prune(keep_days: float = KEEP_DAYS, root: str = CHECKPOINT_DIR) -> int:
+    """Delete completed run checkpoints older than `keep_days`; returns how many."""
+    if not os.path.isdir(root):
+        return 0
+    cutoff = time.time() - keep_days * 86400
+    removed = 0
+    for manifest in list_runs(root):
+        path = os.path.join(root, manifest["run_id"])
+        if manifest.get("status") == STATUS_COMPLETE and os.path.getmtime(os.path.join(path, MANIFEST)) < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    return removed
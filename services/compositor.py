@@ -0,0 +1,155 @@
+"""
+Compositor – NumPy cover overlay engine.
+
+Array implementation of image_service's local cover overlay (the fallback when
+the OpenAI edit is off or fails). It reproduces the PIL pipeline – matte
+finish, luminance-matched shading, multiply and feathered alpha – in a few
+fused float32 passes instead of chained ImageEnhance/point/convert calls.
+
+Output matches the PIL path within a couple of 8-bit levels (rounding and the
+random matte noise differ); `scripts/bench_compositor.py` measures both.
+"""
+
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+# Luma weights used by PIL's RGB → L conversion (ITU-R 601-2).
+_LUMA = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+# Matte finish factors (Color, Contrast, Brightness) and noise blend – keep
+# in sync with image_service._place_cover_on_image_pil.
+_COLOR = 0.92
+_CONTRAST = 0.96
+_BRIGHTNESS = 0.98
+_NOISE_SIGMA = 8.0
+_NOISE_ALPHA = 0.03
+
+
+def _box_radius(radius: float, passes: int = 3) -> float:
+    """Extended-box radius PIL uses to approximate a Gaussian of `radius`."""
+    sigma2 = radius * radius / passes
+    size = np.sqrt(12.0 * sigma2 + 1.0)
+    whole = np.floor((size - 1.0) / 2.0)
+    frac = (2 * whole + 1) * (whole * (whole + 1) - 3 * sigma2) / (6 * (sigma2 - (whole + 1) ** 2))
+    return float(whole + frac)
+
+
+def _box_blur_axis(arr: np.ndarray, radius: float, axis: int) -> np.ndarray:
+    """One extended box pass along `axis` with edge clamping (as PIL does)."""
+    whole = int(radius)
+    frac = radius - whole
+    src = np.moveaxis(arr, axis, 0)
+    n = src.shape[0]
+
+    padded = np.concatenate(
+        [np.repeat(src[:1], whole + 1, axis=0), src, np.repeat(src[-1:], whole + 1, axis=0)]
+    )
+    if whole == 0:
+        # Sub-pixel radius: a 3-tap kernel, no prefix sums needed.
+        total = src + frac * (padded[:n] + padded[2:])
+    else:
+        csum = np.cumsum(padded, axis=0, dtype=np.float32)
+        # Sum of the 2*whole+1 full-weight taps centred on each pixel.
+        total = csum[2 * whole + 1:2 * whole + 1 + n] - csum[:n]
+        if frac:
+            total += frac * (padded[:n] + padded[2 * whole + 2:])
+    return np.moveaxis(total / (2 * radius + 1), 0, axis)
+
+
+def gaussian_blur(arr: np.ndarray, radius: float) -> np.ndarray:
+    """ImageFilter.GaussianBlur equivalent: 3 extended box passes per axis."""
+    box = _box_radius(radius)
+    out = arr.astype(np.float32, copy=False)
+    for axis in (0, 1):
+        for _ in range(3):
+            out = _box_blur_axis(out, box, axis)
+    return out
+
+
+def _feather_alpha(width: int, height: int, radius: float) -> np.ndarray:
+    """
+    Blurred all-opaque alpha, as in the PIL path. The source is constant, so
+    the 2-D blur factors into two 1-D profiles.
+    """
+    cols = gaussian_blur(np.full((1, width), 255.0, dtype=np.float32), radius)[0]
+    rows = gaussian_blur(np.full((height, 1), 255.0, dtype=np.float32), radius)[:, 0]
+    return (np.outer(rows, cols) / (255.0 * 255.0))[..., None]
+
+
+def finish_cover(cover_rgb: np.ndarray, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    Matte paperback finish on a float32 HxWx3 cover: Color/Contrast/Brightness
+    collapsed into one affine blend, a light blur and a noise blend.
+    """
+    rng = rng or np.random.default_rng()
+    luma = cover_rgb @ _LUMA
+    mean = np.floor(luma.mean() + 0.5)
+
+    # Color(c) → Contrast(k) → Brightness(b) → noise blend (1-n), expanded:
+    #   (1-n)·[b·k·c·x + b·k·(1-c)·L + b·(1-k)·mean]
+    # The result stays inside 0..255, and the blur is linear, so the noise
+    # weight is folded into the coefficients up front.
+    keep = (1.0 - _NOISE_ALPHA) * _BRIGHTNESS
+    out = (
+        (keep * _CONTRAST * _COLOR) * cover_rgb
+        + (keep * _CONTRAST * (1.0 - _COLOR)) * luma[..., None]
+        + keep * (1.0 - _CONTRAST) * mean
+    )
+    out = gaussian_blur(out, 0.25)
+
+    noise = rng.standard_normal(out.shape[:2], dtype=np.float32) * _NOISE_SIGMA + 128.0
+    out += np.clip(noise, 0, 255)[..., None] * _NOISE_ALPHA
+    return out
+
+
+def shade_cover(finished: np.ndarray, under_rgb: np.ndarray, target_width: int) -> np.ndarray:
+    """Multiply the cover by a shading map built from the underlying luminance."""
+    under_l = np.floor(under_rgb @ _LUMA + 0.5)
+    mean = np.floor(under_l.mean() + 0.5)
+    under_l = np.clip(np.floor(mean + 1.15 * (under_l - mean) + 0.5), 0, 255)
+    under_l = gaussian_blur(under_l, max(2, target_width // 180))
+
+    norm_mean = float(under_l.mean()) or 128.0
+    normalized = np.floor(np.clip(under_l * (128.0 / norm_mean), 0, 255))
+    # 180..255 ~= 0.70..1.00 multiplier range.
+    shading = np.floor(180.0 + normalized * (75.0 / 255.0))
+    return np.floor(finished * (shading[..., None] / 255.0))
+
+
+def prepare_cover(cover: Image.Image, target_width: int) -> Image.Image:
+    """Resize the cover to the notebook footprint and apply the matte finish."""
+    target_height = int(target_width * (cover.height / cover.width))
+    cover_resized = cover.convert("RGB").resize((target_width, target_height), Image.LANCZOS, reducing_gap=3.0)
+    finished = finish_cover(np.asarray(cover_resized, dtype=np.float32))
+    return Image.fromarray(np.clip(finished + 0.5, 0, 255).astype(np.uint8), "RGB")
+
+
+def composite(base: Image.Image, prepared: Image.Image, origin: Optional[tuple] = None) -> Image.Image:
+    """
+    Shade a prepared cover by the notebook underneath and blend it in with
+    its top-left corner at `origin` (centred when None).
+    """
+    out = np.array(base.convert("RGB"))
+    height, width = out.shape[:2]
+    book_w, book_h = prepared.size
+
+    if origin is None:
+        x, y = (width - book_w) // 2, (height - book_h) // 2
+    else:
+        x = min(max(0, origin[0]), width - book_w)
+        y = min(max(0, origin[1]), height - book_h)
+    region = out[y:y + book_h, x:x + book_w].astype(np.float32)
+
+    lit = shade_cover(np.asarray(prepared.convert("RGB"), dtype=np.float32), region, book_w)
+    alpha = _feather_alpha(book_w, book_h, max(1, book_w // 220))
+
+    blended = region + (lit - region) * alpha
+    out[y:y + book_h, x:x + book_w] = np.clip(blended + 0.5, 0, 255).astype(np.uint8)
+    return Image.fromarray(out, "RGB")
+
+
+def place_cover(base: Image.Image, cover: Image.Image, width_ratio: float = 0.35) -> Image.Image:
+    """NumPy counterpart of image_service._place_cover_on_image_pil."""
+    return composite(base, prepare_cover(cover, int(base.width * width_ratio)))
@@ -0,0 +1,62 @@
+"""
+File Store
+Shared write/lock helpers for the state files (state/, output/ caches).
+
+`atomic_write` writes to a temp file next to the target and swaps it in
+with os.replace, so a reader (or a crash) never sees a torn file.
+`locked` is an exclusive lock across threads and processes – fcntl.flock on
+a sidecar .lock file plus an in-process lock per path – for
+read-modify-write cycles such as the mood history and capability records.
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the in-process lock only
+    fcntl = None
+
+_path_locks: Dict[str, threading.Lock] = {}
+_path_locks_lock = threading.Lock()
+
+
+def _thread_lock(path: str) -> threading.Lock:
+    with _path_locks_lock:
+        return _path_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+@contextmanager
+def locked(path: str) -> Iterator[None]:
+    """Exclusive lock on `path` across threads and processes."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with _thread_lock(path):
+        if fcntl is None:
+            yield
+            return
+        with open(f"{path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def atomic_write(path: str, data: Union[str, bytes]) -> None:
+    """Replace `path` with `data` (bytes, or text written as UTF-8) in one step."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    if isinstance(data, bytes):
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+    else:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+    os.replace(tmp_path, path)
+
+
+def atomic_write_json(path: str, data: Any, **dump_kwargs: Any) -> None:
+    """`atomic_write` of `data` as JSON (`dump_kwargs` go to json.dumps)."""
+    atomic_write(path, json.dumps(data, **dump_kwargs))
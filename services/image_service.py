@@ -4,25 +4,60 @@
 # Image Service – ATRA (Photorealistic Flat-Lay Edition v4.2 – Compatibility Fix)
 
 import base64
+import hashlib
+import json
 import os
-import random
+import threading
+import time
 from datetime import datetime
 from io import BytesIO
 
-import requests
-from openai import OpenAI
+import numpy as np
 from PIL import Image, ImageChops, ImageDraw, ImageEnhance, ImageFilter, ImageStat
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from services import capabilities, compositor, filestore, notebook_detector, response_cache, telemetry, transport
+from services.artifact import ImageArtifact
 
 # Image model version (upgrade target)
 IMAGE_MODEL = os.getenv("OPENAI_IMAGE_MODEL", "gpt-image-1.5")
 IMAGE_EDIT_MODEL = os.getenv("OPENAI_IMAGE_EDIT_MODEL", IMAGE_MODEL)
 USE_IMAGE_EDIT = os.getenv("ATRA_USE_IMAGE_EDIT", "1").strip() not in {"0", "false", "False"}
+# Cover edit scope: "full" sends the whole frame to images.edit; "crop" sends
+# only a padded tile around the notebook and blends the edited tile back in.
+EDIT_REGION = os.getenv("ATRA_EDIT_REGION", "full").strip().lower()
+# Tile padding around the notebook, as a fraction of the notebook width.
+EDIT_TILE_PADDING = float(os.getenv("ATRA_EDIT_TILE_PADDING", "0.15"))
+# Largest side the tile is sent/requested at. 1024 is the smallest square the
+# gpt-image models return; dall-e-2 also accepts 512 and 256.
+EDIT_TILE_SIZE = int(os.getenv("ATRA_EDIT_TILE_SIZE", "1024"))
+# Notebook detection is opt-in until it is validated on real frames: off,
+# the cover goes on the centred 35% box the prompt asks for and no frame is
+# regenerated. On, below NOTEBOOK_MIN_CONFIDENCE the frame is regenerated (up
+# to NOTEBOOK_REGENERATIONS times); a detection still unconvincing, or off
+# centre / off size by more than NOTEBOOK_MAX_SHIFT / NOTEBOOK_MAX_SCALE,
+# falls back to the centred box.
+NOTEBOOK_DETECT = os.getenv("ATRA_NOTEBOOK_DETECT", "0").strip() in {"1", "true", "True"}
+NOTEBOOK_MIN_CONFIDENCE = float(os.getenv("ATRA_NOTEBOOK_MIN_CONFIDENCE", "0.5"))
+NOTEBOOK_REGENERATIONS = int(os.getenv("ATRA_NOTEBOOK_REGENERATIONS", "1"))
+# Centre offset (fraction of the frame) and width ratio allowed vs the centred box.
+NOTEBOOK_MAX_SHIFT = float(os.getenv("ATRA_NOTEBOOK_MAX_SHIFT", "0.1"))
+NOTEBOOK_MAX_SCALE = float(os.getenv("ATRA_NOTEBOOK_MAX_SCALE", "1.25"))
+# Local overlay engine: "numpy" (fused array ops) or "pil" (reference path)
+COMPOSITOR = os.getenv("ATRA_COMPOSITOR", "numpy").strip().lower()
 
 # Exact Cloudinary cover asset
-JOURNAL_COVER_URL = "https://res.cloudinary.com/dssvwcrqh/image/upload/v1754278923/1_pobsxq.jpg"
+JOURNAL_COVER_URL = os.getenv(
+    "ATRA_JOURNAL_COVER_URL",
+    "https://res.cloudinary.com/dssvwcrqh/image/upload/v1754278923/1_pobsxq.jpg",
+)
 COVER_CACHE_PATH = "output/_journal_cover_cache.png"
+COVER_META_PATH = "output/_journal_cover_cache.json"
+# Pre-resized/finished covers + masks, keyed by source hash and size.
+COVER_CACHE_DIR = "output/_cover_cache"
+COVER_CACHE_VERSION = 1  # bump whenever cover preprocessing changes
+COVER_REVALIDATE_SECONDS = float(os.getenv("ATRA_COVER_REVALIDATE_SECONDS", "3600"))
+
+_cover_lock = threading.Lock()
 
 DAY_ITEMS = {
     "monday": "iced coffee, laptop corner, work badge, receipts, tangled charger cable, sticky notes, highlighter cap",
@@ -76,58 +111,205 @@ MOOD_OBJECTS = {
 }
 
 
-def _get_day_items() -> str:
+def _get_day_items(prompt: str = "", mode: str = "") -> str:
     day = datetime.now().strftime("%A").lower()
     base_items = DAY_ITEMS.get(day, DAY_ITEMS["monday"])
-    extras = ", ".join(random.sample(EXTRA_CHAOS_ITEMS, k=5))
+    rng = response_cache.rng("day_items", prompt, mode)
+    extras = ", ".join(rng.sample(EXTRA_CHAOS_ITEMS, k=5))
     return f"{base_items}, {extras}"
 
 
-def _load_cover_asset() -> Image.Image:
+def _read_cover_meta() -> dict:
+    try:
+        with open(COVER_META_PATH, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _load_cover_asset() -> tuple[Image.Image, str]:
     """
     Retrieve the canonical journal cover image from Cloudinary.
-    Cached locally to avoid repeated downloads.
+
+    Cached locally and revalidated with a conditional GET (ETag /
+    Last-Modified) at most every COVER_REVALIDATE_SECONDS, so a cover
+    updated on Cloudinary propagates. Returns (cover, source_sha256); the
+    image is opened lazily, so callers that only need its size never decode it.
     """
-    try:
-        os.makedirs("output", exist_ok=True)
+    with _cover_lock:
+        try:
+            os.makedirs("output", exist_ok=True)
+            meta = _read_cover_meta() if os.path.isfile(COVER_CACHE_PATH) else {}
+
+            if meta.get("sha256") and time.time() - meta.get("checked_at", 0) < COVER_REVALIDATE_SECONDS:
+                return Image.open(COVER_CACHE_PATH), meta["sha256"]
+
+            headers = {}
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+            try:
+                with telemetry.span("http.cover_download") as span:
+                    response = transport.session().get(JOURNAL_COVER_URL, headers=headers, timeout=20)
+                    span.set(status=response.status_code)
+                if response.status_code != 304:
+                    response.raise_for_status()
+            except Exception as exc:
+                if not meta.get("sha256"):
+                    raise
+                print(f"⚠️ Cover revalidation failed; using cached cover. Error: {exc}")
+                return Image.open(COVER_CACHE_PATH), meta["sha256"]
+
+            if response.status_code == 304:
+                meta["checked_at"] = time.time()
+            else:
+                cover_image = Image.open(BytesIO(response.content)).convert("RGBA")
+                buffer = BytesIO()
+                cover_image.save(buffer, format="PNG")
+                filestore.atomic_write(COVER_CACHE_PATH, buffer.getvalue())
+                sha256 = hashlib.sha256(response.content).hexdigest()
+                if sha256 != meta.get("sha256"):
+                    print(f"📥 Journal cover downloaded (source {sha256[:12]}).")
+                    _prune_cover_derivatives(sha256)
+                meta = {
+                    "sha256": sha256,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "checked_at": time.time(),
+                }
+
+            filestore.atomic_write(COVER_META_PATH, json.dumps(meta).encode("utf-8"))
+            return Image.open(COVER_CACHE_PATH), meta["sha256"]
+        except Exception as exc:
+            raise RuntimeError(f"Failed to load canonical journal cover: {exc}") from exc
+
+
+def _prune_cover_derivatives(current_sha: str) -> None:
+    """Drop derived covers/masks built from an older source or cache version."""
+    if not os.path.isdir(COVER_CACHE_DIR):
+        return
+    keep_prefix = f"v{COVER_CACHE_VERSION}_{current_sha[:16]}_"
+    for name in os.listdir(COVER_CACHE_DIR):
+        if not name.startswith(keep_prefix):
+            try:
+                os.remove(os.path.join(COVER_CACHE_DIR, name))
+            except OSError:
+                pass
+
+
+def _cover_derivative(kind: str, cover_sha: str, size: tuple[int, int], build) -> Image.Image:
+    """Return a cached derived cover asset, building and storing it on a miss."""
+    path = os.path.join(
+        COVER_CACHE_DIR,
+        f"v{COVER_CACHE_VERSION}_{cover_sha[:16]}_{kind}_{size[0]}x{size[1]}.png",
+    )
+    if os.path.isfile(path):
+        try:
+            image = Image.open(path)
+            image.load()
+            return image
+        except OSError:
+            pass
+
+    image = build()
+    os.makedirs(COVER_CACHE_DIR, exist_ok=True)
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    filestore.atomic_write(path, buffer.getvalue())
+    return image
+
+
+def _prepare_cover(cover: Image.Image, target_width: int) -> Image.Image:
+    """Resize the cover to the notebook footprint and apply the matte finish."""
+    if COMPOSITOR == "pil":
+        return _finish_cover_pil(cover, target_width)
+    return compositor.prepare_cover(cover, target_width)
+
+
+def _cached_prepared_cover(
+    cover: Image.Image, cover_sha: str, canvas_size: tuple[int, int], target_width: int = None
+) -> Image.Image:
+    """Finished cover; only the default 35% width is cached (detected widths vary per frame)."""
+    default_width = int(canvas_size[0] * 0.35)
+    if target_width not in (None, default_width):
+        return _prepare_cover(cover, target_width)
+    target_width = default_width
+    return _cover_derivative(
+        "finished",
+        cover_sha,
+        canvas_size,
+        lambda: _prepare_cover(cover, target_width),
+    )
 
-        if os.path.isfile(COVER_CACHE_PATH):
-            return Image.open(COVER_CACHE_PATH).convert("RGBA")
 
-        response = requests.get(JOURNAL_COVER_URL, timeout=20)
-        response.raise_for_status()
-        cover_image = Image.open(BytesIO(response.content)).convert("RGBA")
-        cover_image.save(COVER_CACHE_PATH, format="PNG")
-        return cover_image
-    except Exception as exc:
-        raise RuntimeError(f"Failed to load canonical journal cover: {exc}") from exc
+def _cached_cover_mask(
+    canvas_size: tuple[int, int], cover: Image.Image, cover_sha: str, box: tuple[int, int, int, int] = None
+) -> tuple[Image.Image, tuple[int, int, int, int]]:
+    """Edit mask for `box` (default: centred); only the centred mask is cached."""
+    aspect_ratio = cover.height / cover.width
+    center = _center_cover_box(canvas_size, aspect_ratio)
+    if box is not None and box != center:
+        return _box_mask(canvas_size, box), box
+    box = center
+    mask = _cover_derivative(
+        "mask",
+        cover_sha,
+        canvas_size,
+        lambda: _create_center_cover_mask(canvas_size, aspect_ratio)[0],
+    )
+    return mask, box
 
 
-def _place_cover_on_image(base: Image.Image, cover: Image.Image) -> Image.Image:
+def _place_cover_on_image(
+    base: Image.Image, cover: Image.Image, prepared: Image.Image = None, box: tuple[int, int, int, int] = None
+) -> Image.Image:
     """
     Integrate the canonical cover onto the generated flat-lay so it reads as
     the actual printed cover (matched size + lighting), not a pasted sticker.
+
+    `box` is the notebook (see `_locate_notebook`); without it the centred
+    35% box is assumed. `prepared` is an already resized + matte-finished
+    cover (see `_cached_prepared_cover`); without it the cover is prepared here.
     """
-    base_rgba = base.convert("RGBA")
+    target_width = box[2] - box[0] if box else int(base.width * 0.35)
+    if prepared is None or prepared.width != target_width:
+        prepared = _prepare_cover(cover, target_width)
+    origin = box[:2] if box else None
+    if COMPOSITOR == "pil":
+        return _composite_cover_pil(base, prepared, origin)
+    return compositor.composite(base, prepared, origin)
+
 
+def _place_cover_on_image_pil(base: Image.Image, cover: Image.Image) -> Image.Image:
+    """Reference PIL implementation of `_place_cover_on_image`."""
     # This must match the prompt instructions for notebook size/position.
-    target_width = int(base_rgba.width * 0.35)
+    target_width = int(base.width * 0.35)
+    return _composite_cover_pil(base, _finish_cover_pil(cover, target_width))
+
+
+def _finish_cover_pil(cover: Image.Image, target_width: int) -> Image.Image:
     aspect_ratio = cover.height / cover.width
     target_height = int(target_width * aspect_ratio)
-    cover_resized = cover.resize((target_width, target_height), Image.LANCZOS)
+    cover_resized = cover.convert("RGBA").resize((target_width, target_height), Image.LANCZOS)
 
-    def _apply_matte_finish(cover_rgba: Image.Image) -> Image.Image:
-        cover_rgb = cover_rgba.convert("RGB")
-        cover_rgb = ImageEnhance.Color(cover_rgb).enhance(0.92)
-        cover_rgb = ImageEnhance.Contrast(cover_rgb).enhance(0.96)
-        cover_rgb = ImageEnhance.Brightness(cover_rgb).enhance(0.98)
-        cover_rgb = cover_rgb.filter(ImageFilter.GaussianBlur(radius=0.25))
+    cover_rgb = cover_resized.convert("RGB")
+    cover_rgb = ImageEnhance.Color(cover_rgb).enhance(0.92)
+    cover_rgb = ImageEnhance.Contrast(cover_rgb).enhance(0.96)
+    cover_rgb = ImageEnhance.Brightness(cover_rgb).enhance(0.98)
+    cover_rgb = cover_rgb.filter(ImageFilter.GaussianBlur(radius=0.25))
 
-        noise = Image.effect_noise(cover_rgb.size, 8).convert("L")
-        noise_rgb = Image.merge("RGB", (noise, noise, noise))
-        cover_rgb = Image.blend(cover_rgb, noise_rgb, alpha=0.03)
+    noise = Image.effect_noise(cover_rgb.size, 8).convert("L")
+    noise_rgb = Image.merge("RGB", (noise, noise, noise))
+    cover_rgb = Image.blend(cover_rgb, noise_rgb, alpha=0.03)
 
-        return cover_rgb.convert("RGBA")
+    return cover_rgb.convert("RGBA")
+
+
+def _composite_cover_pil(base: Image.Image, finished: Image.Image, origin: tuple[int, int] = None) -> Image.Image:
+    base_rgba = base.convert("RGBA")
+    target_width = finished.width
 
     def _match_lighting(cover_rgba: Image.Image, under_rgb: Image.Image) -> Image.Image:
         """
@@ -151,14 +333,17 @@ def _place_cover_on_image(base: Image.Image, cover: Image.Image) -> Image.Image:
         return lit_rgb.convert("RGBA")
 
     # The cover footprint should match the notebook exactly (no padding)
-    cover_resized = _apply_matte_finish(cover_resized)
-    book_w, book_h = cover_resized.size
+    book_w, book_h = finished.size
 
-    x = (base_rgba.width - book_w) // 2
-    y = (base_rgba.height - book_h) // 2
+    if origin is None:
+        x = (base_rgba.width - book_w) // 2
+        y = (base_rgba.height - book_h) // 2
+    else:
+        x = min(max(0, origin[0]), base_rgba.width - book_w)
+        y = min(max(0, origin[1]), base_rgba.height - book_h)
 
     under_region = base_rgba.convert("RGB").crop((x, y, x + book_w, y + book_h))
-    cover_lit = _match_lighting(cover_resized, under_region)
+    cover_lit = _match_lighting(finished, under_region)
 
     # Slight edge feathering so the cover prints "into" the notebook surface.
     feather_radius = max(1, target_width // 220)
@@ -169,6 +354,26 @@ def _place_cover_on_image(base: Image.Image, cover: Image.Image) -> Image.Image:
     return base_rgba.convert("RGB")
 
 
+def _center_cover_box(canvas_size: tuple[int, int], cover_aspect_ratio: float) -> tuple[int, int, int, int]:
+    """Centered notebook box (x0, y0, x1, y1) at 35% of the canvas width."""
+    width, height = canvas_size
+    target_width = int(width * 0.35)
+    target_height = int(target_width * cover_aspect_ratio)
+    x0 = (width - target_width) // 2
+    y0 = (height - target_height) // 2
+    return x0, y0, x0 + target_width, y0 + target_height
+
+
+def _box_mask(canvas_size: tuple[int, int], box: tuple[int, int, int, int]) -> Image.Image:
+    """RGBA edit mask: transparent (editable) rounded `box`, opaque elsewhere."""
+    x0, y0, x1, y1 = box
+    mask = Image.new("RGBA", canvas_size, (0, 0, 0, 255))  # keep everything by default
+    draw = ImageDraw.Draw(mask)
+    corner_radius = max(8, (x1 - x0) // 28)
+    draw.rounded_rectangle(box, radius=corner_radius, fill=(0, 0, 0, 0))  # edit region
+    return mask
+
+
 def _create_center_cover_mask(canvas_size: tuple[int, int], cover_aspect_ratio: float) -> tuple[Image.Image, tuple[int, int, int, int]]:
     """
     Create a mask for the centered notebook cover region.
@@ -176,40 +381,167 @@ def _create_center_cover_mask(canvas_size: tuple[int, int], cover_aspect_ratio:
     Mask format: RGBA PNG where transparent pixels are the editable region.
     Returns (mask_image, (x0,y0,x1,y1)).
     """
-    width, height = canvas_size
-    target_width = int(width * 0.35)
-    target_height = int(target_width * cover_aspect_ratio)
-    x0 = (width - target_width) // 2
-    y0 = (height - target_height) // 2
-    x1 = x0 + target_width
-    y1 = y0 + target_height
+    box = _center_cover_box(canvas_size, cover_aspect_ratio)
+    return _box_mask(canvas_size, box), box
 
-    mask = Image.new("RGBA", (width, height), (0, 0, 0, 255))  # keep everything by default
-    draw = ImageDraw.Draw(mask)
-    corner_radius = max(8, target_width // 28)
-    draw.rounded_rectangle((x0, y0, x1, y1), radius=corner_radius, fill=(0, 0, 0, 0))  # edit region
-    return mask, (x0, y0, x1, y1)
 
+def _locate_notebook(frame: Image.Image, cover_aspect_ratio: float) -> notebook_detector.Detection:
+    with telemetry.span("image.detect_notebook"):
+        return notebook_detector.detect(frame, cover_aspect_ratio)
 
-def _edit_in_cover(base_image: Image.Image, cover_image: Image.Image, mode: str, day_items: str) -> Image.Image:
+
+def _notebook_box(
+    detection: notebook_detector.Detection, canvas_size: tuple[int, int], cover_aspect_ratio: float
+) -> tuple[tuple[int, int, int, int], str]:
+    """
+    (box to place the cover on, why the centred box was used instead or None).
+    A detection has to be confident, and near the centred box in position
+    and size: the prompt asks for that box, so a far-off match is more likely
+    desk or clutter than a misplaced notebook.
+    """
+    center = _center_cover_box(canvas_size, cover_aspect_ratio)
+    if detection.confidence < NOTEBOOK_MIN_CONFIDENCE:
+        return center, f"notebook not found (confidence {detection.confidence:.2f})"
+
+    width, height = canvas_size
+    x0, y0, x1, y1 = detection.box
+    shift_x = abs(x0 + x1 - center[0] - center[2]) / (2 * width)
+    shift_y = abs(y0 + y1 - center[1] - center[3]) / (2 * height)
+    shift = max(shift_x, shift_y)
+    scale = (x1 - x0) / (center[2] - center[0])
+    if shift > NOTEBOOK_MAX_SHIFT or not 1 / NOTEBOOK_MAX_SCALE <= scale <= NOTEBOOK_MAX_SCALE:
+        return center, f"detected notebook {detection.box} is {shift:.0%} off centre at {scale:.2f}x the expected width"
+    return detection.box, None
+
+
+def _edit_tile_box(
+    canvas_size: tuple[int, int], box: tuple[int, int, int, int], padding: float = EDIT_TILE_PADDING
+) -> tuple[int, int, int, int]:
+    """Square window around the notebook `box`, padded and kept inside the canvas."""
+    width, height = canvas_size
+    x0, y0, x1, y1 = box
+    pad = int((x1 - x0) * padding)
+    side = min(max(x1 - x0, y1 - y0) + 2 * pad, width, height)
+    left = min(max(0, (x0 + x1 - side) // 2), width - side)
+    top = min(max(0, (y0 + y1 - side) // 2), height - side)
+    return left, top, left + side, top + side
+
+
+def _blend_tile(
+    base: Image.Image, tile: Image.Image, tile_box: tuple[int, int, int, int], box: tuple[int, int, int, int]
+) -> Image.Image:
+    """
+    Paste the edited `tile` back over `base`. Only the notebook plus a
+    feathered margin is taken from the tile; the alpha reaches zero inside
+    the padding, so the tile border never shows.
+    """
+    left, top, right, bottom = tile_box
+    pad = min(box[0] - left, box[1] - top, right - box[2], bottom - box[3])
+    grow = max(1, int(pad * 0.2))
+    local = (box[0] - left - grow, box[1] - top - grow, box[2] - left + grow, box[3] - top + grow)
+
+    alpha = Image.new("L", tile.size, 0)
+    ImageDraw.Draw(alpha).rounded_rectangle(local, radius=max(8, (box[2] - box[0]) // 28), fill=255)
+    alpha_arr = compositor.gaussian_blur(np.asarray(alpha, dtype=np.float32), max(1.0, pad * 0.2))[..., None] / 255.0
+
+    out = np.asarray(base.convert("RGB"), dtype=np.float32).copy()
+    window = out[top:bottom, left:right]
+    edited = np.asarray(tile.convert("RGB"), dtype=np.float32)
+    out[top:bottom, left:right] = window + (edited - window) * alpha_arr
+    return Image.fromarray(np.clip(out + 0.5, 0, 255).astype(np.uint8), "RGB")
+
+
+def _edit_in_cover(
+    base: ImageArtifact,
+    cover_image: Image.Image,
+    mode: str,
+    day_items: str,
+    cover_sha: str = None,
+    box: tuple[int, int, int, int] = None,
+) -> Image.Image:
     """
     Use the OpenAI image edit endpoint to apply the cover naturally (lighting/texture)
     into the notebook area, instead of a hard pixel overlay.
+
+    `box` is the notebook (default: centred 35% box). Inputs are sent as
+    in-memory PNG buffers; returns the decoded edited frame.
+    """
+    if EDIT_REGION == "crop":
+        return _edit_in_cover_tile(base, cover_image, mode, day_items, cover_sha, box)
+
+    if cover_sha:
+        mask, _ = _cached_cover_mask(base.image.size, cover_image, cover_sha, box)
+    elif box is not None:
+        mask = _box_mask(base.image.size, box)
+    else:
+        cover_aspect_ratio = cover_image.height / cover_image.width
+        mask, _ = _create_center_cover_mask(base.image.size, cover_aspect_ratio)
+
+    # Cached cover/mask PNGs are passed through byte-for-byte (no re-encode).
+    cover = ImageArtifact.from_image(cover_image, "PNG", filename="cover.png")
+    mask_png = ImageArtifact.from_image(mask, "PNG", filename="mask.png")
+
+    image_b64 = _request_cover_edit(base, cover, mask_png, _cover_edit_prompt(mode, day_items))
+    return Image.open(BytesIO(base64.b64decode(image_b64)))
+
+
+def _edit_in_cover_tile(
+    base: ImageArtifact,
+    cover_image: Image.Image,
+    mode: str,
+    day_items: str,
+    cover_sha: str = None,
+    box: tuple[int, int, int, int] = None,
+) -> Image.Image:
+    """
+    Region-cropped variant of `_edit_in_cover`: only a padded square around
+    the notebook is sent (at most EDIT_TILE_SIZE per side) and the edited
+    tile is blended back into the untouched original frame.
     """
-    os.makedirs("output", exist_ok=True)
-    base_path = "output/_base_flatlay.png"
-    mask_path = "output/_mask.png"
-    cover_path = "output/_cover.png"
+    frame = base.image.convert("RGB")
+    center = _center_cover_box(frame.size, cover_image.height / cover_image.width)
+    box = box or center
+    tile_box = _edit_tile_box(frame.size, box)
+    tile = frame.crop(tile_box)
+
+    # Notebook box in tile coordinates, scaled down when the tile is.
+    send_side = min(tile.width, EDIT_TILE_SIZE)
+    scale = send_side / tile.width
+    left, top = tile_box[:2]
+    local_box = tuple(
+        int(round(value * scale)) for value in (box[0] - left, box[1] - top, box[2] - left, box[3] - top)
+    )
+    if send_side != tile.width:
+        tile = tile.resize((send_side, send_side), Image.LANCZOS)
 
-    base_image.convert("RGBA").save(base_path, format="PNG")
-    cover_image.convert("RGBA").save(cover_path, format="PNG")
+    if cover_sha and box == center:
+        mask = _cover_derivative("tile_mask", cover_sha, tile.size, lambda: _box_mask(tile.size, local_box))
+    else:
+        mask = _box_mask(tile.size, local_box)
 
-    cover_aspect_ratio = cover_image.height / cover_image.width
-    mask, _ = _create_center_cover_mask(base_image.size, cover_aspect_ratio)
-    mask.save(mask_path, format="PNG")
+    tile_png = ImageArtifact.from_image(tile, "PNG", filename="tile.png")
+    cover = ImageArtifact.from_image(cover_image, "PNG", filename="cover.png")
+    mask_png = ImageArtifact.from_image(mask, "PNG", filename="mask.png")
 
-    edit_prompt = f"""
-    You are editing a photorealistic top-down flat-lay photo.
+    edit_prompt = _cover_edit_prompt(mode, day_items, cropped=True)
+    size = f"{EDIT_TILE_SIZE}x{EDIT_TILE_SIZE}"
+    image_b64 = _request_cover_edit(tile_png, cover, mask_png, edit_prompt, size=size)
+
+    edited = Image.open(BytesIO(base64.b64decode(image_b64))).convert("RGB")
+    tile_width = tile_box[2] - tile_box[0]
+    if edited.size != (tile_width, tile_width):
+        edited = edited.resize((tile_width, tile_width), Image.LANCZOS)
+    return _blend_tile(frame, edited, tile_box, box)
+
+
+def _cover_edit_prompt(mode: str, day_items: str, cropped: bool = False) -> str:
+    scope = (
+        "a close crop around the notebook from a photorealistic top-down flat-lay photo"
+        if cropped
+        else "a photorealistic top-down flat-lay photo"
+    )
+    return f"""
+    You are editing {scope}.
 
     Goal: replace ONLY the masked notebook cover area with the provided cover artwork image.
     - The artwork MUST be placed with NO resizing mismatch: it must perfectly fill the notebook cover.
@@ -222,42 +554,60 @@ def _edit_in_cover(base_image: Image.Image, cover_image: Image.Image, mode: str,
     - Surrounding clutter: {day_items}
     """
 
-    with open(base_path, "rb") as base_f, open(cover_path, "rb") as cover_f, open(mask_path, "rb") as mask_f:
+
+def _request_cover_edit(
+    base: ImageArtifact, cover: ImageArtifact, mask: ImageArtifact, edit_prompt: str, size: str = "1024x1024"
+) -> str:
+    """Run the cover edit and return the edited image as base64 PNG."""
+    # Cache key covers the exact input pixels, not just the file names.
+    params = {"model": IMAGE_EDIT_MODEL, "prompt": edit_prompt.strip(), "size": size, "n": 1}
+    # Skip straight to the single-image edit once the backend is known to reject two.
+    if capabilities.available("images.edit", IMAGE_EDIT_MODEL, "multi_image"):
         try:
             # Prefer passing both the base image and the cover image as inputs so the model can
             # directly reference the exact artwork while editing the masked region.
-            result = client.images.edit(
-                model=IMAGE_EDIT_MODEL,
-                image=[base_f, cover_f],
-                mask=mask_f,
-                prompt=edit_prompt.strip(),
-                size="1024x1024",
-                n=1,
+            return response_cache.cached(
+                "images.edit",
+                {**params, "base": base.data, "cover": cover.data, "mask": mask.data},
+                lambda: capabilities.track(
+                    "images.edit",
+                    IMAGE_EDIT_MODEL,
+                    lambda: transport.openai_client().images.edit(
+                        image=[base.as_upload(), cover.as_upload()],
+                        mask=mask.as_upload(),
+                        **params,
+                    ).data[0].b64_json,
+                    variant="multi_image",
+                ),
             )
         except Exception as exc:
             # Fallback: some backends only accept a single input image for edits.
             print(f"⚠️ images.edit with 2 images failed; retrying with base only. Error: {exc}")
-            base_f.seek(0)
-            mask_f.seek(0)
-            result = client.images.edit(
-                model=IMAGE_EDIT_MODEL,
-                image=base_f,
-                mask=mask_f,
-                prompt=edit_prompt.strip() + f"\n\nThe cover artwork reference is at: {JOURNAL_COVER_URL}",
-                size="1024x1024",
-                n=1,
-            )
-
-    image_b64 = result.data[0].b64_json
-    image_bytes = base64.b64decode(image_b64)
-    return Image.open(BytesIO(image_bytes)).convert("RGB")
+            telemetry.current().retry()
+
+    params["prompt"] += f"\n\nThe cover artwork reference is at: {JOURNAL_COVER_URL}"
+    return response_cache.cached(
+        "images.edit",
+        {**params, "base": base.data, "mask": mask.data},
+        lambda: capabilities.track(
+            "images.edit",
+            IMAGE_EDIT_MODEL,
+            lambda: transport.openai_client().images.edit(
+                image=base.as_upload(), mask=mask.as_upload(), **params
+            ).data[0].b64_json,
+        ),
+    )
 
 
-def generate_image(prompt: str, mode: str) -> str:
+def generate_image(prompt: str, mode: str, output_path: str = None) -> ImageArtifact:
+    """
+    Generate the flat-lay, apply the cover and return the final JPEG in memory.
+    `output_path` additionally writes it to disk (debugging/archiving).
+    """
     print(f"🎨 Generating grounded flat-lay Joanie image ({mode}) – prompt: {prompt}")
 
     mood_influence = MOOD_OBJECTS.get(mode, "")
-    day_items = _get_day_items()
+    day_items = _get_day_items(prompt, mode)
 
     # ----------------------------------------------------------
     # PROMPT-BASED GROUNDING (since reference-image parameter is unsupported)
@@ -297,52 +647,90 @@ def generate_image(prompt: str, mode: str) -> str:
     # ----------------------------------------------------------
     # Image generation (NO image= parameter — fully compatible)
     # ----------------------------------------------------------
-    try:
-        result = client.images.generate(
-            model=IMAGE_MODEL,
-            prompt=visual_prompt,
-            size="1024x1024",
-            n=1,
+    def _generate_b64(model: str, attempt: int = 0) -> str:
+        params = {"model": model, "prompt": visual_prompt, "size": "1024x1024", "n": 1}
+        # Regenerations get their own cache entry, or they'd replay the rejected frame.
+        payload = {**params, "attempt": attempt} if attempt else params
+        return response_cache.cached(
+            "images.generate",
+            payload,
+            lambda: capabilities.track(
+                "images.generate",
+                model,
+                lambda: transport.openai_client().images.generate(**params).data[0].b64_json,
+            ),
         )
-    except Exception as exc:
-        if IMAGE_MODEL != "gpt-image-1":
-            print(f"⚠️ Image generation failed with {IMAGE_MODEL}; falling back to gpt-image-1. Error: {exc}")
-            result = client.images.generate(
-                model="gpt-image-1",
-                prompt=visual_prompt,
-                size="1024x1024",
-                n=1,
-            )
+
+    def _generate(attempt: int = 0) -> ImageArtifact:
+        # gpt-image-1 is the last resort and is always attempted; IMAGE_MODEL
+        # is skipped while it's known to be unsupported/unauthorised/down.
+        if IMAGE_MODEL == "gpt-image-1":
+            image_b64 = _generate_b64(IMAGE_MODEL, attempt)
+        elif capabilities.available("images.generate", IMAGE_MODEL):
+            try:
+                image_b64 = _generate_b64(IMAGE_MODEL, attempt)
+            except Exception as exc:
+                print(f"⚠️ Image generation failed with {IMAGE_MODEL}; falling back to gpt-image-1. Error: {exc}")
+                telemetry.current().retry()
+                image_b64 = _generate_b64("gpt-image-1", attempt)
         else:
-            raise
+            image_b64 = _generate_b64("gpt-image-1", attempt)
+        return ImageArtifact.from_bytes(base64.b64decode(image_b64), filename="generated.png")
+
+    generated = _generate()
+    cover_image, cover_sha = _load_cover_asset()
+    cover_aspect_ratio = cover_image.height / cover_image.width
 
-    image_b64 = result.data[0].b64_json
-    image_bytes = base64.b64decode(image_b64)
-    pil_image = Image.open(BytesIO(image_bytes)).convert("RGB")
+    if NOTEBOOK_DETECT:
+        # Regenerate only when the notebook can't be found; keep the best frame.
+        detection = _locate_notebook(generated.image, cover_aspect_ratio)
+        for attempt in range(1, NOTEBOOK_REGENERATIONS + 1):
+            if detection.confidence >= NOTEBOOK_MIN_CONFIDENCE:
+                break
+            print(f"🔁 Notebook not found (confidence {detection.confidence:.2f}); regenerating the frame.")
+            telemetry.current().retry()
+            candidate = _generate(attempt)
+            candidate_detection = _locate_notebook(candidate.image, cover_aspect_ratio)
+            if candidate_detection.confidence > detection.confidence:
+                generated, detection = candidate, candidate_detection
+        box, fallback = _notebook_box(detection, generated.image.size, cover_aspect_ratio)
+        if fallback is None:
+            print(f"📐 Notebook at {box} (confidence {detection.confidence:.2f}).")
+        else:
+            print(f"⚠️ {fallback[0].upper()}{fallback[1:]}; using the centred box.")
+    else:
+        box = _center_cover_box(generated.image.size, cover_aspect_ratio)
 
-    cover_image = _load_cover_asset()
-    if USE_IMAGE_EDIT:
+    if USE_IMAGE_EDIT and capabilities.available("images.edit", IMAGE_EDIT_MODEL):
         try:
             print("🧩 Applying cover via OpenAI image edit (mask-based) for natural integration.")
-            pil_image = _edit_in_cover(pil_image, cover_image, mode=mode, day_items=day_items)
+            edited = _edit_in_cover(
+                generated, cover_image, mode=mode, day_items=day_items, cover_sha=cover_sha, box=box
+            )
+            pil_image = edited.convert("RGB")
         except Exception as exc:
             print(f"⚠️ Image edit integration failed; falling back to local overlay. Error: {exc}")
+            telemetry.current().retry()
             print("📚 Overlaying canonical journal cover onto generated frame.")
-            pil_image = _place_cover_on_image(pil_image, cover_image)
+            pil_image = generated.image.convert("RGB")
+            prepared = _cached_prepared_cover(cover_image, cover_sha, pil_image.size, box[2] - box[0])
+            pil_image = _place_cover_on_image(pil_image, cover_image, prepared=prepared, box=box)
     else:
         print("📚 Overlaying canonical journal cover onto generated frame.")
-        pil_image = _place_cover_on_image(pil_image, cover_image)
-
-    os.makedirs("output", exist_ok=True)
-    path = "output/generated_image.jpg"
-
-    pil_image.save(
-        path,
-        format="JPEG",
+        pil_image = generated.image.convert("RGB")
+        prepared = _cached_prepared_cover(cover_image, cover_sha, pil_image.size, box[2] - box[0])
+        pil_image = _place_cover_on_image(pil_image, cover_image, prepared=prepared, box=box)
+
+    artifact = ImageArtifact.from_image(
+        pil_image,
+        "JPEG",
+        filename="generated_image.jpg",
         quality=90,
         subsampling=0,
         optimize=True,
     )
+    if output_path:
+        artifact.save(output_path)
 
-    print(f"✅ Grounded image generated at: {path}")
-    return path
+    print(f"✅ Grounded image generated: {artifact}")
+    return artifact
@@ -0,0 +1,138 @@
+"""
+Post Inventory
+Ready-to-post bundles generated ahead of posting time.
+
+`main.py --produce` fills state/inventory/ready/ with complete bundles
+(mode, prompt, captions, uploaded image URL) up to a target depth;
+`main.py --consume` claims the oldest one and only logs + posts it, so the
+scheduled post no longer waits on OpenAI or Cloudinary.
+
+Each bundle is one JSON file. Claiming is an os.rename into claimed/, so
+two consumers can never take the same bundle; a failed post is released
+back to ready/ (its run ID keeps the retry idempotent), and claims left by
+a crashed consumer are re-queued after CLAIM_TIMEOUT seconds.
+"""
+
+import json
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from services import filestore
+
+INVENTORY_DIR = os.getenv("ATRA_INVENTORY_DIR", "state/inventory")
+TARGET_DEPTH = int(os.getenv("ATRA_INVENTORY_DEPTH", "3"))
+CLAIM_TIMEOUT = float(os.getenv("ATRA_INVENTORY_CLAIM_TIMEOUT", "3600"))
+
+BUNDLE_FIELDS = ("run_id", "mode", "prompt", "ig_caption", "fb_caption", "image_url")
+OPTIONAL_FIELDS = ("rendition_urls",)
+SUNDAY_MODE = "sunday_scaries"
+
+
+def _dir(name: str, root: str) -> str:
+    path = os.path.join(root, name)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _ready(root: str) -> List[str]:
+    """Ready bundle filenames, oldest first (names start with a timestamp)."""
+    return sorted(name for name in os.listdir(_dir("ready", root)) if name.endswith(".json"))
+
+
+def depth(root: str = INVENTORY_DIR) -> int:
+    return len(_ready(root))
+
+
+def ready_bundles(root: str = INVENTORY_DIR) -> List[Dict[str, Any]]:
+    """Every bundle waiting in ready/, oldest first (unreadable/just-claimed ones skipped)."""
+    bundles = []
+    for name in _ready(root):
+        try:
+            with open(os.path.join(root, "ready", name), "r", encoding="utf-8") as f:
+                bundles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return bundles
+
+
+def add(bundle: Dict[str, Any], root: str = INVENTORY_DIR) -> str:
+    """Queue a complete bundle; returns its path."""
+    missing = [field for field in BUNDLE_FIELDS if not bundle.get(field)]
+    if missing:
+        raise ValueError(f"Bundle is missing {', '.join(missing)}")
+    record = {field: bundle[field] for field in BUNDLE_FIELDS}
+    record.update({field: bundle[field] for field in OPTIONAL_FIELDS if bundle.get(field)})
+    record["created_at"] = datetime.now(timezone.utc).isoformat()
+
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    path = os.path.join(_dir("ready", root), f"{stamp}_{bundle['run_id']}.json")
+    filestore.atomic_write_json(path, record, indent=2, ensure_ascii=False)
+    return path
+
+
+class Claim:
+    """A bundle taken out of the ready queue by one consumer."""
+
+    def __init__(self, path: str, bundle: Dict[str, Any], root: str) -> None:
+        self.path = path
+        self.bundle = bundle
+        self.root = root
+
+    def complete(self) -> None:
+        """Posted: drop the bundle."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def release(self) -> None:
+        """Not posted: put the bundle back at its place in the queue."""
+        os.replace(self.path, os.path.join(_dir("ready", self.root), os.path.basename(self.path)))
+
+
+def requeue_stale(timeout: float = CLAIM_TIMEOUT, root: str = INVENTORY_DIR) -> int:
+    """Return claims older than `timeout` seconds (crashed consumers) to ready/."""
+    claimed = _dir("claimed", root)
+    cutoff = time.time() - timeout
+    requeued = 0
+    for name in os.listdir(claimed):
+        path = os.path.join(claimed, name)
+        if name.endswith(".json") and os.path.getmtime(path) < cutoff:
+            os.replace(path, os.path.join(_dir("ready", root), name))
+            requeued += 1
+    return requeued
+
+
+def _preferred(names: List[str], root: str, today: str) -> List[str]:
+    """
+    Oldest-first, but match the Sunday override: on Sundays a sunday_scaries
+    bundle goes first, on other days those bundles go last.
+    """
+    def is_sunday_bundle(name: str) -> bool:
+        try:
+            with open(os.path.join(root, "ready", name), "r", encoding="utf-8") as f:
+                return json.load(f).get("mode") == SUNDAY_MODE
+        except (OSError, ValueError):
+            return False
+
+    want_sunday = today == "Sunday"
+    return sorted(names, key=lambda name: is_sunday_bundle(name) != want_sunday)
+
+
+def claim(root: str = INVENTORY_DIR, today: Optional[str] = None) -> Optional[Claim]:
+    """Take the next bundle, or None when the inventory is empty."""
+    requeue_stale(root=root)
+    today = today or datetime.now().strftime("%A")
+    claimed = _dir("claimed", root)
+    for name in _preferred(_ready(root), root, today):
+        target = os.path.join(claimed, name)
+        try:
+            os.rename(os.path.join(root, "ready", name), target)
+        except FileNotFoundError:
+            continue  # another consumer got it first
+        os.utime(target)  # the claim's age starts now
+        with open(target, "r", encoding="utf-8") as f:
+            return Claim(target, json.load(f), root)
+    return None
@@ -0,0 +1,201 @@
+"""
+Ledger Service
+Local SQLite mirror of the content log.
+
+Every run (prompt, captions, mode, image URL, per-stage timings, post
+result) is recorded in state/atra_ledger.sqlite3, indexed by timestamp and
+mode, so analysis queries run locally instead of fetching the whole Sheet.
+Unsynced rows are pushed incrementally to the Sheet's ledger worksheet
+(which must already exist). The worksheet is append-only: a resumed run
+appends a newer version of its row, and the latest `updated_at` per run_id
+is current.
+"""
+
+import os
+import json
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+LEDGER_PATH = os.getenv("ATRA_LEDGER_PATH", "state/atra_ledger.sqlite3")
+LEDGER_WORKSHEET = os.getenv("ATRA_LEDGER_WORKSHEET", "ledger")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id      TEXT NOT NULL UNIQUE,
+    created_at  TEXT NOT NULL,
+    updated_at  TEXT,
+    mode        TEXT,
+    prompt      TEXT,
+    ig_caption  TEXT,
+    fb_caption  TEXT,
+    image_url   TEXT,
+    timings     TEXT,
+    posted      INTEGER NOT NULL DEFAULT 0,
+    error       TEXT,
+    synced      INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_runs_created_at ON runs (created_at);
+CREATE INDEX IF NOT EXISTS idx_runs_mode_created_at ON runs (mode, created_at);
+CREATE INDEX IF NOT EXISTS idx_runs_unsynced ON runs (id) WHERE synced = 0;
+"""
+
+# Column order pushed to the Sheet's ledger worksheet.
+SHEET_COLUMNS = (
+    "run_id", "created_at", "mode", "prompt", "ig_caption",
+    "fb_caption", "image_url", "posted", "error", "timings", "updated_at",
+)
+
+_lock = threading.Lock()
+_connections: Dict[str, sqlite3.Connection] = {}
+
+
+def connect(path: str = LEDGER_PATH) -> sqlite3.Connection:
+    """Shared connection per ledger file (schema created on first use)."""
+    with _lock:
+        conn = _connections.get(path)
+        if conn is None:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(runs)")}
+            if "updated_at" not in columns:  # ledgers created before row versions
+                conn.execute("ALTER TABLE runs ADD COLUMN updated_at TEXT")
+                conn.execute("UPDATE runs SET updated_at = created_at")
+                conn.commit()
+            _connections[path] = conn
+        return conn
+
+
+def _since(days: int) -> str:
+    return (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+
+
+def record_run(
+    mode: str,
+    prompt: Optional[str] = None,
+    ig_caption: Optional[str] = None,
+    fb_caption: Optional[str] = None,
+    image_url: Optional[str] = None,
+    timings: Optional[Dict[str, float]] = None,
+    posted: bool = False,
+    error: Optional[str] = None,
+    run_id: Optional[str] = None,
+    path: str = LEDGER_PATH,
+) -> str:
+    """Insert one run (a resumed run updates its row); returns its run_id."""
+    run_id = run_id or uuid.uuid4().hex
+    now = datetime.now(timezone.utc).isoformat()
+    conn = connect(path)
+    with _lock, conn:
+        conn.execute(
+            """
+            INSERT INTO runs (run_id, created_at, updated_at, mode, prompt, ig_caption, fb_caption,
+                              image_url, timings, posted, error)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (run_id) DO UPDATE SET
+                updated_at = excluded.updated_at,
+                prompt = excluded.prompt, ig_caption = excluded.ig_caption,
+                fb_caption = excluded.fb_caption, image_url = excluded.image_url,
+                timings = excluded.timings, posted = excluded.posted,
+                error = excluded.error, synced = 0
+            """,
+            (
+                run_id,
+                now,
+                now,
+                mode,
+                prompt,
+                ig_caption,
+                fb_caption,
+                image_url,
+                json.dumps({k: round(v, 3) for k, v in (timings or {}).items()}),
+                int(bool(posted)),
+                error,
+            ),
+        )
+    return run_id
+
+
+# -------------------------------------------------
+# Queries
+# -------------------------------------------------
+def mode_counts(days: int = 30, path: str = LEDGER_PATH) -> List[Tuple[str, int]]:
+    """[(mode, runs)] over the last `days` days, most used first."""
+    rows = connect(path).execute(
+        """
+        SELECT mode, COUNT(*) FROM runs
+        WHERE created_at >= ?
+        GROUP BY mode ORDER BY COUNT(*) DESC, mode
+        """,
+        (_since(days),),
+    )
+    return rows.fetchall()
+
+
+def posts_by_day(days: int = 30, path: str = LEDGER_PATH) -> List[Tuple[str, int, int]]:
+    """[(YYYY-MM-DD, runs, posted)] over the last `days` days."""
+    rows = connect(path).execute(
+        """
+        SELECT substr(created_at, 1, 10) AS day, COUNT(*), SUM(posted) FROM runs
+        WHERE created_at >= ?
+        GROUP BY day ORDER BY day
+        """,
+        (_since(days),),
+    )
+    return rows.fetchall()
+
+
+def recent_runs(limit: int = 10, path: str = LEDGER_PATH) -> List[Dict[str, Any]]:
+    conn = connect(path)
+    cursor = conn.execute(
+        "SELECT run_id, created_at, mode, posted, image_url, error, timings "
+        "FROM runs ORDER BY created_at DESC LIMIT ?",
+        (limit,),
+    )
+    columns = [c[0] for c in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+# -------------------------------------------------
+# Sheet sync
+# -------------------------------------------------
+def sync_to_sheet(writer=None, path: str = LEDGER_PATH) -> int:
+    """
+    Push rows not yet synced to the Sheet's ledger worksheet.
+
+    Rows are handed to the SheetWriter's write-ahead buffer (durable) and
+    then marked synced; returns how many rows the final flush actually sent
+    (0 when the Sheet is unreachable – the rows stay buffered for next time).
+    """
+    if writer is None:
+        if not os.getenv("GOOGLE_SHEETS_CREDENTIALS_PATH") or not os.getenv("SHEET_ID"):
+            return 0
+        from services.sheet_service import SheetWriter
+
+        writer = SheetWriter(
+            worksheet=LEDGER_WORKSHEET,
+            wal_path=f"{os.path.splitext(path)[0]}_sheet_wal.jsonl",
+            # No threshold flushes mid-sync: the final flush sends (and counts) everything.
+            flush_rows=10 ** 9,
+            flush_seconds=float("inf"),
+        )
+
+    conn = connect(path)
+    rows = conn.execute(
+        f"SELECT id, {', '.join(SHEET_COLUMNS)} FROM runs WHERE synced = 0 ORDER BY id"
+    ).fetchall()
+    if not rows:
+        return 0
+
+    # Keyed by run_id + updated_at: the same version is never appended twice,
+    # but a resumed/re-consumed run (upserted, synced reset to 0) gets its newer row.
+    for row in rows:
+        writer.append(list(row[1:]), key=f"{row[1]}@{row[-1]}")
+    with _lock, conn:
+        conn.executemany("UPDATE runs SET synced = 1 WHERE id = ?", [(row[0],) for row in rows])
+    return writer.flush()
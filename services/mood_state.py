@@ -0,0 +1,120 @@
+"""
+Mood State Store
+File-locked, atomically replaced Joanie mode history + schedule planner.
+
+state/joanie_history.json holds the most recent modes. Every read-modify-
+write happens under an exclusive lock (fcntl.flock on a sidecar .lock file,
+plus an in-process lock) and the file is swapped in with os.replace – both
+from services/filestore.py – so concurrent runs and batch workers never
+clobber or truncate each other's history.
+
+`plan_modes(n)` draws n upcoming modes in one locked transaction, applying
+the rules to the simulated history as it goes (Sunday override, no
+repeats, recency down-weighting, rarity boosting), so a batch takes the
+lock once and its workers just index into the returned schedule. Each
+slot is weighed for the date it will be posted on (a batch posts today,
+inventory bundles on the following days), and the Sunday override claims
+one post per Sunday.
+"""
+
+import json
+import os
+import random
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from services import filestore
+
+STATE_FILE = os.getenv("ATRA_MOOD_STATE", "state/joanie_history.json")
+# Rarity boosting looks at this many recent modes.
+HISTORY_SIZE = 5
+SUNDAY_MODE = "sunday_scaries"
+
+
+def _read(path: str) -> List[str]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return list(json.load(f).get("recent_modes", []))
+    except (OSError, ValueError, AttributeError):
+        return []
+
+
+def _write(path: str, history: List[str]) -> None:
+    filestore.atomic_write_json(path, {"recent_modes": history[-HISTORY_SIZE:]})
+
+
+def load_history(path: str = STATE_FILE) -> List[str]:
+    """Most recent modes, oldest first (a torn/missing file reads as empty)."""
+    return _read(path)
+
+
+# -------------------------------------------------
+# Selection rules
+# -------------------------------------------------
+def next_mode(history: List[str], modes: Iterable[str], today: Optional[str],
+              rng: Optional[random.Random] = None) -> str:
+    """
+    Pick the mode after `history` (pure; nothing is saved):
+    - Sunday override (unless it was the last mode)
+    - No repetition
+    - Recency down-weighting
+    - Rarity boosting
+    """
+    rng = rng or random
+    history = history[-HISTORY_SIZE:]
+    if today == "Sunday" and (not history or history[-1] != SUNDAY_MODE):
+        return SUNDAY_MODE
+
+    last = history[-1] if history else None
+    weights: Dict[str, float] = {mode: 1.0 for mode in modes}
+
+    if last in weights:
+        weights[last] = 0.0
+
+    # Recent modes get suppressed, the most recent the most.
+    for i, recent_mode in enumerate(reversed(history)):
+        if recent_mode in weights and weights[recent_mode] > 0:
+            weights[recent_mode] *= (0.7 - 0.1 * i)
+
+    # Modes not seen in the window get boosted.
+    for mode in weights:
+        if mode not in history:
+            weights[mode] *= 1.6
+
+    pool = [(m, w) for m, w in weights.items() if w > 0]
+    candidates, wts = zip(*pool)
+    return rng.choices(candidates, weights=wts, k=1)[0]
+
+
+def plan_modes(count: int, modes: Iterable[str], today: Optional[str] = None,
+               rng: Optional[random.Random] = None, commit: bool = True,
+               path: str = STATE_FILE, dates: Optional[Sequence[date]] = None) -> List[str]:
+    """
+    Draw the next `count` modes as one transaction. `dates` is the posting
+    date of each slot (default: all today); `today` overrides the weekday of
+    every slot. With `commit`, the history is advanced past the whole
+    schedule before the lock is released.
+    """
+    modes = list(modes)
+    dates = list(dates) if dates is not None else [datetime.now().date()] * count
+    with filestore.locked(path):
+        history = _read(path)
+        schedule = []
+        sundays_taken = set()
+        for target in dates[:count]:
+            weekday = today or target.strftime("%A")
+            if weekday == "Sunday" and target in sundays_taken:
+                weekday = None  # that Sunday already has its sunday_scaries post
+            mode = next_mode(history, modes, weekday, rng)
+            if mode == SUNDAY_MODE:
+                sundays_taken.add(target)
+            schedule.append(mode)
+            history = (history + [mode])[-HISTORY_SIZE:]
+        if commit and schedule:
+            _write(path, history)
+    return schedule
+
+
+def choose_mode(modes: Iterable[str], **kwargs) -> str:
+    """Draw and record a single mode."""
+    return plan_modes(1, modes, **kwargs)[0]
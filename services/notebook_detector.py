@@ -0,0 +1,160 @@
+"""
+Notebook Detector
+Finds the dark notebook rectangle in a generated flat-lay.
+
+The image prompt asks for a matte-black notebook centred at ~35% of the
+frame width, but the model doesn't always comply. Instead of assuming that
+box, the cover mask and overlay use the box found here:
+
+  1. On a ~128px luma thumbnail, pixels that are dark (below the Otsu
+     threshold) and flat (low local contrast) are marked notebook-like.
+  2. Every box with the cover's aspect ratio between MIN_WIDTH and
+     MAX_WIDTH of the frame is scored in O(1) from an integral image:
+     notebook-like fill inside minus fill in the surrounding ring.
+  3. The winner's edges are snapped to the strongest luma step at full
+     resolution.
+
+The score (0..1) doubles as the confidence: ~1 for a clean dark rectangle
+on a lighter desk, near 0 when there is no such rectangle. On a dark desk
+the notebook barely separates from the wood, and a wrong box can still
+score ~0.6; image_service only trusts boxes near the expected position and
+size. The whole pass takes under 10 ms on a 1024px frame
+(scripts/bench_notebook_detector.py).
+"""
+
+from dataclasses import dataclass
+from typing import Tuple
+
+import numpy as np
+from PIL import Image
+
+ANALYSIS_SIZE = 128
+# Notebook width search range, as a fraction of the frame width.
+MIN_WIDTH = 0.2
+MAX_WIDTH = 0.6
+
+Box = Tuple[int, int, int, int]
+
+
+@dataclass(frozen=True)
+class Detection:
+    box: Box  # (x0, y0, x1, y1) in frame pixels
+    confidence: float
+
+
+def _integral(arr: np.ndarray) -> np.ndarray:
+    """Summed-area table with a leading zero row/column."""
+    table = np.zeros((arr.shape[0] + 1, arr.shape[1] + 1), dtype=np.float64)
+    np.cumsum(np.cumsum(arr, axis=0), axis=1, out=table[1:, 1:])
+    return table
+
+
+def _window_sums(table: np.ndarray, top: int, left: int, h: int, w: int, rows: int, cols: int) -> np.ndarray:
+    """
+    Sums of every h x w window whose top-left corner is (top + i, left + j),
+    for i < rows, j < cols – four shifted views of the table, no gathers.
+    """
+    return (
+        table[top + h:top + h + rows, left + w:left + w + cols]
+        - table[top:top + rows, left + w:left + w + cols]
+        - table[top + h:top + h + rows, left:left + cols]
+        + table[top:top + rows, left:left + cols]
+    )
+
+
+def _otsu(luma: np.ndarray) -> float:
+    hist = np.bincount(luma.astype(np.uint8).ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256, dtype=np.float64)
+    weight = np.cumsum(hist)
+    mass = np.cumsum(hist * levels)
+    total, total_mass = weight[-1], mass[-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (total_mass * weight - total * mass) ** 2 / (weight * (total - weight))
+    return float(np.nanargmax(between[:-1]))
+
+
+def _notebook_map(luma: np.ndarray) -> np.ndarray:
+    """1.0 where a pixel is dark and locally flat (3x3 std), else 0.0."""
+    height, width = luma.shape
+    padded = np.pad(luma.astype(np.float64), 1, mode="edge")
+    mean = _window_sums(_integral(padded), 0, 0, 3, 3, height, width) / 9.0
+    var = _window_sums(_integral(padded * padded), 0, 0, 3, 3, height, width) / 9.0 - mean * mean
+    std = np.sqrt(np.maximum(var, 0.0))
+
+    dark = luma <= _otsu(luma)
+    flat = std <= max(3.0, float(np.median(std)))
+    return (dark & flat).astype(np.float64)
+
+
+def _search(notebook: np.ndarray, aspect_ratio: float) -> Tuple[Box, float]:
+    """Best-scoring box (thumbnail pixels) of the given aspect ratio."""
+    height, width = notebook.shape
+    # Every other width: the full-resolution edge snap absorbs the 1px step.
+    widths = range(max(4, int(width * MIN_WIDTH)), int(width * MAX_WIDTH) + 1, 2)
+    margin = max(2, widths[-1] // 8)
+    # Pad by the widest ring; a validity table keeps off-frame pixels out of the ring average.
+    fill = _integral(np.pad(notebook, margin))
+    valid = _integral(np.pad(np.ones_like(notebook), margin))
+    best_score, best_box = -1.0, (0, 0, width, height)
+
+    for box_w in widths:
+        box_h = int(round(box_w * aspect_ratio))
+        if box_h >= height:
+            break
+        ring = max(2, box_w // 8)
+        rows, cols = height - box_h + 1, width - box_w + 1
+        inside = _window_sums(fill, margin, margin, box_h, box_w, rows, cols)
+        o = margin - ring
+        outer = _window_sums(fill, o, o, box_h + 2 * ring, box_w + 2 * ring, rows, cols)
+        ring_area = _window_sums(valid, o, o, box_h + 2 * ring, box_w + 2 * ring, rows, cols) - box_h * box_w
+
+        score = inside / (box_h * box_w) - (outer - inside) / np.maximum(ring_area, 1)
+        y, x = np.unravel_index(int(np.argmax(score)), score.shape)
+        if score[y, x] > best_score:
+            best_score, best_box = float(score[y, x]), (int(x), int(y), int(x) + box_w, int(y) + box_h)
+    return best_box, best_score
+
+
+def _snap(profile: np.ndarray, guess: int, reach: int, falling: bool) -> int:
+    """Index in `profile` near `guess` with the strongest dark step (bright→dark if `falling`)."""
+    lo, hi = max(1, guess - reach), min(len(profile) - 1, guess + reach)
+    if hi <= lo:
+        return guess
+    steps = profile[lo:hi + 1] - profile[lo - 1:hi]
+    return lo + int(np.argmin(steps) if falling else np.argmax(steps))
+
+
+def _refine(luma: np.ndarray, box: Box, reach: int) -> Box:
+    """Snap each edge of a coarse box to the notebook outline at full resolution."""
+    x0, y0, x1, y1 = box
+    inset_x, inset_y = (x1 - x0) // 4, (y1 - y0) // 4
+    cols = luma[y0 + inset_y:y1 - inset_y].mean(axis=0, dtype=np.float32)
+    rows = luma[:, x0 + inset_x:x1 - inset_x].mean(axis=1, dtype=np.float32)
+    return (
+        _snap(cols, x0, reach, falling=True),
+        _snap(rows, y0, reach, falling=True),
+        _snap(cols, x1, reach, falling=False),
+        _snap(rows, y1, reach, falling=False),
+    )
+
+
+def detect(image: Image.Image, aspect_ratio: float) -> Detection:
+    """
+    Locate the notebook in `image`. The returned box keeps `aspect_ratio`
+    (height / width, the cover's), so the cover fits it without distortion.
+    """
+    frame = image.convert("L")
+    luma = np.asarray(frame)
+    factor = max(1, max(frame.size) // ANALYSIS_SIZE)
+    thumb = np.asarray(frame.reduce(factor), dtype=np.float32)
+
+    coarse, score = _search(_notebook_map(thumb), aspect_ratio)
+    x0, y0, x1, y1 = _refine(luma, tuple(v * factor for v in coarse), reach=factor * 3)
+
+    # Width from the snapped sides; height from the aspect, centred on the snapped rows.
+    width, height = frame.size
+    box_w = min(max(1, x1 - x0), width)
+    box_h = min(int(box_w * aspect_ratio), height)
+    top = min(max(0, (y0 + y1 - box_h) // 2), height - box_h)
+    left = min(max(0, x0), width - box_w)
+    return Detection((left, top, left + box_w, top + box_h), max(0.0, min(1.0, score)))
@@ -0,0 +1,130 @@
+"""
+Pipeline Executor
+Runs ATRA stages concurrently as soon as their declared inputs are available.
+
+Each stage names the context keys it consumes (`inputs`) and publishes its
+return value under its own `name`. Stages whose inputs are ready run in
+parallel on a thread pool; every stage has its own timeout. Each stage
+runs inside a `stage.<name>` telemetry span.
+"""
+
+import contextvars
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from services import telemetry
+
+
+class StageError(RuntimeError):
+    """Raised when a stage fails or exceeds its timeout."""
+
+    def __init__(self, stage: str, message: str) -> None:
+        super().__init__(f"Stage '{stage}' {message}")
+        self.stage = stage
+
+
+@dataclass
+class Stage:
+    """A single pipeline step: `func(*inputs)` → context[name]."""
+
+    name: str
+    func: Callable[..., Any]
+    inputs: Tuple[str, ...] = ()
+    timeout: Optional[float] = None
+
+
+@dataclass
+class PipelineRun:
+    """Outputs of every stage plus per-stage wall-clock durations (seconds)."""
+
+    outputs: Dict[str, Any] = field(default_factory=dict)
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+def _call_stage(stage: Stage, args: list) -> Any:
+    with telemetry.span(f"stage.{stage.name}"):
+        return stage.func(*args)
+
+
+def _validate(stages: Iterable[Stage], initial: Dict[str, Any]) -> None:
+    names = set(initial)
+    for stage in stages:
+        if stage.name in names:
+            raise ValueError(f"Duplicate pipeline key '{stage.name}'.")
+        names.add(stage.name)
+    for stage in stages:
+        missing = [key for key in stage.inputs if key not in names]
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' depends on unknown inputs: {', '.join(missing)}")
+
+
+def run_stages(
+    stages: Iterable[Stage],
+    initial: Optional[Dict[str, Any]] = None,
+    max_workers: Optional[int] = None,
+    run: Optional[PipelineRun] = None,
+    on_stage_done: Optional[Callable[[str, Any], None]] = None,
+) -> PipelineRun:
+    """
+    Execute `stages` respecting their declared inputs.
+
+    Independent stages run concurrently. The first failure or timeout cancels
+    everything still queued and is raised as a StageError. Pass `run` to keep
+    the partial outputs/timings when that happens. `on_stage_done(name, value)`
+    is called (on the calling thread) as each stage succeeds, e.g. to
+    checkpoint it.
+    """
+    stages = list(stages)
+    run = run if run is not None else PipelineRun()
+    run.outputs.update(initial or {})
+    context = run.outputs
+    _validate(stages, context)
+
+    pending = {stage.name: stage for stage in stages}
+    running: Dict[Any, Tuple[Stage, float]] = {}
+
+    executor = ThreadPoolExecutor(max_workers=max_workers or max(1, len(stages)))
+    try:
+        while pending or running:
+            for name, stage in list(pending.items()):
+                if all(key in context for key in stage.inputs):
+                    args = [context[key] for key in stage.inputs]
+                    # Copy the caller's context so spans keep the run ID across threads.
+                    context_copy = contextvars.copy_context()
+                    future = executor.submit(context_copy.run, _call_stage, stage, args)
+                    running[future] = (stage, time.monotonic())
+                    del pending[name]
+
+            if not running:
+                raise RuntimeError(f"Pipeline stalled; unresolved stages: {', '.join(pending)}")
+
+            now = time.monotonic()
+            deadlines = [
+                started + stage.timeout - now
+                for stage, started in running.values()
+                if stage.timeout is not None
+            ]
+            wait_for = max(0.0, min(deadlines)) if deadlines else None
+            done, _ = wait(list(running), timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                stage, started = running.pop(future)
+                run.timings[stage.name] = time.monotonic() - started
+                try:
+                    context[stage.name] = future.result()
+                except Exception as exc:
+                    raise StageError(stage.name, f"failed: {exc}") from exc
+                if on_stage_done is not None:
+                    on_stage_done(stage.name, context[stage.name])
+
+            now = time.monotonic()
+            for future, (stage, started) in running.items():
+                if stage.timeout is not None and now - started >= stage.timeout:
+                    raise StageError(stage.name, f"timed out after {stage.timeout:g}s")
+    finally:
+        # Timed-out threads cannot be interrupted; don't block on them.
+        executor.shutdown(wait=not running, cancel_futures=True)
+
+    return run
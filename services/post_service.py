@@ -8,32 +8,136 @@ Handles sending IG + FB captions + image URL to the Make.com webhook.
 
 Features:
 - API key authentication
-- Cloudinary propagation delay
+- Active Cloudinary/CDN readiness probe (replaces the fixed 12s delay)
 - Retry/backoff to avoid IG/FB media errors
+- Idempotency key (run ID) so a resumed run never posts twice
 """
 
+import os
+import json
 import time
+import random
 import requests
 from datetime import datetime
 
+from services import telemetry, transport
+
 # Make.com shared API key (must match your Make webhook header)
 MAKE_API_KEY = "atra_2025_supersecret"
 
+# CDN readiness probe: exponential backoff with jitter, capped overall wait
+PROBE_MAX_WAIT = float(os.getenv("ATRA_CDN_PROBE_MAX_WAIT", "30"))
+PROBE_BASE_DELAY = 0.5
+PROBE_MAX_DELAY = 5.0
+PROPAGATION_LOG = "state/cdn_propagation.jsonl"
+# Run IDs whose payload Make.com already accepted.
+DELIVERED_KEYS_PATH = "state/webhook_delivered_keys.txt"
+
+
+def _backoff(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with jitter (50–100% of the capped step)."""
+    step = min(cap, base * (2 ** attempt))
+    return step * random.uniform(0.5, 1.0)
+
+
+def _asset_is_served(url: str) -> bool:
+    """HEAD the asset; fall back to a 1-byte ranged GET if HEAD isn't allowed."""
+    response = transport.session().head(url, timeout=5, allow_redirects=True)
+    if response.status_code in (405, 501):
+        response = transport.session().get(url, headers={"Range": "bytes=0-0"}, timeout=5, stream=True)
+        response.close()
+    return response.status_code in (200, 206)
+
+
+def _record_propagation(url: str, seconds: float, attempts: int, ready: bool) -> None:
+    try:
+        os.makedirs(os.path.dirname(PROPAGATION_LOG), exist_ok=True)
+        with open(PROPAGATION_LOG, "a") as f:
+            f.write(json.dumps({
+                "timestamp": datetime.utcnow().isoformat(),
+                "url": url,
+                "seconds": round(seconds, 3),
+                "attempts": attempts,
+                "ready": ready,
+            }) + "\n")
+    except OSError as e:
+        print(f"⚠️ Could not record CDN propagation time: {e}")
+
+
+def wait_for_asset(url: str, max_wait: float = PROBE_MAX_WAIT) -> bool:
+    """
+    Poll `url` until the CDN serves it (or `max_wait` elapses).
+    The observed propagation time is appended to PROPAGATION_LOG.
+    """
+    started = time.monotonic()
+    attempt = 0
+    with telemetry.span("http.cdn_probe") as span:
+        while True:
+            attempt += 1
+            try:
+                if _asset_is_served(url):
+                    elapsed = time.monotonic() - started
+                    print(f"🌐 Asset served by CDN after {elapsed:.1f}s ({attempt} probe(s)).")
+                    _record_propagation(url, elapsed, attempt, True)
+                    return True
+            except requests.RequestException as e:
+                print(f"⚠️ CDN probe error: {e}")
+
+            elapsed = time.monotonic() - started
+            if elapsed >= max_wait:
+                print(f"⚠️ Asset still not served after {elapsed:.1f}s; posting anyway.")
+                _record_propagation(url, elapsed, attempt, False)
+                span.set_outcome("timeout")
+                return False
+            span.retry()
+            time.sleep(min(_backoff(attempt - 1, PROBE_BASE_DELAY, PROBE_MAX_DELAY), max_wait - elapsed))
+
+
+def _already_delivered(key: str) -> bool:
+    if not os.path.isfile(DELIVERED_KEYS_PATH):
+        return False
+    with open(DELIVERED_KEYS_PATH, "r") as f:
+        return any(line.strip() == key for line in f)
+
+
+def _mark_delivered(key: str) -> None:
+    try:
+        os.makedirs(os.path.dirname(DELIVERED_KEYS_PATH), exist_ok=True)
+        with open(DELIVERED_KEYS_PATH, "a") as f:
+            f.write(f"{key}\n")
+    except OSError as e:
+        print(f"⚠️ Could not record webhook delivery: {e}")
+
 
 def send_to_make_webhook(
     ig_caption: str,
     fb_caption: str,
     image_url: str,
-    webhook_url: str
+    webhook_url: str,
+    idempotency_key: str = None,
+    rendition_urls: dict = None,
 ) -> bool:
-    """Send IG + FB captions and image URL to Make.com."""
+    """
+    Send IG + FB captions and image URL to Make.com.
+    With `idempotency_key` (the run ID) a payload already accepted is not
+    sent again; the key also goes out as `run_id` / Idempotency-Key so the
+    Make scenario can drop duplicates itself. `rendition_urls`
+    ({platform: URL}) is passed through for per-platform image modules.
+    """
 
     print("📨 Preparing Instagram + Facebook post via Make.com...")
 
-    # Allow Cloudinary CDN propagation
-    PRE_DELAY = 12
-    print(f"⏳ Waiting {PRE_DELAY}s to allow Cloudinary/CDN propagation...")
-    time.sleep(PRE_DELAY)
+    if idempotency_key and _already_delivered(idempotency_key):
+        print(f"📣 Run {idempotency_key} was already delivered to Make.com; skipping.")
+        return True
+
+    if not image_url:
+        print("❌ No image URL (upload failed?); not posting to Make.com.")
+        return False
+
+    # Wait until Cloudinary/CDN actually serves the asset
+    print("⏳ Probing Cloudinary/CDN until the asset is served...")
+    wait_for_asset(image_url)
 
     payload = {
         "ig_caption": ig_caption,
@@ -41,35 +145,46 @@ def send_to_make_webhook(
         "image_url": image_url,
         "timestamp": datetime.utcnow().isoformat()
     }
+    headers = {"x-make-apikey": MAKE_API_KEY}
+    if rendition_urls:
+        payload["renditions"] = rendition_urls
+    if idempotency_key:
+        payload["run_id"] = idempotency_key
+        headers["Idempotency-Key"] = idempotency_key
 
     # Retry logic
     max_attempts = 3
-    backoff_seconds = [2, 4, 6]
 
-    for attempt in range(1, max_attempts + 1):
-        print(f"➡️ Attempt {attempt}/{max_attempts} sending to Make...")
+    with telemetry.span("http.make_webhook") as span:
+        for attempt in range(1, max_attempts + 1):
+            print(f"➡️ Attempt {attempt}/{max_attempts} sending to Make...")
+
+            try:
+                response = transport.session().post(
+                    webhook_url,
+                    json=payload,
+                    headers=headers,
+                    timeout=15
+                )
 
-        try:
-            response = requests.post(
-                webhook_url,
-                json=payload,
-                headers={"x-make-apikey": MAKE_API_KEY},
-                timeout=15
-            )
+                if response.status_code == 200:
+                    print("📣 Successfully sent payload to Make.com (200).")
+                    if idempotency_key:
+                        _mark_delivered(idempotency_key)
+                    return True
 
-            if response.status_code == 200:
-                print("📣 Successfully sent payload to Make.com (200).")
-                return True
+                print(f"⚠️ Make.com returned {response.status_code}: {response.text}")
 
-            print(f"⚠️ Make.com returned {response.status_code}: {response.text}")
+            except Exception as e:
+                print(f"❌ Request error: {e}")
 
-        except Exception as e:
-            print(f"❌ Request error: {e}")
+            if attempt < max_attempts:
+                span.retry()
+                wait = _backoff(attempt, base=1.0, cap=8.0)
+                print(f"⏳ Waiting {wait:.1f}s before retry...")
+                time.sleep(wait)
 
-        if attempt < max_attempts:
-            wait = backoff_seconds[attempt - 1]
-            print(f"⏳ Waiting {wait}s before retry...")
-            time.sleep(wait)
+        span.set_outcome("failed")
 
     print("❌ Failed to send post after multiple attempts.")
     return False
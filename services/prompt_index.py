@@ -0,0 +1,227 @@
+"""
+Prompt Index
+Persistent near-duplicate index over every prompt ATRA has posted.
+
+Prompts are shingled into character 4-grams and summarised by a 64-value
+MinHash signature; LSH banding (16 bands × 4 rows) narrows each lookup to a
+handful of candidates, so checks stay sub-millisecond with tens of
+thousands of stored prompts. Used by prompt_service to regenerate a prompt
+before any image money is spent on a repeat.
+
+Prompts still in flight – other batch/produce workers in this process, and
+bundles waiting in the inventory – are held as per-run reservations: a new
+prompt is checked against them too, and a reservation is promoted to the
+persistent index once its post goes out.
+"""
+
+import os
+import re
+import json
+import sqlite3
+import threading
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services import telemetry
+
+INDEX_PATH = os.getenv("ATRA_PROMPT_INDEX_PATH", "state/prompt_index.jsonl")
+DUPLICATE_THRESHOLD = float(os.getenv("ATRA_PROMPT_DUP_THRESHOLD", "0.5"))
+
+SHINGLE_SIZE = 4
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+# Universal hashing h(x) = (a·x + b) mod p; a, b < 2^31 keeps a·x + b inside uint64.
+_PRIME = np.uint64(4294967311)
+_rng = np.random.default_rng(0xA7)
+_A = _rng.integers(1, 2 ** 31, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 2 ** 31, size=NUM_PERM, dtype=np.uint64)
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^a-z0-9 ]+", " ", text.lower())).strip()
+
+
+def signature(text: str) -> np.ndarray:
+    """MinHash signature (NUM_PERM uint64 values) of `text`."""
+    norm = _normalize(text)
+    if len(norm) < SHINGLE_SIZE:
+        norm = norm.ljust(SHINGLE_SIZE)
+    shingles = {norm[i:i + SHINGLE_SIZE] for i in range(len(norm) - SHINGLE_SIZE + 1)}
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64)
+    return ((np.outer(_A, hashes) + _B[:, None]) % _PRIME).min(axis=1)
+
+
+def _band_keys(sig: np.ndarray) -> List[Tuple[int, bytes]]:
+    return [(band, sig[band * ROWS:(band + 1) * ROWS].tobytes()) for band in range(BANDS)]
+
+
+class PromptIndex:
+    """Append-only MinHash/LSH index persisted as JSON lines."""
+
+    def __init__(self, path: str = INDEX_PATH) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._texts: List[str] = []
+        self._sigs: List[np.ndarray] = []
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = defaultdict(list)
+        # In-flight prompts (not persisted), keyed by the run that holds them.
+        self._pending: Dict[Optional[str], Tuple[str, np.ndarray]] = {}
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def _load(self) -> None:
+        if not os.path.isfile(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self._insert(entry["text"], np.array(entry["sig"], dtype=np.uint64))
+
+    def _insert(self, text: str, sig: np.ndarray) -> None:
+        position = len(self._texts)
+        self._texts.append(text)
+        self._sigs.append(sig)
+        for key in _band_keys(sig):
+            self._buckets[key].append(position)
+
+    def nearest(self, text: str) -> Tuple[float, Optional[str]]:
+        """(estimated Jaccard similarity, closest stored prompt) among LSH candidates."""
+        sig = signature(text)
+        candidates = set()
+        for key in _band_keys(sig):
+            candidates.update(self._buckets.get(key, ()))
+
+        best, match = 0.0, None
+        for position in candidates:
+            similarity = float(np.mean(self._sigs[position] == sig))
+            if similarity > best:
+                best, match = similarity, self._texts[position]
+        return best, match
+
+    def is_duplicate(self, text: str, threshold: float = DUPLICATE_THRESHOLD) -> Tuple[bool, float, Optional[str]]:
+        similarity, match = self.nearest(text)
+        return similarity >= threshold, similarity, match
+
+    def is_new(self, text: str, threshold: float = DUPLICATE_THRESHOLD, replayed: bool = False
+               ) -> Tuple[bool, float, Optional[str]]:
+        """
+        (acceptable, similarity, nearest match). A `replayed` text (a
+        response-cache hit) matching itself exactly is a rerun of a prompt
+        already accepted, not a duplicate.
+        """
+        duplicate, similarity, match = self.is_duplicate(text, threshold)
+        if duplicate and replayed and match is not None and _normalize(match) == _normalize(text):
+            return True, similarity, match
+        return not duplicate, similarity, match
+
+    def reserve_if_new(self, text: str, threshold: float = DUPLICATE_THRESHOLD, replayed: bool = False,
+                       owner: Optional[str] = None) -> Tuple[bool, float, Optional[str]]:
+        """
+        `is_new`, also checked against prompts reserved by other runs. An
+        acceptable text is reserved for `owner` (default: the current run ID),
+        replacing that run's earlier reservation.
+        """
+        owner = owner or telemetry.current_run_id()
+        sig = signature(text)
+        with self._lock:
+            acceptable, similarity, match = self.is_new(text, threshold, replayed)
+            if acceptable:
+                for held_by, (held_text, held_sig) in self._pending.items():
+                    held_similarity = float(np.mean(held_sig == sig))
+                    if held_by != owner and held_similarity >= threshold:
+                        acceptable, similarity, match = False, held_similarity, held_text
+                        break
+            if acceptable:
+                self._pending[owner] = (text, sig)
+        return acceptable, similarity, match
+
+    def reserve(self, text: str, owner: Optional[str] = None) -> None:
+        """Hold `text` for `owner` (default: the current run ID) without checking it."""
+        owner = owner or telemetry.current_run_id()
+        with self._lock:
+            self._pending[owner] = (text, signature(text))
+
+    def release(self, owner: Optional[str]) -> None:
+        """Drop `owner`'s reservation (its run failed or was promoted)."""
+        with self._lock:
+            self._pending.pop(owner, None)
+
+    def add(self, text: str) -> None:
+        """Index `text` and persist it."""
+        sig = signature(text)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"text": text, "sig": sig.tolist()}) + "\n")
+            self._insert(text, sig)
+
+
+_index: Optional[PromptIndex] = None
+_index_lock = threading.Lock()
+
+
+def _backfill_from_ledger(index: PromptIndex) -> None:
+    """Seed a brand-new index with prompts already recorded in the ledger."""
+    from services.ledger import LEDGER_PATH
+
+    if not os.path.isfile(LEDGER_PATH):
+        return
+    try:
+        conn = sqlite3.connect(LEDGER_PATH)
+        try:
+            prompts = [
+                row[0] for row in conn.execute("SELECT prompt FROM runs WHERE prompt IS NOT NULL AND posted = 1")
+            ]
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return
+    for prompt in prompts:
+        index.add(prompt)
+    if prompts:
+        print(f"🗃️ Prompt index seeded with {len(prompts)} past prompt(s) from the ledger")
+
+
+def _reserve_queued(index: PromptIndex) -> None:
+    """Reserve the prompts of bundles already waiting in the inventory."""
+    from services import inventory
+
+    for bundle in inventory.ready_bundles():
+        if bundle.get("prompt"):
+            index.reserve(bundle["prompt"], owner=bundle.get("run_id"))
+
+
+def remember_posted(prompt: Optional[str], run_id: Optional[str] = None) -> None:
+    """
+    Index a prompt once its post went out and drop `run_id`'s reservation
+    (exact repeats, e.g. a resumed run, are not indexed twice).
+    """
+    if not prompt:
+        return
+    index = get_index()
+    _, match = index.nearest(prompt)
+    if match is None or _normalize(match) != _normalize(prompt):
+        index.add(prompt)
+    index.release(run_id)
+
+
+def get_index() -> PromptIndex:
+    """Process-wide prompt index."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = PromptIndex()
+            if not len(_index):
+                _backfill_from_ledger(_index)
+            _reserve_queued(_index)
+        return _index
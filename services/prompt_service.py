@@ -13,10 +13,12 @@ Generates journaling prompts influenced by Joanie’s five emotional modes:
 - sunday_scaries (explicit)
 """
 
-import random
-from openai import OpenAI
+import os
 
-client = OpenAI()
+from services import prompt_index, response_cache, transport
+
+# Near-duplicate guard: regenerations allowed before accepting a repeat
+MAX_PROMPT_ATTEMPTS = int(os.getenv("ATRA_PROMPT_MAX_ATTEMPTS", "3"))
 
 # Explicit-mode intros
 EXPLICIT_PREFIX = {
@@ -63,6 +65,19 @@ EXPLICIT_SEEDS = {
 }
 
 
+def prompt_starter(mode: str) -> str:
+    """Seed line for `mode` (deterministic per run and mode when the response cache is on)."""
+    rng = response_cache.rng("prompt", mode)
+
+    # Explicit modes (corporate_burnout, sunday_scaries)
+    if mode in EXPLICIT_PREFIX:
+        prefix = EXPLICIT_PREFIX[mode]
+        seed = rng.choice(EXPLICIT_SEEDS[mode])
+        return f"{prefix}{seed}"
+    # Implicit modes (ADHD, romantic delusion, existential exhaustion)
+    return rng.choice(IMPLICIT_SEEDS[mode])
+
+
 def generate_prompt(mode: str) -> str:
     """
     Generate a single Joanie-coded journaling prompt based on mood.
@@ -70,14 +85,7 @@ def generate_prompt(mode: str) -> str:
     - some moods referenced directly
     - others influence tone/seed implicitly
     """
-    # Explicit modes (corporate_burnout, sunday_scaries)
-    if mode in EXPLICIT_PREFIX:
-        prefix = EXPLICIT_PREFIX[mode]
-        seed = random.choice(EXPLICIT_SEEDS[mode])
-        starter = f"{prefix}{seed}"
-    else:
-        # Implicit modes (ADHD, romantic delusion, existential exhaustion)
-        starter = random.choice(IMPLICIT_SEEDS[mode])
+    starter = prompt_starter(mode)
 
     system_prompt = f"""
     You are Joanie — a chaotic, self-aware, feminine narrator writing
@@ -98,16 +106,46 @@ def generate_prompt(mode: str) -> str:
     - Max length: ~22 words.
     """
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": system_prompt.strip()},
-            {"role": "user", "content": starter},
-        ],
-        temperature=0.9,
-        max_tokens=60,
-    )
-
-    text = response.choices[0].message.content.strip()
+    messages = [
+        {"role": "system", "content": system_prompt.strip()},
+        {"role": "user", "content": starter},
+    ]
+    index = prompt_index.get_index()
+
+    for attempt in range(1, MAX_PROMPT_ATTEMPTS + 1):
+        params = {
+            "model": "gpt-4o-mini",
+            "messages": messages,
+            "temperature": 0.9,
+            "max_tokens": 60,
+        }
+
+        text, replayed = response_cache.lookup(
+            "chat",
+            params,
+            lambda: transport.openai_client().chat.completions.create(**params).choices[0].message.content,
+        )
+        text = text.strip()
+
+        # Indexed only once posted (main.py), so a cache replay matching itself is a rerun;
+        # until then it is reserved against the other runs in flight.
+        acceptable, similarity, match = index.reserve_if_new(text, replayed=replayed)
+        if acceptable:
+            break
+        if attempt == MAX_PROMPT_ATTEMPTS:
+            print(f"⚠️ Prompt still {similarity:.0%} similar to a past prompt; using it anyway.")
+            index.reserve(text)
+            break
+
+        # Cheap retry (one short chat call) before any image work is paid for.
+        print(f"♻️ Prompt {similarity:.0%} similar to a past one; regenerating ({attempt}/{MAX_PROMPT_ATTEMPTS - 1}).")
+        messages = messages + [
+            {"role": "assistant", "content": text},
+            {
+                "role": "user",
+                "content": f"Too close to a past prompt (\"{match}\"). Write a clearly different one, same mode.",
+            },
+        ]
+
     print(f"🧠 Generated Joanie prompt ({mode}): {text}")
     return text
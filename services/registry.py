@@ -0,0 +1,59 @@
+"""
+Service Registry
+Resolves pipeline services by name, importing their modules on first use.
+
+main.py only needs the service *names* to declare the pipeline, so
+`--help`, the mood engine and the ledger paths start without loading
+openai, PIL, gspread, google-auth, cloudinary or requests.
+"""
+
+import importlib
+import threading
+from typing import Any, Callable, Dict
+
+SERVICES: Dict[str, str] = {
+    "generate_prompt": "services.prompt_service:generate_prompt",
+    "generate_image": "services.image_service:generate_image",
+    "generate_instagram_caption": "services.caption_service:generate_instagram_caption",
+    "generate_facebook_caption": "services.caption_service:generate_facebook_caption",
+    "generate_text": "services.text_service:generate_text",
+    "prompt_from_text": "services.text_service:prompt_from_text",
+    "instagram_caption_from_text": "services.text_service:instagram_caption_from_text",
+    "facebook_caption_from_text": "services.text_service:facebook_caption_from_text",
+    "render_renditions": "services.rendition_service:render_all",
+    "upload_renditions": "services.rendition_service:upload_renditions",
+    "upload_asset": "services.upload_service:upload_asset",
+    "update_sheet": "services.sheet_service:update_sheet",
+    "send_to_make_webhook": "services.post_service:send_to_make_webhook",
+}
+
+_lock = threading.Lock()
+_resolved: Dict[str, Callable[..., Any]] = {}
+
+
+def get(name: str) -> Callable[..., Any]:
+    """Import (once) and return the service registered as `name`."""
+    func = _resolved.get(name)
+    if func is None:
+        try:
+            target = SERVICES[name]
+        except KeyError:
+            raise KeyError(f"Unknown service '{name}'") from None
+        module_name, attr = target.split(":")
+        # One importer at a time: stages resolve their services concurrently.
+        with _lock:
+            func = _resolved.get(name)
+            if func is None:
+                func = getattr(importlib.import_module(module_name), attr)
+                _resolved[name] = func
+    return func
+
+
+def lazy(name: str) -> Callable[..., Any]:
+    """Callable that resolves `name` only when first invoked."""
+
+    def _call(*args: Any, **kwargs: Any) -> Any:
+        return get(name)(*args, **kwargs)
+
+    _call.__name__ = _call.__qualname__ = name
+    return _call
@@ -0,0 +1,180 @@
+"""
+Rendition Service
+Platform-specific JPEG renditions of the final image, encoded in parallel.
+
+Each rendition is a crop (or blurred-backdrop pad) + resize of the single
+decoded source, encoded to a per-platform byte budget: a binary search
+over JPEG quality finds the highest quality that fits, and only the final
+encode pays for `optimize` (which never makes a file larger). Renditions
+are encoded in a process pool, so adding platforms doesn't add encode
+wall-clock time; the source pixels are shipped to the workers once per
+rendition as raw bytes, never re-decoded.
+
+Opt-in pipeline stages (ATRA_RENDITIONS=1): `renditions` and
+`rendition_urls`, the latter uploaded next to the original asset and sent
+to Make.com with the post.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Dict, Optional, Tuple
+
+from PIL import Image, ImageFilter
+
+from services.artifact import ImageArtifact
+
+
+@dataclass(frozen=True)
+class Rendition:
+    width: int
+    height: int
+    max_bytes: int
+    fit: str = "crop"  # "crop" to the aspect, or "pad" on a blurred backdrop
+
+
+RENDITIONS: Dict[str, Rendition] = {
+    "instagram": Rendition(1080, 1350, 600 * 1024),               # 4:5 feed
+    "facebook": Rendition(1080, 1080, 500 * 1024),                # square feed
+    "tiktok": Rendition(1080, 1920, 900 * 1024, fit="pad"),       # 9:16 photo post
+}
+
+MIN_QUALITY = int(os.getenv("ATRA_RENDITION_MIN_QUALITY", "60"))
+MAX_QUALITY = int(os.getenv("ATRA_RENDITION_MAX_QUALITY", "92"))
+PROGRESSIVE = os.getenv("ATRA_RENDITION_PROGRESSIVE", "0").strip() in {"1", "true", "True"}
+# 0 encodes in the calling thread (no pool).
+WORKERS = int(os.getenv("ATRA_RENDITION_WORKERS", str(min(len(RENDITIONS), os.cpu_count() or 1))))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+# -------------------------------------------------
+# Geometry
+# -------------------------------------------------
+def _crop_to_aspect(image: Image.Image, width: int, height: int) -> Image.Image:
+    """Centre crop to width:height."""
+    target = width / height
+    if image.width / image.height > target:
+        new_width = round(image.height * target)
+        left = (image.width - new_width) // 2
+        return image.crop((left, 0, left + new_width, image.height))
+    new_height = round(image.width / target)
+    top = (image.height - new_height) // 2
+    return image.crop((0, top, image.width, top + new_height))
+
+
+def _shape(image: Image.Image, spec: Rendition) -> Image.Image:
+    size = (spec.width, spec.height)
+    if spec.fit == "pad":
+        # Whole frame on a blurred, cover-filled copy of itself (nothing cropped).
+        backdrop = _crop_to_aspect(image, spec.width, spec.height).resize(
+            (spec.width // 8, spec.height // 8), Image.BILINEAR
+        ).filter(ImageFilter.GaussianBlur(6)).resize(size, Image.BILINEAR)
+        scale = min(spec.width / image.width, spec.height / image.height)
+        fitted = image.resize((round(image.width * scale), round(image.height * scale)), Image.LANCZOS)
+        backdrop.paste(fitted, ((spec.width - fitted.width) // 2, (spec.height - fitted.height) // 2))
+        return backdrop
+    return _crop_to_aspect(image, spec.width, spec.height).resize(size, Image.LANCZOS)
+
+
+# -------------------------------------------------
+# Byte-budgeted encode
+# -------------------------------------------------
+def _encode(image: Image.Image, quality: int, progressive: bool, optimize: bool = False) -> bytes:
+    buffer = BytesIO()
+    image.save(
+        buffer,
+        format="JPEG",
+        quality=quality,
+        subsampling="4:2:0",
+        progressive=progressive,
+        optimize=optimize,
+    )
+    return buffer.getvalue()
+
+
+def encode_to_budget(
+    image: Image.Image,
+    max_bytes: int,
+    progressive: bool = PROGRESSIVE,
+    min_quality: int = MIN_QUALITY,
+    max_quality: int = MAX_QUALITY,
+) -> Tuple[bytes, int]:
+    """(JPEG bytes, quality): the highest quality within `max_bytes` (min_quality if none fits)."""
+    if len(_encode(image, max_quality, progressive)) <= max_bytes:
+        return _encode(image, max_quality, progressive, optimize=True), max_quality
+    best = min_quality
+    low, high = min_quality, max_quality - 1
+    while low <= high:
+        quality = (low + high) // 2
+        if len(_encode(image, quality, progressive)) <= max_bytes:
+            best, low = quality, quality + 1
+        else:
+            high = quality - 1
+    return _encode(image, best, progressive, optimize=True), best
+
+
+def _render(raw: bytes, mode: str, size: Tuple[int, int], name: str, spec: Rendition,
+            progressive: bool) -> Tuple[str, bytes, int]:
+    """Worker entry point: rebuild the source from raw pixels, shape and encode."""
+    image = Image.frombytes(mode, size, raw)
+    data, quality = encode_to_budget(_shape(image, spec), spec.max_bytes, progressive)
+    return name, data, quality
+
+
+# -------------------------------------------------
+# Pool
+# -------------------------------------------------
+def _executor() -> ProcessPoolExecutor:
+    """Shared process pool (spawn/forkserver: safe next to the pipeline's threads)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context(method))
+        return _pool
+
+
+def shutdown() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
+
+
+def render_all(
+    image: ImageArtifact,
+    renditions: Optional[Dict[str, Rendition]] = None,
+    progressive: bool = PROGRESSIVE,
+) -> Dict[str, ImageArtifact]:
+    """Every rendition of `image`, encoded concurrently; {name: JPEG artifact}."""
+    renditions = renditions or RENDITIONS
+    source = image.image.convert("RGB")
+    raw = source.tobytes()
+    jobs = [(raw, source.mode, source.size, name, spec, progressive) for name, spec in renditions.items()]
+    if WORKERS <= 0:
+        rendered = [_render(*job) for job in jobs]
+    else:
+        futures = [_executor().submit(_render, *job) for job in jobs]
+        rendered = [future.result() for future in futures]
+
+    results = {}
+    for name, data, quality in rendered:
+        spec = renditions[name]
+        results[name] = ImageArtifact(data, "JPEG", f"{name}_{spec.width}x{spec.height}.jpg")
+        print(f"🖼️ Rendition {name}: {spec.width}x{spec.height}, q{quality}, {len(data) / 1024:.0f} KiB")
+    return results
+
+
+def upload_renditions(renditions: Dict[str, ImageArtifact]) -> Dict[str, str]:
+    """Upload every rendition in parallel; {name: URL} (failed uploads are left out)."""
+    from services.upload_service import upload_asset
+
+    with ThreadPoolExecutor(max_workers=max(1, len(renditions))) as pool:
+        urls = dict(zip(renditions, pool.map(upload_asset, renditions.values())))
+    return {name: url for name, url in urls.items() if url}
@@ -0,0 +1,166 @@
+"""
+Response Cache
+Disk-backed, content-addressed cache for OpenAI chat and image responses.
+
+Entries are keyed by a SHA-256 of the model, messages/prompt and request
+parameters, expire after a TTL and are evicted least-recently-used once the
+cache exceeds its size budget.
+
+Sampling is non-deterministic, so caching is strictly opt-in:
+ATRA_RESPONSE_CACHE=1 (or `main.py --cache`).
+"""
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Optional, Tuple
+
+from services import filestore, telemetry
+
+CACHE_DIR = os.getenv("ATRA_RESPONSE_CACHE_DIR", "output/_response_cache")
+TTL_SECONDS = float(os.getenv("ATRA_RESPONSE_CACHE_TTL", str(7 * 24 * 3600)))
+MAX_BYTES = int(float(os.getenv("ATRA_RESPONSE_CACHE_MAX_MB", "256")) * 1024 * 1024)
+
+_enabled = os.getenv("ATRA_RESPONSE_CACHE", "0").strip() in {"1", "true", "True"}
+_lock = threading.Lock()
+
+
+def enable(flag: bool = True) -> None:
+    """Turn the cache on/off for this process."""
+    global _enabled
+    _enabled = flag
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def _json_default(value: Any) -> Any:
+    # Raw image bytes are keyed by content hash, not embedded.
+    if isinstance(value, (bytes, bytearray)):
+        return {"sha256": hashlib.sha256(value).hexdigest()}
+    raise TypeError(f"Unhashable cache key component: {type(value).__name__}")
+
+
+def cache_key(namespace: str, payload: dict) -> str:
+    """Stable content hash for `payload` (model + messages/prompt + params)."""
+    blob = json.dumps(
+        {"namespace": namespace, "payload": payload},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=_json_default,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _entry_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, key[:2], f"{key}.json")
+
+
+def get(key: str) -> Optional[str]:
+    """Return the cached value for `key`, or None if missing/expired."""
+    path = _entry_path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if time.time() - entry.get("created", 0) > TTL_SECONDS:
+        _remove(path)
+        return None
+
+    # mtime doubles as the LRU clock.
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+    return entry.get("value")
+
+
+def put(key: str, value: str) -> None:
+    """Store `value` under `key` atomically, then enforce the size budget."""
+    path = _entry_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    filestore.atomic_write_json(path, {"created": time.time(), "value": value})
+    _evict()
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _evict() -> None:
+    with _lock:
+        entries = []
+        total = 0
+        for root, _, files in os.walk(CACHE_DIR):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        if total <= MAX_BYTES:
+            return
+
+        for _, size, path in sorted(entries):
+            _remove(path)
+            total -= size
+            if total <= MAX_BYTES:
+                break
+
+
+def lookup(namespace: str, payload: dict, compute: Callable[[], str]) -> Tuple[str, bool]:
+    """
+    Like `cached`, but returns `(value, replayed)`: `replayed` is True when
+    the value came from the cache instead of a fresh API call.
+    """
+    if not _enabled:
+        with telemetry.span(f"openai.{namespace}", model=payload.get("model")):
+            return compute(), False
+
+    key = cache_key(namespace, payload)
+    value = get(key)
+    if value is not None:
+        print(f"💾 Cache hit ({namespace}) {key[:12]}")
+        return value, True
+
+    with telemetry.span(f"openai.{namespace}", model=payload.get("model")):
+        value = compute()
+    put(key, value)
+    return value, False
+
+
+def cached(namespace: str, payload: dict, compute: Callable[[], str]) -> str:
+    """Return a cached response for `payload`, computing and storing it on a miss."""
+    return lookup(namespace, payload, compute)[0]
+
+
+def rng(*parts: Any):
+    """
+    Random source for choices that feed a cache key.
+
+    With the cache on, seed/clutter picks are seeded from `parts` + today's
+    date + the current run ID, so resuming a run rebuilds identical requests
+    (and hits the cache) while other runs of the same mode – a batch, the
+    next produce – still get their own picks.
+    Otherwise this is the `random` module itself (shared global generator).
+    """
+    if not _enabled:
+        return random
+    run_id = telemetry.current_run_id()
+    seed = "|".join(str(part) for part in (datetime.now().date(), run_id, *parts))
+    return random.Random(seed)
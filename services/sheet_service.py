@@ -1,34 +1,235 @@
 """
 Sheet Service
 Handles appending prompt + image data to Google Sheets.
+
+Rows go through a long-lived SheetWriter: the authorized gspread client
+and worksheet handle are cached, and rows are buffered in a local
+write-ahead file (fsync'd before update_sheet returns). The buffer is
+flushed with a single `append_rows` call on size/age thresholds and at
+process exit. Rows still in the write-ahead file from a crashed run are
+sent on the next flush. Rows appended with an idempotency key (the run
+ID) are buffered at most once, so a resumed run can't duplicate its row;
+the keys are held in memory, and the sent-keys file keeps the newest
+KEYS_KEEP.
 """
 
 import os
+import json
+import time
+import atexit
 import datetime
-import gspread
-from google.oauth2.service_account import Credentials
+import threading
+from typing import List, Optional, Set, Tuple
+
+from services import filestore, telemetry
+
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+WAL_PATH = os.getenv("ATRA_SHEET_WAL", "state/sheet_wal.jsonl")
+FLUSH_ROWS = int(os.getenv("ATRA_SHEET_FLUSH_ROWS", "10"))
+FLUSH_SECONDS = float(os.getenv("ATRA_SHEET_FLUSH_SECONDS", "60"))
+# Sent idempotency keys remembered (most recent first kept); resumes happen within days.
+KEYS_KEEP = int(os.getenv("ATRA_SHEET_KEYS_KEEP", "1000"))
+
+
+class SheetWriter:
+    """Buffered, batched appender for one worksheet."""
+
+    def __init__(
+        self,
+        sheet_id: Optional[str] = None,
+        creds_path: Optional[str] = None,
+        worksheet: Optional[str] = None,
+        wal_path: str = WAL_PATH,
+        flush_rows: int = FLUSH_ROWS,
+        flush_seconds: float = FLUSH_SECONDS,
+        client=None,
+    ) -> None:
+        self.sheet_id = sheet_id or os.getenv("SHEET_ID")
+        self.creds_path = creds_path or os.getenv("GOOGLE_SHEETS_CREDENTIALS_PATH")
+        self.worksheet_name = worksheet
+        self.wal_path = wal_path
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+
+        self._lock = threading.RLock()
+        # Any gspread-compatible client (open_by_key → worksheet/sheet1 → append_rows).
+        self._client = client
+        self._worksheet = None
+        self._oldest_pending: Optional[float] = None
+        # Keys buffered or sent, loaded from disk on first use.
+        self._keys: Optional[Set[str]] = None
+
+    # -------------------------------------------------
+    # Connection (authorized once, then reused)
+    # -------------------------------------------------
+    def _get_worksheet(self):
+        if self._worksheet is None:
+            if self._client is None:
+                import gspread
+                from google.oauth2.service_account import Credentials
+
+                creds = Credentials.from_service_account_file(self.creds_path, scopes=SCOPES)
+                self._client = gspread.authorize(creds)
+            spreadsheet = self._client.open_by_key(self.sheet_id)
+            if self.worksheet_name:
+                self._worksheet = spreadsheet.worksheet(self.worksheet_name)
+            else:
+                self._worksheet = spreadsheet.sheet1
+        return self._worksheet
+
+    # -------------------------------------------------
+    # Write-ahead buffer
+    # -------------------------------------------------
+    def _pending_entries(self) -> List[Tuple[Optional[str], list]]:
+        """(idempotency key or None, row) for every buffered row."""
+        if not os.path.isfile(self.wal_path):
+            return []
+        entries = []
+        with open(self.wal_path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Torn final line from a crash mid-write.
+                    continue
+                if isinstance(entry, dict):
+                    entries.append((entry.get("key"), entry["row"]))
+                else:
+                    entries.append((None, entry))
+        return entries
+
+    def _pending_rows(self) -> List[list]:
+        return [row for _, row in self._pending_entries()]
+
+    @property
+    def _keys_path(self) -> str:
+        return f"{self.wal_path}.keys"
+
+    def _sent_keys(self) -> List[str]:
+        if not os.path.isfile(self._keys_path):
+            return []
+        with open(self._keys_path, "r") as f:
+            return [line.strip() for line in f if line.strip()]
+
+    def _seen_keys(self) -> Set[str]:
+        """Keys already buffered or sent (read from disk once, then kept in memory)."""
+        if self._keys is None:
+            self._keys = set(self._sent_keys())
+            self._keys.update(key for key, _ in self._pending_entries() if key)
+        return self._keys
+
+    def _record_sent_keys(self, keys: List[str]) -> None:
+        """Append flushed keys to the .keys file, compacted to the newest KEYS_KEEP."""
+        sent = (self._sent_keys() + keys)[-KEYS_KEEP:]
+        filestore.atomic_write(self._keys_path, "".join(f"{key}\n" for key in sent))
+        self._keys = set(sent)
+
+    def append(self, row: list, key: Optional[str] = None) -> bool:
+        """
+        Durably buffer `row`, flushing if a threshold is reached. With `key`,
+        a row already buffered or sent under that key is skipped (returns False).
+        """
+        with self._lock:
+            if key and key in self._seen_keys():
+                return False
+            os.makedirs(os.path.dirname(self.wal_path) or ".", exist_ok=True)
+            with open(self.wal_path, "a") as f:
+                f.write(json.dumps({"key": key, "row": row} if key else row) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            if key:
+                self._seen_keys().add(key)
 
-def update_sheet(prompt: str, image_url: str) -> None:
-    """Append a row [timestamp, prompt, image_url] to the target Google Sheet."""
+            if self._oldest_pending is None:
+                self._oldest_pending = time.monotonic()
+
+            pending = len(self._pending_rows())
+            age = time.monotonic() - self._oldest_pending
+            if pending >= self.flush_rows or age >= self.flush_seconds:
+                self.flush()
+            return True
+
+    def flush(self) -> int:
+        """Send every buffered row in one `append_rows` call; return rows sent."""
+        with self._lock:
+            entries = self._pending_entries()
+            rows = [row for _, row in entries]
+            if not rows:
+                self._oldest_pending = None
+                return 0
+
+            if not self.sheet_id or (not self.creds_path and self._client is None):
+                print(f"⚠️ Missing Sheets credentials or sheet ID; {len(rows)} row(s) kept in {self.wal_path}.")
+                return 0
+
+            try:
+                with telemetry.span("sheets.append_rows", rows=len(rows)):
+                    self._get_worksheet().append_rows(rows, value_input_option="RAW")
+            except Exception as e:
+                # Drop cached handles in case the session went stale; rows stay buffered.
+                self._worksheet = None
+                print(f"❌ Failed to flush {len(rows)} row(s) to Google Sheet: {e}")
+                return 0
+
+            keys = [key for key, _ in entries if key]
+            if keys:
+                self._record_sent_keys(keys)
+            os.remove(self.wal_path)
+            self._oldest_pending = None
+            print(f"📒 Flushed {len(rows)} row(s) to Google Sheet")
+            return len(rows)
+
+
+_writer: Optional[SheetWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> SheetWriter:
+    """Process-wide SheetWriter (flushed automatically at exit)."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = SheetWriter()
+            atexit.register(_writer.flush)
+        return _writer
+
+
+def use_writer(writer: SheetWriter) -> None:
+    """Replace the process-wide writer (e.g. one built on a stand-in client)."""
+    global _writer
+    with _writer_lock:
+        _writer = writer
+
+
+def update_sheet(prompt: str, image_url: str, idempotency_key: Optional[str] = None) -> bool:
+    """
+    Append a row [timestamp, prompt, image_url] to the target Google Sheet.
+    `idempotency_key` (the run ID) keeps a resumed run from adding it twice.
+    Returns True once the row is buffered (or was already logged); a run
+    without an image URL is not logged, so its resume still writes the row.
+    """
     creds_path = os.getenv("GOOGLE_SHEETS_CREDENTIALS_PATH")
     sheet_id = os.getenv("SHEET_ID")
 
     if not creds_path or not sheet_id:
         print("⚠️ Missing Sheets credentials or sheet ID.")
-        return
+        return False
 
-    try:
-        # Authorize the client
-        scopes = ["https://www.googleapis.com/auth/spreadsheets"]
-        creds = Credentials.from_service_account_file(creds_path, scopes=scopes)
-        client = gspread.authorize(creds)
+    if not image_url:
+        print("⚠️ No image URL (upload failed?); not logging to Google Sheet.")
+        return False
 
-        # Open the sheet and append
-        sheet = client.open_by_key(sheet_id).sheet1
+    try:
         timestamp = datetime.datetime.now().isoformat()
-        sheet.append_row([timestamp, prompt, image_url])
-        print(f"📒 Added new row at {timestamp}")
+        if not get_writer().append([timestamp, prompt, image_url], key=idempotency_key):
+            print(f"📒 Row for run {idempotency_key} already logged; skipping.")
+            return True
+        print(f"📒 Buffered new row at {timestamp}")
+        return True
 
     except Exception as e:
         print(f"❌ Failed to update Google Sheet: {e}")
-
+        return False
@@ -0,0 +1,260 @@
+"""
+Telemetry
+Lightweight timing spans for pipeline stages and external calls.
+
+    with telemetry.span("openai.images.generate", model=model) as span:
+        ...
+        span.retry()          # count a retry/fallback inside the span
+
+Each finished span is appended to state/telemetry/spans.jsonl with its run
+ID, parent span, duration, retry count and outcome. `export_prometheus()`
+rewrites a node-exporter textfile (state/telemetry/atra.prom) with p50/p95
+summaries over the most recent spans of every name, across runs. Once the
+spans file passes ATRA_TELEMETRY_MAX_MB it is rotated to spans.jsonl.1 and
+restarted with just those recent spans, so exports stay bounded.
+
+Opt-in via ATRA_TELEMETRY=1 (or `main.py --telemetry`). When disabled,
+`span()` returns a shared no-op object, so instrumented code pays one
+flag check per call.
+"""
+
+import contextvars
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from services import filestore
+
+TELEMETRY_DIR = os.getenv("ATRA_TELEMETRY_DIR", "state/telemetry")
+SPANS_PATH = os.path.join(TELEMETRY_DIR, "spans.jsonl")
+PROM_PATH = os.path.join(TELEMETRY_DIR, "atra.prom")
+# Most recent spans per name that feed the p50/p95 summaries.
+SUMMARY_WINDOW = int(os.getenv("ATRA_TELEMETRY_WINDOW", "500"))
+# Past this size, flush() rotates spans.jsonl to spans.jsonl.1 and keeps only the summary window.
+MAX_BYTES = int(float(os.getenv("ATRA_TELEMETRY_MAX_MB", "8")) * 1024 * 1024)
+
+_enabled = os.getenv("ATRA_TELEMETRY", "0").strip() in {"1", "true", "True"}
+_write_lock = threading.Lock()
+_run_id: contextvars.ContextVar = contextvars.ContextVar("atra_run_id", default=None)
+_current: contextvars.ContextVar = contextvars.ContextVar("atra_span", default=None)
+
+
+def enable(flag: bool = True) -> None:
+    """Turn span recording on/off for this process."""
+    global _enabled
+    _enabled = flag
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+class Span:
+    """One timed operation; use as a context manager."""
+
+    __slots__ = ("name", "attrs", "run_id", "parent", "retries", "outcome", "started_at", "_t0", "_token")
+
+    def __init__(self, name: str, attrs: Dict[str, Any]) -> None:
+        self.name = name
+        self.attrs = attrs
+        self.run_id = _run_id.get()
+        parent = _current.get()
+        self.parent = parent.name if parent is not None else None
+        self.retries = 0
+        self.outcome: Optional[str] = None
+
+    def retry(self, count: int = 1) -> None:
+        self.retries += count
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def set_outcome(self, outcome: str) -> None:
+        """Mark a span that returned normally but didn't succeed (e.g. "timeout")."""
+        self.outcome = outcome
+
+    def __enter__(self) -> "Span":
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self._token = _current.set(self)
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        duration = time.perf_counter() - self._t0
+        _current.reset(self._token)
+        if exc_type is not None:
+            self.outcome = "error"
+            self.attrs["error"] = f"{exc_type.__name__}: {exc}"[:300]
+        _write({
+            "name": self.name,
+            "run_id": self.run_id,
+            "parent": self.parent,
+            "started_at": self.started_at,
+            "duration": round(duration, 6),
+            "retries": self.retries,
+            "outcome": self.outcome or "ok",
+            **({"attrs": self.attrs} if self.attrs else {}),
+        })
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def retry(self, count: int = 1) -> None:
+        pass
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+    def set_outcome(self, outcome: str) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name: str, **attrs: Any):
+    """Time the enclosed block as `name` (no-op when telemetry is off)."""
+    if not _enabled:
+        return _NOOP
+    return Span(name, attrs)
+
+
+def current_run_id() -> Optional[str]:
+    """Run ID set by the enclosing `run_context` (None outside a run)."""
+    return _run_id.get()
+
+
+def current():
+    """The innermost open span in this context (or a no-op)."""
+    if not _enabled:
+        return _NOOP
+    return _current.get() or _NOOP
+
+
+class run_context:
+    """Tag every span opened inside the block (and its stage threads) with `run_id`."""
+
+    def __init__(self, run_id: str) -> None:
+        self.run_id = run_id
+
+    def __enter__(self) -> "run_context":
+        self._token = _run_id.set(self.run_id)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        _run_id.reset(self._token)
+        return False
+
+
+def _write(record: Dict[str, Any]) -> None:
+    line = json.dumps(record, default=str) + "\n"
+    try:
+        with _write_lock:
+            os.makedirs(os.path.dirname(SPANS_PATH) or ".", exist_ok=True)
+            with open(SPANS_PATH, "a", encoding="utf-8") as f:
+                f.write(line)
+    except OSError as exc:
+        print(f"⚠️ Could not record telemetry span: {exc}")
+
+
+# -------------------------------------------------
+# Summaries / export
+# -------------------------------------------------
+def _percentile(values: list, q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    return values[max(0, math.ceil(q * len(values)) - 1)]
+
+
+def _recent(path: str, window: int) -> Dict[str, deque]:
+    """The last `window` span records per name."""
+    recent: Dict[str, deque] = defaultdict(lambda: deque(maxlen=window))
+    if os.path.isfile(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                recent[record["name"]].append(record)
+    return recent
+
+
+def summarize(path: str = SPANS_PATH, window: int = SUMMARY_WINDOW,
+              recent: Optional[Dict[str, deque]] = None) -> Dict[str, Dict[str, float]]:
+    """{span name: count, p50, p95, max, sum, errors, retries} over the last `window` spans per name."""
+    recent = recent if recent is not None else _recent(path, window)
+    summary = {}
+    for name, records in sorted(recent.items()):
+        durations = sorted(r["duration"] for r in records)
+        summary[name] = {
+            "count": len(records),
+            "p50": _percentile(durations, 0.50),
+            "p95": _percentile(durations, 0.95),
+            "max": durations[-1],
+            "sum": sum(durations),
+            "errors": sum(1 for r in records if r.get("outcome", "ok") != "ok"),
+            "retries": sum(r.get("retries", 0) for r in records),
+        }
+    return summary
+
+
+def export_prometheus(path: str = PROM_PATH, summary: Optional[Dict[str, Dict[str, float]]] = None) -> str:
+    """Write a Prometheus textfile (atomic replace) from `summarize()`; returns the path."""
+    summary = summary if summary is not None else summarize()
+    lines = [
+        "# HELP atra_span_duration_seconds Span duration over the most recent spans per name.",
+        "# TYPE atra_span_duration_seconds summary",
+    ]
+    for name, stats in summary.items():
+        label = name.replace("\\", "\\\\").replace('"', '\\"')
+        lines.append(f'atra_span_duration_seconds{{span="{label}",quantile="0.5"}} {stats["p50"]:.6f}')
+        lines.append(f'atra_span_duration_seconds{{span="{label}",quantile="0.95"}} {stats["p95"]:.6f}')
+        lines.append(f'atra_span_duration_seconds_sum{{span="{label}"}} {stats["sum"]:.6f}')
+        lines.append(f'atra_span_duration_seconds_count{{span="{label}"}} {stats["count"]}')
+    for metric, key, help_text in (
+        ("atra_span_errors", "errors", "Spans that did not end ok (raised, failed, timed out), over the same window."),
+        ("atra_span_retries", "retries", "Retries/fallbacks recorded inside spans, over the same window."),
+    ):
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} gauge")
+        for name, stats in summary.items():
+            label = name.replace("\\", "\\\\").replace('"', '\\"')
+            lines.append(f'{metric}{{span="{label}"}} {stats[key]}')
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    filestore.atomic_write(path, "\n".join(lines) + "\n")
+    return path
+
+
+def _rotate(recent: Dict[str, deque], path: str = SPANS_PATH) -> None:
+    """Move `path` to `path`.1 and restart it with the summary window only."""
+    records = sorted((r for records in recent.values() for r in records), key=lambda r: r["started_at"])
+    with _write_lock:
+        os.replace(path, f"{path}.1")
+        filestore.atomic_write(path, "".join(json.dumps(record, default=str) + "\n" for record in records))
+
+
+def flush() -> None:
+    """Refresh the Prometheus textfile and rotate oversized spans if telemetry is on (never raises)."""
+    if not _enabled:
+        return
+    try:
+        recent = _recent(SPANS_PATH, SUMMARY_WINDOW)
+        export_prometheus(summary=summarize(recent=recent))
+        if os.path.isfile(SPANS_PATH) and os.path.getsize(SPANS_PATH) > MAX_BYTES:
+            _rotate(recent)
+    except Exception as exc:
+        print(f"⚠️ Could not export telemetry metrics: {exc}")
@@ -0,0 +1,185 @@
+"""
+Text Service – combined prompt + captions
+One structured gpt-4o-mini call for the journaling prompt, IG caption and
+FB caption (opt-in: ATRA_COMBINED_TEXT=1).
+
+The reply is a strict JSON schema object. Each field is checked against the
+same rules the per-call path asks for (word counts, emoji limits, no
+hashtags/links/line breaks, prompt near-duplicate guard); the Amazon CTA is
+appended locally. If the call fails or anything doesn't validate, the stage
+falls back to `generate_prompt`, and the caption stages generate their
+captions with the usual per-call path.
+"""
+
+import json
+import re
+from typing import Dict, Optional, Tuple
+
+from services import caption_service, prompt_index, prompt_service, response_cache, transport
+
+PROMPT_MAX_WORDS = 25  # the per-call prompt asks for "~22 words"
+IG_WORDS = (8, 20)
+FB_MAX_SENTENCES = 2
+
+TEXT_SCHEMA = {
+    "name": "joanie_post_text",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "prompt": {"type": "string"},
+            "ig_caption": {"type": "string"},
+            "fb_caption": {"type": "string"},
+        },
+        "required": ["prompt", "ig_caption", "fb_caption"],
+        "additionalProperties": False,
+    },
+}
+
+# One emoji per grapheme cluster: a flag pair, a keycap, or a pictograph with
+# its variation selector, skin tone and tag characters, plus ZWJ-joined parts.
+_PICTOGRAPH = "[\U0001F000-\U0001FAFF\u2300-\u23FF\u2600-\u27BF\u2B00-\u2BFF]"
+_MODIFIERS = "[\uFE0E\uFE0F]?[\U0001F3FB-\U0001F3FF]?[\U000E0020-\U000E007F]*"
+_EMOJI = re.compile(
+    "(?:[\U0001F1E6-\U0001F1FF]{2}"
+    "|[0-9#*]\uFE0F?\u20E3"
+    f"|{_PICTOGRAPH}{_MODIFIERS}(?:\u200D{_PICTOGRAPH}{_MODIFIERS})*)"
+)
+_ENDS_WITH_EMOJI = re.compile(f"(?:{_EMOJI.pattern})$")
+_LINK = re.compile(r"https?://|www\.", re.IGNORECASE)
+_SENTENCE_END = re.compile(r"[.!?…]+(?=\s|$)")
+
+
+def _emoji_count(text: str) -> int:
+    return len(_EMOJI.findall(text))
+
+
+def _word_count(text: str) -> int:
+    return len(_EMOJI.sub(" ", text).split())
+
+
+def validate(bundle: Dict[str, str]) -> Optional[str]:
+    """First rule the bundle breaks, or None if it passes."""
+    prompt, ig, fb = bundle["prompt"], bundle["ig_caption"], bundle["fb_caption"]
+    for name, text in bundle.items():
+        if not text:
+            return f"{name} is empty"
+        if "\n" in text:
+            return f"{name} has a line break"
+        if "#" in text:
+            return f"{name} has a hashtag"
+
+    if _emoji_count(prompt):
+        return "prompt has emojis"
+    if _word_count(prompt) > PROMPT_MAX_WORDS:
+        return f"prompt is {_word_count(prompt)} words"
+
+    if not IG_WORDS[0] <= _word_count(ig) <= IG_WORDS[1]:
+        return f"ig_caption is {_word_count(ig)} words"
+    if _emoji_count(ig) > 1:
+        return "ig_caption has more than one emoji"
+
+    if _LINK.search(fb):
+        return "fb_caption has a link"
+    if _emoji_count(fb) != 1 or not _ENDS_WITH_EMOJI.search(fb):
+        return "fb_caption must end with exactly one emoji"
+    if len(_SENTENCE_END.findall(_EMOJI.sub("", fb).strip())) > FB_MAX_SENTENCES:
+        return "fb_caption is more than two sentences"
+    return None
+
+
+def _system_prompt(mode: str) -> str:
+    return f"""
+    You are Joanie — a chaotic, self-aware, feminine narrator writing for
+    'You Won’t Believe This $H!T'. Mode: {mode}
+
+    Return JSON with three fields:
+
+    prompt – a journaling prompt:
+    - Short, punchy, personal, emotional, very human.
+    - Tone intensity depends on mode:
+        * corporate_burnout → drier, sarcastic
+        * adhd_spiral → frantic, racing thoughts, playful
+        * delusional_romantic → dreamy, dramatic, almost poetic
+        * existentially_exhausted → weary, cosmic, overthinking
+        * sunday_scaries → dread mixed with humor
+    - NO hashtags. NO emojis. NO inspirational quotes.
+    - Must read like something Joanie would actually journal.
+    - Max length: ~22 words.
+
+    ig_caption – an Instagram caption for that prompt:
+    - ONE punchy, clever line (8–20 words)
+    - Incorporate this mood hint naturally: "{caption_service.instagram_mood_hint(mode)}"
+    - Slightly chaotic, witty, self-aware
+    - 0–1 emojis MAX, no hashtags, no line breaks
+    - Connect loosely to the journaling prompt
+
+    fb_caption – a Facebook caption for that prompt:
+    - 1–2 short sentences as a mini confession/story.
+    - Incorporate this tone subtly: "{caption_service.facebook_mood_hint(mode)}"
+    - Blend humor with emotional self-awareness.
+    - End with EXACTLY one emoji. No hashtags, no links, no line breaks.
+    """
+
+
+def _combined_call(mode: str) -> Tuple[Dict[str, str], bool]:
+    """(prompt + captions, replayed from the response cache)."""
+    params = {
+        "model": "gpt-4o-mini",
+        "messages": [
+            {"role": "system", "content": _system_prompt(mode).strip()},
+            {"role": "user", "content": prompt_service.prompt_starter(mode)},
+        ],
+        "temperature": 0.9,
+        "max_tokens": 260,
+        "response_format": {"type": "json_schema", "json_schema": TEXT_SCHEMA},
+    }
+    raw, replayed = response_cache.lookup(
+        "chat",
+        params,
+        lambda: transport.openai_client().chat.completions.create(**params).choices[0].message.content,
+    )
+    data = json.loads(raw)
+    return {key: str(data[key]).strip() for key in ("prompt", "ig_caption", "fb_caption")}, replayed
+
+
+def generate_text(mode: str) -> Dict[str, str]:
+    """
+    Prompt + both captions from one call. On fallback only "prompt" is set
+    and the caption stages generate their own captions.
+    """
+    try:
+        bundle, replayed = _combined_call(mode)
+        problem = validate(bundle)
+    except Exception as exc:
+        bundle, replayed, problem = None, False, f"{type(exc).__name__}: {exc}"
+
+    if problem is None:
+        # The prompt is indexed once posted (main.py); until then it is only reserved.
+        acceptable, similarity, _ = prompt_index.get_index().reserve_if_new(bundle["prompt"], replayed=replayed)
+        if not acceptable:
+            problem = f"prompt {similarity:.0%} similar to a past prompt"
+
+    if problem is not None:
+        print(f"↩️ Combined text rejected ({problem}); using per-call prompt + captions.")
+        return {"prompt": prompt_service.generate_prompt(mode)}
+
+    print(f"🧠 Generated Joanie prompt + captions in one call ({mode}): {bundle['prompt']}")
+    bundle["ig_caption"] = caption_service.with_amazon_cta(bundle["ig_caption"])
+    return bundle
+
+
+def prompt_from_text(text: Dict[str, str]) -> str:
+    return text["prompt"]
+
+
+def instagram_caption_from_text(text: Dict[str, str], mode: str) -> str:
+    if "ig_caption" in text:
+        return text["ig_caption"]
+    return caption_service.generate_instagram_caption(text["prompt"], mode)
+
+
+def facebook_caption_from_text(text: Dict[str, str], mode: str) -> str:
+    if "fb_caption" in text:
+        return text["fb_caption"]
+    return caption_service.generate_facebook_caption(text["prompt"], mode)
@@ -1,9 +1,22 @@
 """TikTok Direct Post helpers."""
 
 from .poster import (
+    DEFAULT_CHUNK_SIZE,
     DEFAULT_PRIVACY_LEVEL,
     PRIVACY_LEVELS,
     TikTokPoster,
+    compute_chunk_plan,
 )
+from .tracker import StatusTracker, track_publish_ids
+from .bulk import run_bulk
 
-__all__ = ["TikTokPoster", "PRIVACY_LEVELS", "DEFAULT_PRIVACY_LEVEL"]
+__all__ = [
+    "TikTokPoster",
+    "PRIVACY_LEVELS",
+    "DEFAULT_PRIVACY_LEVEL",
+    "DEFAULT_CHUNK_SIZE",
+    "compute_chunk_plan",
+    "StatusTracker",
+    "track_publish_ids",
+    "run_bulk",
+]
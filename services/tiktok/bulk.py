@@ -0,0 +1,161 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from services import filestore, transport
+
+from .poster import (
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_PRIVACY_LEVEL,
+    INIT_RATE_PER_MINUTE,
+    STATUS_RATE_PER_MINUTE,
+    RateLimiter,
+    TikTokPoster,
+)
+from .tracker import DEFAULT_TIMEOUT, track_publish_ids
+
+RESULTS_FILENAME = "tiktok_results.json"
+VIDEO_EXTENSIONS = (".mp4", ".mov")
+# Uploaded (has a publish_id) but the status tracker timed out or kept failing.
+TRACK_TIMEOUT = "TRACK_TIMEOUT"
+# Statuses that mean "already posted or on its way" – a rerun skips these.
+# Only init/upload errors ("ERROR") and TikTok's own "FAILED" are retried.
+SKIP_STATUSES = {
+    "PUBLISH_COMPLETE", "PROCESSING_UPLOAD", "PROCESSING_DOWNLOAD", "SEND_TO_USER_INBOX", "UPLOADED", TRACK_TIMEOUT,
+}
+
+
+def load_jobs_from_dir(directory: str, default_caption: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    One job per video in `directory`. The caption comes from a sidecar
+    `<video>.txt` when present, else `default_caption`.
+    """
+    jobs = []
+    for name in sorted(os.listdir(directory)):
+        if not name.lower().endswith(VIDEO_EXTENSIONS):
+            continue
+        video = os.path.abspath(os.path.join(directory, name))
+        sidecar = os.path.splitext(video)[0] + ".txt"
+        caption = default_caption
+        if os.path.isfile(sidecar):
+            with open(sidecar, "r", encoding="utf-8") as f:
+                caption = f.read().strip()
+        if not caption:
+            raise ValueError(f"No caption for {name}: add {os.path.basename(sidecar)} or pass --caption.")
+        jobs.append({"video": video, "caption": caption})
+    return jobs
+
+
+def load_jobs_from_manifest(path: str) -> List[Dict[str, Any]]:
+    """
+    JSON list of {"video": ..., "caption": ..., "privacy": optional}.
+    Relative video paths resolve against the manifest's directory.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    jobs = []
+    for entry in entries:
+        if not entry.get("video") or not entry.get("caption"):
+            raise ValueError(f"Manifest entry needs 'video' and 'caption': {entry}")
+        job = dict(entry)
+        job["video"] = os.path.abspath(os.path.join(base, entry["video"]))
+        jobs.append(job)
+    return jobs
+
+
+class ResultsManifest:
+    """Per-video outcomes, rewritten atomically after every update."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if os.path.isfile(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def should_skip(self, video: str) -> bool:
+        return self.entries.get(video, {}).get("status") in SKIP_STATUSES
+
+    def update(self, video: str, **fields: Any) -> None:
+        with self._lock:
+            entry = self.entries.setdefault(video, {})
+            entry.update(fields, updated_at=datetime.utcnow().isoformat())
+            filestore.atomic_write_json(self.path, self.entries, indent=2, sort_keys=True)
+
+
+def run_bulk(
+    jobs: List[Dict[str, Any]],
+    results_path: str,
+    workers: int = 3,
+    privacy_level: str = DEFAULT_PRIVACY_LEVEL,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    poll: bool = True,
+    poll_timeout: float = DEFAULT_TIMEOUT,
+    access_token: Optional[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Init + upload every job through a bounded worker pool that shares one
+    pooled keep-alive session (services.transport) and TikTok's per-token rate limits, then track all
+    publish IDs concurrently. Returns the results manifest entries.
+    """
+    manifest = ResultsManifest(results_path)
+    pending = [job for job in jobs if not manifest.should_skip(job["video"])]
+    skipped = len(jobs) - len(pending)
+    if skipped:
+        print(f"Skipping {skipped} video(s) already published per {results_path}")
+    if not pending:
+        return manifest.entries
+
+    poster = TikTokPoster(
+        access_token=access_token,
+        session=transport.session(),
+        init_limiter=RateLimiter(INIT_RATE_PER_MINUTE),
+        status_limiter=RateLimiter(STATUS_RATE_PER_MINUTE),
+    )
+
+    def _post(job: Dict[str, Any]) -> str:
+        return poster.post_file(
+            job["video"],
+            caption=job["caption"],
+            privacy_level=job.get("privacy") or privacy_level,
+            chunk_size=chunk_size,
+        )
+
+    publish_ids: Dict[str, str] = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(_post, job): job for job in pending}
+        for future in as_completed(futures):
+            video = futures[future]["video"]
+            try:
+                publish_id = future.result()
+            except Exception as exc:
+                print(f"Upload failed for {os.path.basename(video)}: {exc}")
+                manifest.update(video, status="ERROR", fail_reason=str(exc))
+                continue
+            print(f"Uploaded {os.path.basename(video)} (publish_id {publish_id})")
+            publish_ids[publish_id] = video
+            manifest.update(video, publish_id=publish_id, status="UPLOADED", fail_reason=None)
+
+    if poll and publish_ids:
+        print(f"Tracking {len(publish_ids)} publish ID(s)...")
+        statuses = track_publish_ids(poster, publish_ids.keys(), timeout=poll_timeout)
+        for publish_id, info in statuses.items():
+            video = publish_ids[publish_id]
+            status = info.get("status")
+            if status == "ERROR":
+                # The upload went through; the post may still publish, so never re-post it.
+                status = TRACK_TIMEOUT
+            manifest.update(
+                video,
+                status=status,
+                fail_reason=info.get("fail_reason"),
+                publicly_available_post_id=info.get("publicly_available_post_id"),
+            )
+            print(f"{os.path.basename(video)}: {status}")
+
+    return manifest.entries
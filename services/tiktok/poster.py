@@ -1,9 +1,15 @@
+import mmap
 import os
-from typing import Any, Dict, Optional, Tuple
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
 
 import requests
 
-API_BASE = "https://open.tiktokapis.com"
+from services import telemetry, transport
+
+API_BASE = os.getenv("TIKTOK_API_BASE", "https://open.tiktokapis.com")
 DEFAULT_PRIVACY_LEVEL = "SELF_ONLY"
 PRIVACY_LEVELS = {
     "SELF_ONLY",
@@ -12,15 +18,111 @@ PRIVACY_LEVELS = {
     "FOLLOWER_OF_CREATOR",
 }
 
+# TikTok media transfer rules: chunks are 5–64 MB, the final chunk absorbs the
+# remainder (≤128 MB), videos under 5 MB go up whole, at most 1000 chunks.
+MIN_CHUNK_SIZE = 5 * 1024 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+MAX_CHUNK_COUNT = 1000
+DEFAULT_CHUNK_SIZE = 10 * 1024 * 1024
+CHUNK_RETRIES = 3
+
+# Content Posting API rate limits per user access token (requests per minute).
+INIT_RATE_PER_MINUTE = 6
+STATUS_RATE_PER_MINUTE = 30
+
+
+def compute_chunk_plan(video_size: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Tuple[int, int]:
+    """Return (chunk_size, total_chunk_count) that satisfies TikTok's chunk rules."""
+    if video_size <= 0:
+        raise ValueError("Video size must be positive.")
+    chunk_size = max(MIN_CHUNK_SIZE, min(MAX_CHUNK_SIZE, chunk_size))
+    if video_size < MIN_CHUNK_SIZE or video_size <= chunk_size:
+        return video_size, 1
+    if video_size // chunk_size > MAX_CHUNK_COUNT:
+        chunk_size = -(-video_size // MAX_CHUNK_COUNT)
+        if chunk_size > MAX_CHUNK_SIZE:
+            raise ValueError(f"Video too large for chunked upload ({video_size} bytes).")
+    return chunk_size, video_size // chunk_size
+
+
+def chunk_ranges(video_size: int, chunk_size: int, total_chunk_count: int) -> List[Tuple[int, int]]:
+    """Inclusive byte ranges per chunk; the last chunk takes the remainder."""
+    ranges = []
+    for index in range(total_chunk_count):
+        start = index * chunk_size
+        end = video_size - 1 if index == total_chunk_count - 1 else start + chunk_size - 1
+        ranges.append((start, end))
+    return ranges
+
+
+class _MappedChunk:
+    """File-like window over a memory-mapped video, read in small blocks by requests."""
+
+    def __init__(self, mapped: mmap.mmap, start: int, stop: int) -> None:
+        self._mapped = mapped
+        self._pos = start
+        self._stop = stop
+
+    def __len__(self) -> int:
+        return self._stop - self._pos
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = len(self)
+        end = min(self._stop, self._pos + size)
+        data = self._mapped[self._pos:end]
+        self._pos = end
+        return data
+
+
+class RateLimiter:
+    """Thread-safe sliding-window limiter: at most `limit` acquisitions per `period` seconds."""
+
+    def __init__(self, limit: int, period: float = 60.0) -> None:
+        self.limit = limit
+        self.period = period
+        self._calls: deque = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._calls and now - self._calls[0] >= self.period:
+                    self._calls.popleft()
+                if len(self._calls) < self.limit:
+                    self._calls.append(now)
+                    return
+                wait = self.period - (now - self._calls[0])
+            time.sleep(wait)
+
 
 class TikTokPoster:
-    def __init__(self, access_token: Optional[str] = None, api_base: str = API_BASE) -> None:
+    def __init__(
+        self,
+        access_token: Optional[str] = None,
+        api_base: str = API_BASE,
+        session: Optional[requests.Session] = None,
+        init_limiter: Optional[RateLimiter] = None,
+        status_limiter: Optional[RateLimiter] = None,
+    ) -> None:
         self.access_token = access_token or os.getenv("TIKTOK_ACCESS_TOKEN")
         if not self.access_token:
             raise ValueError("TIKTOK_ACCESS_TOKEN env var is required for TikTok posting.")
         self.api_base = api_base.rstrip("/")
+        # Keep-alive session shared by every call (and by bulk workers).
+        self.session = session or transport.session()
+        self.init_limiter = init_limiter
+        self.status_limiter = status_limiter
 
-    def init_post(self, video_size: int, caption: str, privacy_level: str = DEFAULT_PRIVACY_LEVEL) -> Tuple[str, str]:
+    def init_post(
+        self,
+        video_size: int,
+        caption: str,
+        privacy_level: str = DEFAULT_PRIVACY_LEVEL,
+        chunk_size: Optional[int] = None,
+        total_chunk_count: int = 1,
+    ) -> Tuple[str, str]:
         privacy = self._normalize_privacy(privacy_level)
         url = f"{self.api_base}/v2/post/publish/video/init/"
         payload = {
@@ -34,37 +136,106 @@ class TikTokPoster:
             "source_info": {
                 "source": "FILE_UPLOAD",
                 "video_size": video_size,
-                "chunk_size": video_size,
-                "total_chunk_count": 1,
+                "chunk_size": chunk_size or video_size,
+                "total_chunk_count": total_chunk_count,
             },
         }
-        response = requests.post(url, json=payload, headers=self._json_headers(), timeout=30)
-        data = self._parse_tiktok_response(response)
+        if self.init_limiter:
+            self.init_limiter.acquire()
+        with telemetry.span("tiktok.init"):
+            response = self.session.post(url, json=payload, headers=self._json_headers(), timeout=30)
+            data = self._parse_tiktok_response(response)
         publish_id = data.get("publish_id")
         upload_url = data.get("upload_url")
         if not publish_id or not upload_url:
             raise RuntimeError("TikTok init response missing publish_id or upload_url.")
         return publish_id, upload_url
 
-    def upload_video(self, upload_url: str, video_bytes: bytes, video_size: int) -> None:
+    def upload_file(
+        self,
+        upload_url: str,
+        video_path: str,
+        chunk_size: int,
+        total_chunk_count: int,
+        retries: int = CHUNK_RETRIES,
+    ) -> None:
+        """
+        Stream `video_path` to `upload_url` chunk by chunk from a memory map.
+        Memory stays flat regardless of video length, and a failed chunk is
+        retried on its own instead of restarting from byte zero.
+        """
+        video_size = os.path.getsize(video_path)
+        ranges = chunk_ranges(video_size, chunk_size, total_chunk_count)
+        with open(video_path, "rb") as file_handle, mmap.mmap(file_handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for index, (start, end) in enumerate(ranges, start=1):
+                self._put_chunk(upload_url, mapped, start, end, video_size, retries)
+                print(f"Uploaded chunk {index}/{total_chunk_count} (bytes {start}-{end}/{video_size})")
+
+    def _put_chunk(
+        self,
+        upload_url: str,
+        mapped: mmap.mmap,
+        start: int,
+        end: int,
+        video_size: int,
+        retries: int,
+    ) -> None:
         headers = {
             "Content-Type": "video/mp4",
-            "Content-Length": str(video_size),
-            "Content-Range": f"bytes 0-{video_size - 1}/{video_size}",
+            "Content-Length": str(end - start + 1),
+            "Content-Range": f"bytes {start}-{end}/{video_size}",
         }
-        response = requests.put(upload_url, data=video_bytes, headers=headers, timeout=120)
-        if response.status_code not in (200, 201, 204):
-            raise RuntimeError(f"Video upload failed ({response.status_code}): {response.text}")
+        with telemetry.span("tiktok.upload_chunk", bytes=end - start + 1) as span:
+            for attempt in range(1, retries + 1):
+                try:
+                    chunk = _MappedChunk(mapped, start, end + 1)
+                    response = self.session.put(upload_url, data=chunk, headers=headers, timeout=120)
+                    if response.status_code in (200, 201, 204, 206):
+                        return
+                    retryable = response.status_code == 429 or response.status_code >= 500
+                    error = RuntimeError(f"Chunk upload failed ({response.status_code}): {response.text}")
+                except requests.RequestException as exc:
+                    retryable, error = True, RuntimeError(f"Chunk upload error: {exc}")
+
+                if not retryable or attempt == retries:
+                    raise error
+                span.retry()
+                wait = 2 ** attempt
+                print(f"Chunk bytes {start}-{end} failed (attempt {attempt}/{retries}); retrying in {wait}s: {error}")
+                time.sleep(wait)
+
+    def post_file(
+        self,
+        video_path: str,
+        caption: str,
+        privacy_level: str = DEFAULT_PRIVACY_LEVEL,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> str:
+        """Init a chunked Direct Post for `video_path`, stream it, return the publish_id."""
+        video_size = os.path.getsize(video_path)
+        chunk_size, total_chunk_count = compute_chunk_plan(video_size, chunk_size)
+        publish_id, upload_url = self.init_post(
+            video_size=video_size,
+            caption=caption,
+            privacy_level=privacy_level,
+            chunk_size=chunk_size,
+            total_chunk_count=total_chunk_count,
+        )
+        self.upload_file(upload_url, video_path, chunk_size, total_chunk_count)
+        return publish_id
 
     def fetch_status(self, publish_id: str) -> Dict[str, Any]:
         url = f"{self.api_base}/v2/post/publish/status/fetch/"
-        response = requests.post(
-            url,
-            json={"publish_id": publish_id},
-            headers=self._json_headers(),
-            timeout=15,
-        )
-        data = self._parse_tiktok_response(response)
+        if self.status_limiter:
+            self.status_limiter.acquire()
+        with telemetry.span("tiktok.fetch_status"):
+            response = self.session.post(
+                url,
+                json={"publish_id": publish_id},
+                headers=self._json_headers(),
+                timeout=15,
+            )
+            data = self._parse_tiktok_response(response)
         return {
             "status": data.get("status"),
             "fail_reason": data.get("fail_reason"),
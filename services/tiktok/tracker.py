@@ -0,0 +1,129 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple, Union
+
+from .poster import TikTokPoster
+
+TERMINAL_STATUSES = {"PUBLISH_COMPLETE", "FAILED"}
+
+# Poll interval per publish phase: (first interval, growth factor, cap) in seconds.
+# Uploads finish quickly; inbox delivery / moderation can take minutes.
+PHASE_BACKOFF: Dict[Optional[str], Tuple[float, float, float]] = {
+    "PROCESSING_UPLOAD": (1.0, 1.3, 4.0),
+    "PROCESSING_DOWNLOAD": (2.0, 1.5, 8.0),
+    "SEND_TO_USER_INBOX": (5.0, 1.5, 30.0),
+    None: (3.0, 1.5, 15.0),
+}
+DEFAULT_TIMEOUT = 600.0
+MAX_CONSECUTIVE_ERRORS = 3
+
+StatusCallback = Callable[[str, Dict[str, Any]], Union[None, Awaitable[None]]]
+
+
+class StatusTracker:
+    """
+    Watches many publish IDs concurrently on one asyncio loop.
+
+    Each ID is polled with an adaptive interval that resets when its status
+    changes phase. `track()` returns a future resolved with the final status
+    dict once the post reaches PUBLISH_COMPLETE or FAILED.
+    """
+
+    def __init__(
+        self,
+        poster: TikTokPoster,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_concurrent_requests: int = 4,
+        on_update: Optional[StatusCallback] = None,
+    ) -> None:
+        self.poster = poster
+        self.timeout = timeout
+        self.on_update = on_update
+        self._semaphore = asyncio.Semaphore(max_concurrent_requests)
+        self._futures: Dict[str, asyncio.Future] = {}
+
+    def track(self, publish_id: str, callback: Optional[StatusCallback] = None) -> asyncio.Future:
+        """Start watching `publish_id`; `callback` fires once with the terminal status."""
+        if publish_id in self._futures:
+            return self._futures[publish_id]
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._futures[publish_id] = future
+        loop.create_task(self._watch(publish_id, future, callback))
+        return future
+
+    async def wait_all(self) -> Dict[str, Dict[str, Any]]:
+        """Wait for every tracked ID; failures/timeouts come back as status dicts."""
+        results = {}
+        for publish_id, future in list(self._futures.items()):
+            try:
+                results[publish_id] = await future
+            except Exception as exc:
+                results[publish_id] = {"status": "ERROR", "fail_reason": str(exc)}
+        return results
+
+    async def _fetch(self, publish_id: str) -> Dict[str, Any]:
+        async with self._semaphore:
+            return await asyncio.to_thread(self.poster.fetch_status, publish_id)
+
+    async def _notify(self, callback: Optional[StatusCallback], publish_id: str, info: Dict[str, Any]) -> None:
+        if callback is None:
+            return
+        result = callback(publish_id, info)
+        if asyncio.iscoroutine(result):
+            await result
+
+    async def _watch(self, publish_id: str, future: asyncio.Future, callback: Optional[StatusCallback]) -> None:
+        deadline = time.monotonic() + self.timeout
+        phase = object()
+        interval = 0.0
+        errors = 0
+        try:
+            while True:
+                try:
+                    info = await self._fetch(publish_id)
+                    errors = 0
+                except Exception:
+                    errors += 1
+                    if errors >= MAX_CONSECUTIVE_ERRORS:
+                        raise
+                    info = None
+
+                if info is not None:
+                    await self._notify(self.on_update, publish_id, info)
+                    status = info.get("status")
+                    if status in TERMINAL_STATUSES:
+                        await self._notify(callback, publish_id, info)
+                        future.set_result(info)
+                        return
+
+                    first, growth, cap = PHASE_BACKOFF.get(status, PHASE_BACKOFF[None])
+                    if status != phase:
+                        phase, interval = status, first
+                    else:
+                        interval = min(cap, interval * growth)
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError(f"TikTok post {publish_id} not finished after {self.timeout:.0f}s")
+                await asyncio.sleep(min(interval or PHASE_BACKOFF[None][0], remaining))
+        except Exception as exc:
+            if not future.done():
+                future.set_exception(exc)
+
+
+def track_publish_ids(
+    poster: TikTokPoster,
+    publish_ids: Iterable[str],
+    timeout: float = DEFAULT_TIMEOUT,
+    on_update: Optional[StatusCallback] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Blocking helper: watch `publish_ids` until each is terminal (or times out)."""
+
+    async def _run() -> Dict[str, Dict[str, Any]]:
+        tracker = StatusTracker(poster, timeout=timeout, on_update=on_update)
+        for publish_id in publish_ids:
+            tracker.track(publish_id)
+        return await tracker.wait_all()
+
+    return asyncio.run(_run())
@@ -0,0 +1,103 @@
+"""
+Transport
+Shared, pooled HTTP clients for every outbound call.
+
+- `session()`: one keep-alive requests.Session (per-host connection pools)
+  for the cover download, CDN probe, Make.com webhook and TikTok uploads.
+- `httpx_client()`: one httpx.Client, HTTP/2 when the `h2` package is
+  installed, which backs the OpenAI client.
+- `openai_client()`: one OpenAI client per API key on top of it.
+
+Repeat calls to a host reuse an open connection instead of paying a new
+TCP + TLS handshake, which adds up across batches and concurrent stages.
+Pool sizes and timeouts are set with ATRA_HTTP_* environment variables.
+"""
+
+import importlib.util
+import os
+import threading
+from typing import TYPE_CHECKING, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+if TYPE_CHECKING:
+    import httpx
+
+# Host pools kept open, and connections kept per host.
+POOL_HOSTS = int(os.getenv("ATRA_HTTP_POOL_HOSTS", "10"))
+POOL_SIZE = int(os.getenv("ATRA_HTTP_POOL_SIZE", "20"))
+KEEPALIVE_SECONDS = float(os.getenv("ATRA_HTTP_KEEPALIVE_SECONDS", "60"))
+CONNECT_TIMEOUT = float(os.getenv("ATRA_HTTP_CONNECT_TIMEOUT", "10"))
+# Image generation/edit responses can take minutes.
+READ_TIMEOUT = float(os.getenv("ATRA_HTTP_READ_TIMEOUT", "600"))
+HTTP2 = os.getenv("ATRA_HTTP2", "1").strip() not in {"0", "false", "False"}
+OPENAI_MAX_RETRIES = int(os.getenv("ATRA_OPENAI_MAX_RETRIES", "2"))
+
+_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_httpx_client: Optional["httpx.Client"] = None
+_openai_clients: Dict[Optional[str], object] = {}
+
+
+def http2_enabled() -> bool:
+    """HTTP/2 needs the optional `h2` package; fall back to HTTP/1.1 without it."""
+    return HTTP2 and importlib.util.find_spec("h2") is not None
+
+
+def session() -> requests.Session:
+    """Process-wide requests.Session with pooled keep-alive connections."""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_SIZE)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def httpx_client() -> "httpx.Client":
+    """Process-wide httpx.Client (HTTP/2 when available)."""
+    global _httpx_client
+    with _lock:
+        if _httpx_client is None:
+            import httpx
+            from openai import DefaultHttpxClient
+
+            _httpx_client = DefaultHttpxClient(
+                http2=http2_enabled(),
+                limits=httpx.Limits(
+                    max_connections=POOL_SIZE,
+                    max_keepalive_connections=POOL_SIZE,
+                    keepalive_expiry=KEEPALIVE_SECONDS,
+                ),
+                timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            )
+        return _httpx_client
+
+
+def openai_client(api_key: Optional[str] = None):
+    """Shared OpenAI client (reads OPENAI_API_KEY when `api_key` is not given)."""
+    from openai import OpenAI
+
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    http_client = httpx_client()
+    with _lock:
+        client = _openai_clients.get(api_key)
+        if client is None:
+            client = OpenAI(api_key=api_key, http_client=http_client, max_retries=OPENAI_MAX_RETRIES)
+            _openai_clients[api_key] = client
+        return client
+
+
+def close() -> None:
+    """Close every pooled connection (the next call reopens them)."""
+    global _session, _httpx_client
+    with _lock:
+        if _session is not None:
+            _session.close()
+        if _httpx_client is not None:
+            _httpx_client.close()
+        _session, _httpx_client = None, None
+        _openai_clients.clear()
@@ -4,23 +4,47 @@ Handles uploading generated assets to Cloudinary.
 """
 
 import os
-import cloudinary
-import cloudinary.uploader
+import threading
+from typing import Union
 
-# Initialize Cloudinary using the CLOUDINARY_URL environment variable
-cloudinary.config(cloudinary_url=os.getenv("CLOUDINARY_URL"))
+from services import telemetry
+from services.artifact import ImageArtifact
 
-def upload_asset(image_path: str) -> str:
-    """Uploads an image to Cloudinary and returns the raw public URL."""
-    print(f"☁️ Uploading asset from: {image_path}")
+_uploader = None
+_uploader_lock = threading.Lock()
+
+
+def _get_uploader():
+    """Import and configure Cloudinary on first upload (reads CLOUDINARY_URL)."""
+    global _uploader
+    with _uploader_lock:
+        if _uploader is None:
+            import cloudinary
+            import cloudinary.uploader
+
+            cloudinary.config(cloudinary_url=os.getenv("CLOUDINARY_URL"))
+            _uploader = cloudinary.uploader
+        return _uploader
+
+def upload_asset(image: Union[str, ImageArtifact]) -> str:
+    """Uploads an image (file path or in-memory artifact) to Cloudinary and returns the raw public URL."""
+    print(f"☁️ Uploading asset from: {image}")
+
+    if isinstance(image, ImageArtifact):
+        # Upload straight from memory – no temp file.
+        file, options = image.data, {"filename": image.filename}
+    else:
+        file, options = image, {}
 
     try:
         # Upload to Cloudinary with no transformations
-        response = cloudinary.uploader.upload(
-            image_path,
-            folder="atra_outputs",
-            resource_type="image"
-        )
+        with telemetry.span("cloudinary.upload", bytes=len(image) if isinstance(image, ImageArtifact) else None):
+            response = _get_uploader().upload(
+                file,
+                folder="atra_outputs",
+                resource_type="image",
+                **options,
+            )
 
         secure_url = response.get("secure_url")
         print(f"☁️ Uploaded successfully: {secure_url}")